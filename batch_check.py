@@ -0,0 +1,402 @@
+"""
+This file contains a command-line batch grammar checker.
+
+Every line of the input with a non-whitespace character is a document (blank lines are
+skipped, and are not documents to be resumed). Inputs are files, directories (searched
+recursively for files with the selected extensions) or "-" for the standard input.
+Documents are checked in parallel by a pool of worker processes, and one JSON object is
+written per sentence:
+
+    {"doc": "corpus/a.txt:3", "sentence": 0, "offset": 0, "text": "He is cool.",
+     "feedback": [{"rule": "r1", "type": 3, "type_str": "Test Ineffective",
+                   "message": "..."}, ...],
+     "final": true}
+
+where "doc" is the path and line number of the document, "sentence" is the index of the
+sentence in the document, "offset" is the character offset of the sentence in the
+document, and "final" marks the last sentence of the document. A document without any
+sentence (e.g. a tree with only empty elements) is written as a single final record whose
+"sentence", "offset" and "text" are null and whose "feedback" is empty. A rule that
+raises an error on a sentence is reported as {"rule": "r9", "error": "IndexError: ..."}
+in its "feedback" instead, and the other rules are still checked, so one sentence cannot
+stop a batch; likewise, with --ptb, a tree that is not in PTB bracket notation is written
+as a record like that of a document without any sentence, with an additional "error".
+All sentences of
+a document are written together, so an interrupted run can be continued with --resume:
+a partially written trailing document is truncated and every complete document is
+skipped.
+
+With --ptb, the inputs are treebanks in PTB bracket notation instead, every tree is a
+document whose id is the path and number of the tree, and the trees are checked without
+loading the parsing model (or importing spaCy and benepar).
+
+With --lazy, the trees are LazyGrammarCheckingTree objects (see lazy_tree.py), so only
+the parts of each tree that the selected rules look at are built.
+
+With --vectors none, the parsing model is loaded without its word vectors (and, since
+spaCy's dependency parser needs them, sentences are split by spaCy's rule-based
+sentencizer, which can split a few texts differently), and with --vectors vectors.npy
+they are memory-mapped from a file written by translator.export_vectors(), so that the
+workers share them (see translator.load_pipeline).
+
+Example usage:
+    python batch_check.py corpus/ -o feedback.jsonl -r r1 r2 r4 -j 8
+    python batch_check.py corpus/ -o feedback.jsonl -j 16 --vectors vectors.npy
+    python batch_check.py treebank/ --ptb --extensions .mrg -o feedback.jsonl
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+from typing import Any, Iterable, Iterator, Optional, TextIO
+from grammar_checking_tree import Feedback, GrammarCheckingTree
+from lazy_tree import lazy_tree
+from settings import VECTORS_VARIABLE
+from tree_io import iter_ptb_strings, read_ptb
+
+RULES = ['r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8', 'r9']
+BATCH_SIZE = 32
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# the rules checked by this worker process and whether it builds lazy trees, set by
+# _init_worker or _init_tree_worker
+_worker_rules = ["*"]
+_worker_lazy = False
+
+
+def iter_documents(paths: list[str], extensions: tuple[str, ...],
+                   done: Optional[set[str]] = None, ptb: bool = False) -> \
+        Iterator[tuple[str, str]]:
+    """Yield a (doc_id, text) tuple for every line of the input paths that is not blank,
+    or, if ptb is True, for every tree in the input treebanks, skipping the documents
+    whose ids are in done.
+    """
+    done = done or set()
+    for path in paths:
+        if path == '-':
+            yield from _iter_documents('<stdin>', sys.stdin, done, ptb)
+        elif os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    if file_name.endswith(extensions):
+                        yield from _iter_file(os.path.join(dir_path, file_name), done, ptb)
+        else:
+            yield from _iter_file(path, done, ptb)
+
+
+def _iter_file(path: str, done: set[str], ptb: bool) -> Iterator[tuple[str, str]]:
+    """Yield a (doc_id, text) tuple for every document of the file at path."""
+    with open(path, encoding='utf-8', errors='replace') as file:
+        yield from _iter_documents(path, file, done, ptb)
+
+
+def _iter_documents(name: str, file: TextIO, done: set[str], ptb: bool) -> \
+        Iterator[tuple[str, str]]:
+    """Yield a (doc_id, text) tuple for every document of file: every tree in PTB
+    bracket notation if ptb is True, or every line that is not blank otherwise.
+    """
+    if not ptb:
+        yield from _iter_lines(name, file, done)
+        return
+    for tree_number, text in enumerate(iter_ptb_strings(file), 1):
+        doc_id = f'{name}:{tree_number}'
+        if doc_id not in done:
+            yield doc_id, text
+
+
+def _iter_lines(name: str, lines: Iterable[str], done: set[str]) -> \
+        Iterator[tuple[str, str]]:
+    """Yield a (doc_id, text) tuple for every line in lines with a non-whitespace
+    character.
+    """
+    for line_number, line in enumerate(lines, 1):
+        text = line.rstrip('\n')
+        doc_id = f'{name}:{line_number}'
+        if text.strip() != '' and doc_id not in done:
+            yield doc_id, text
+
+
+def _batches(documents: Iterable[tuple[str, str]], size: int) -> \
+        Iterator[list[tuple[str, str]]]:
+    """Yield the documents in lists of at most size documents."""
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _init_worker(rules: list[str], lazy: bool = False, quantize: bool = False,
+                 threads: Optional[int] = None, interop_threads: Optional[int] = None,
+                 worker_counter: Any = None) -> None:
+    """Load the parsing model in a worker process and set the rules it checks and whether
+    it builds lazy trees. If quantize is True, the model is switched to int8
+    fast-inference mode. threads and interop_threads are passed to
+    translator.configure_threads. If worker_counter (a shared multiprocessing.Value) is
+    given, the worker takes the next index from it and is pinned to the threads cores
+    (one core if threads is None) of that index (see translator.pin_to_cores), and its
+    parser uses one intra-op thread per pinned core.
+    """
+    global _worker_rules, _worker_lazy
+    _worker_rules, _worker_lazy = rules, lazy
+    import translator  # pylint: disable=import-outside-toplevel
+    if quantize:
+        translator.enable_fast_inference()
+    if worker_counter is not None:
+        # more intra-op threads than pinned cores would only compete for them
+        threads = threads or 1
+    translator.configure_threads(threads, interop_threads)
+    if worker_counter is not None:
+        with worker_counter.get_lock():
+            worker_index = worker_counter.value
+            worker_counter.value += 1
+        translator.pin_to_cores(worker_index, threads)
+
+
+def _init_tree_worker(rules: list[str], lazy: bool = False) -> None:
+    """Set the rules checked by a worker process that checks pre-parsed trees and whether
+    it builds lazy trees.
+    """
+    global _worker_rules, _worker_lazy
+    _worker_rules, _worker_lazy = rules, lazy
+
+
+def check_documents(batch: list[tuple[str, str]]) -> str:
+    """Return the JSON lines for every sentence of the documents in batch."""
+    from translator import translate_stream  # pylint: disable=import-outside-toplevel
+    records = []
+    # the index of the next document of batch without any record
+    next_index = 0
+    for text_index, start_char, tree in translate_stream((text for _, text in batch),
+                                                         lazy=_worker_lazy):
+        if text_index >= next_index:
+            if records:
+                records[-1]['final'] = True
+            records.extend(_empty_record(doc_id) for doc_id, _ in batch[next_index:text_index])
+            sentence_index = 0
+            next_index = text_index + 1
+        records.append(_record(batch[text_index][0], sentence_index, start_char, tree))
+        sentence_index += 1
+    if records:
+        records[-1]['final'] = True
+    records.extend(_empty_record(doc_id) for doc_id, _ in batch[next_index:])
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+def check_trees(batch: list[tuple[str, str]]) -> str:
+    """Return the JSON lines for the documents in batch, each of which is a single tree in
+    PTB bracket notation. The offset of every sentence is null.
+    """
+    records = []
+    for doc_id, text in batch:
+        try:
+            if _worker_lazy:
+                tree = lazy_tree(text, unescape=True)
+            else:
+                tree = next(read_ptb(io.StringIO(text)), None)
+        except ValueError:
+            # lazy_tree() rejects a tree without words, which read_ptb() skips, and
+            # read_ptb() raises the error again if the tree is invalid
+            try:
+                tree = next(read_ptb(io.StringIO(text)), None)
+            except ValueError as error:
+                records.append({**_empty_record(doc_id), 'error': _error_message(error)})
+                continue
+        if tree is None:
+            records.append(_empty_record(doc_id))
+        else:
+            record = _record(doc_id, 0, None, tree)
+            record['final'] = True
+            records.append(record)
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+def _record(doc_id: str, sentence_index: int, offset: Optional[int],
+            tree: GrammarCheckingTree) -> dict[str, Any]:
+    """Return the (non-final) JSON record of the given sentence."""
+    return {'doc': doc_id,
+            'sentence': sentence_index,
+            'offset': offset,
+            'text': tree.get_sentence(),
+            'feedback': _feedback(tree),
+            'final': False}
+
+
+def _feedback(tree: GrammarCheckingTree) -> list[dict[str, Any]]:
+    """Return the JSON feedback of the rules of this worker process on tree, where a rule
+    that raises an error is reported with the error instead of its feedback.
+    """
+    try:
+        return [_feedback_record(rule, fb) for rule, fb in tree.check_rules(_worker_rules)]
+    except Exception:  # pylint: disable=broad-except
+        pass
+    # a rule failed on this tree: check the rules one at a time, so that the others are
+    # still reported
+    feedback = []
+    for rule in RULES if _worker_rules == ["*"] else _worker_rules:
+        try:
+            feedback.extend(_feedback_record(rule, fb) for rule, fb in tree.check_rules([rule]))
+        except Exception as error:  # pylint: disable=broad-except
+            feedback.append({'rule': rule, 'error': _error_message(error)})
+    return feedback
+
+
+def _feedback_record(rule: str, fb: Feedback) -> dict[str, Any]:
+    """Return the JSON feedback of rule."""
+    return {'rule': rule, 'type': fb.type, 'type_str': fb.type_str, 'message': fb.message}
+
+
+def _error_message(error: Exception) -> str:
+    """Return the description of error written to the output."""
+    return f'{type(error).__name__}: {error}'
+
+
+def _empty_record(doc_id: str) -> dict[str, Any]:
+    """Return the final JSON record of a document without any sentence."""
+    return {'doc': doc_id, 'sentence': None, 'offset': None, 'text': None, 'feedback': [],
+            'final': True}
+
+
+def completed_documents(output_path: str) -> set[str]:
+    """Return the ids of the documents completely written to the output file at
+    output_path, after truncating whatever follows the last complete document.
+    """
+    done = set()
+    end_of_complete = 0
+    with open(output_path, 'rb') as output:
+        position = 0
+        for line in output:
+            position += len(line)
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record.get('final'):
+                done.add(record['doc'])
+                end_of_complete = position
+    with open(output_path, 'r+b') as output:
+        output.truncate(end_of_complete)
+    return done
+
+
+def run(options: argparse.Namespace, output: TextIO, done: Optional[set[str]] = None) -> int:
+    """Check every document of the input paths with the given command-line options (see
+    main), write the JSON lines to output and return the number of document batches
+    checked. The documents whose ids are in done are skipped.
+    """
+    documents = iter_documents(options.paths, tuple(options.extensions), done, options.ptb)
+    batches = _batches(documents, BATCH_SIZE)
+    prefork = options.prefork and not options.ptb and options.workers > 1
+    if options.ptb:
+        # pre-parsed trees need neither the parsing model nor its settings
+        check, initializer = check_trees, _init_tree_worker
+        initargs = (options.rules, options.lazy)
+    else:
+        # with prefork, the parent quantises once so that the workers share the model
+        check, initializer = check_documents, _init_worker
+        initargs = (options.rules, options.lazy, options.quantize and not prefork,
+                    options.threads, options.interop_threads)
+        if options.pin_cores:
+            initargs += (multiprocessing.Value('i', 0),)
+    checked = 0
+    if options.workers <= 1:
+        initializer(*initargs)
+        for batch in batches:
+            output.write(check(batch))
+            checked += 1
+        return checked
+    if prefork:
+        _init_worker(options.rules, options.lazy, options.quantize)
+        from prefork import PreforkPool  # pylint: disable=import-outside-toplevel
+        pool = PreforkPool(options.workers, initializer=initializer, initargs=initargs)
+    else:
+        pool = multiprocessing.Pool(options.workers, initializer=initializer, initargs=initargs)
+    with pool:
+        for lines in pool.imap_unordered(check, batches):
+            output.write(lines)
+            checked += 1
+        if prefork and options.memory_report:
+            print(json.dumps(pool.memory_report()), file=sys.stderr)
+    return checked
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the batch grammar checker with the given command-line arguments."""
+    parser = argparse.ArgumentParser(description='Check the grammar of files, directories '
+                                                 'or the standard input and write one JSON '
+                                                 'line per sentence.')
+    parser.add_argument('paths', nargs='*', default=['-'],
+                        help='input files or directories, or "-" for the standard input')
+    parser.add_argument('-r', '--rules', nargs='+', default=['*'], choices=RULES + ['*'],
+                        help='the rules to check (default: all rules)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='the output JSON Lines file (default: the standard output)')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='the number of worker processes (default: the number of CPUs)')
+    parser.add_argument('--extensions', nargs='+', default=['.txt'],
+                        help='the extensions of the files read from directories')
+    parser.add_argument('--resume', action='store_true',
+                        help='skip the documents already written to the output file')
+    parser.add_argument('--prefork', action='store_true',
+                        help='load the parsing model once and fork the workers from it, '
+                             'sharing its memory copy-on-write')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='with --prefork, write the memory used by each worker to the '
+                             'standard error')
+    parser.add_argument('--quantize', action='store_true',
+                        help='parse with the int8-quantised model (faster on CPUs, '
+                             'slightly different parses)')
+    parser.add_argument('--threads', type=int,
+                        help='the number of parser threads of each worker (intra-op; '
+                             'default: 1 with --pin-cores, else the torch default)')
+    parser.add_argument('--interop-threads', type=int,
+                        help='the number of parser inter-op threads of each worker')
+    parser.add_argument('--pin-cores', action='store_true',
+                        help='pin each worker (or, with -j 1, this process) to its own '
+                             'group of --threads cores')
+    parser.add_argument('--ptb', action='store_true',
+                        help='the inputs are treebanks of pre-parsed trees in PTB bracket '
+                             'notation, each tree being a document; nothing is parsed')
+    parser.add_argument('--lazy', action='store_true',
+                        help='only build the parts of each tree the selected rules look at')
+    parser.add_argument('--vectors',
+                        help='how the parsing model loads its word vectors: "load", "none" '
+                             '(sentences are then split by a rule-based sentencizer instead '
+                             'of the dependency parser) or the path of a file written by '
+                             'translator.export_vectors (default: $' + VECTORS_VARIABLE
+                             + ' or "load")')
+    args = parser.parse_args(argv)
+    if args.memory_report and not args.prefork:
+        parser.error('--memory-report requires --prefork')
+    if '*' in args.rules:
+        args.rules = ['*']
+    if args.vectors is not None:
+        # the workers read it when they import translator
+        os.environ[VECTORS_VARIABLE] = args.vectors
+
+    if args.output == '-':
+        if args.resume:
+            parser.error('--resume requires --output')
+        run(args, sys.stdout)
+        return
+
+    done = set()
+    if args.resume and os.path.exists(args.output):
+        done = completed_documents(args.output)
+    mode = 'a' if args.resume else 'w'
+    with open(args.output, mode, encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as output:
+        run(args, output, done)
+
+
+if __name__ == '__main__':
+    main()
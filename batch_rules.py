@@ -0,0 +1,181 @@
+"""
+This file contains check_batch(), which checks the label-presence rules on a whole batch
+of trees at once with NumPy, and label_matrix(), the sentences x tags matrix it is
+based on.
+
+Rules r1, r2, r4, r5 and r6 mostly test whether a sentence contains tags like NNS, NN,
+CC, VBZ, VBD, VP and NP. In one pass over the batch, check_batch() reads the label mask
+of every tree (see GrammarTree.label_mask) and a few features of its root and its direct
+children, and then evaluates these rules as NumPy boolean expressions over all the
+sentences. Only the sentences whose feedback depends on deeper structure are checked
+one tree at a time:
+    - r1 and r2, when the root has an S child that could contain the error (the rule
+    then recurses into that clause);
+    - r4, when the last child of the root is not an end punctuation mark (the rule then
+    searches the whole sentence for one);
+    - every rule, when the tree is a single word.
+The other rules (r3, r7, r8 and r9) are always checked one tree at a time.
+
+The result is the same FeedbackTable as feedback_table.check_table() returns.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+from typing import Iterable, Optional
+import numpy as np
+from feedback_table import COLUMNS, RULES, FeedbackTable
+from grammar_checking_tree import GrammarCheckingTree
+from grammar_tree import GrammarTree, label_bit
+
+# the tags tested by the vectorised rules
+TAGS = ['NN', 'NNS', 'CC', 'VBZ', 'VBD', 'VP', 'NP', 'SQ', 'SBARQ']
+VECTORISED_RULES = {'r1', 'r2', 'r4', 'r5', 'r6'}
+
+# the feedback of the vectorised rules, as in GrammarCheckingTree
+_PRONOUN = (3, 'The sentence starts with a pronoun as the subject.')
+_PLURAL_NOUN_ERROR = (2, 'A plural noun is mistakenly matched to a singular verb.')
+_SINGULAR_NOUN_ERROR = (2, 'A singular noun is mistakenly matched to a plural verb.')
+_NO_ERROR = (1, '')
+_GOOD_PUNCTUATION = (1, 'Sentence has a good end punctuation.')
+_WRONG_PUNCTUATION = (2, 'Sentence has a wrong punctuation.')
+_SPECIAL = (3, 'Something special happens. Can not detect this sentence.')
+_NO_SUBJECT = (2, 'There is no subject in the sentence.')
+_SUBJECT = (1, 'There is likely a subject in the sentence.')
+_INCOMPLETE = (2, 'Sentence is incomplete.')
+_COMPLETE = (1, 'Sentence is complete.')
+
+
+def label_matrix(trees: list[GrammarTree], tags: list[str]) -> np.ndarray:
+    """Return the len(trees) x len(tags) boolean matrix whose entry (i, j) is whether
+    trees[i] contains the tag tags[j], i.e. trees[i].contain_type(tags[j]).
+    """
+    bits = [label_bit(tag).bit_length() - 1 for tag in tags]
+    size = max(bits, default=0) // 8 + 1
+    # only the bytes of the label masks up to the highest bit of tags are needed
+    limit = (1 << 8 * size) - 1
+    data = b''.join((tree.label_mask & limit).to_bytes(size, 'little') for tree in trees)
+    flags = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(len(trees), size),
+                          axis=1, bitorder='little')
+    return flags[:, bits].astype(bool)
+
+
+def check_batch(sentences: Iterable[tuple[int, int, GrammarCheckingTree]],
+                rules: list[str]) -> FeedbackTable:
+    """Return the FeedbackTable of checking rules on the tree of every (doc, sentence,
+    tree) tuple in sentences, which is the same as feedback_table.check_table(sentences,
+    rules).
+
+    Preconditions:
+        - rules satisfies the precondition of check_selected_rules.
+    """
+    sentences = list(sentences)
+    trees = [tree for _, _, tree in sentences]
+    rules = RULES if rules == ["*"] else rules
+    has = dict(zip(TAGS, label_matrix(trees, TAGS).T))
+    features = np.array([_root_features(tree) for tree in trees], dtype=bool) \
+        .reshape(len(trees), 7)
+    prp, s_root, s_child, subject, last_end, last_question, word = features.T
+
+    types = np.zeros((len(trees), len(rules)), dtype=COLUMNS['type'])
+    messages = np.zeros((len(trees), len(rules)), dtype=COLUMNS['message'])
+    fallback = np.zeros((len(trees), len(rules)), dtype=bool)
+    message_ids = {}
+    everything = np.ones(len(trees), dtype=bool)
+    for column, rule in enumerate(rules):
+        if rule == 'r1':
+            cases = [(prp, _PRONOUN),
+                     (has['NNS'] & ~has['CC'] & ~has['NN'] & has['VBZ'], _PLURAL_NOUN_ERROR),
+                     (s_child & has['NNS'] & has['VBZ'], None),
+                     (everything, _NO_ERROR)]
+        elif rule == 'r2':
+            cases = [(prp, _PRONOUN),
+                     (has['NN'] & ~has['NNS'] & ~has['CC'] & has['VP'] & ~has['VBD']
+                      & ~has['VBZ'], _SINGULAR_NOUN_ERROR),
+                     (s_child & has['NN'] & has['VP'], None),
+                     (everything, _NO_ERROR)]
+        elif rule == 'r4':
+            question = has['SBARQ'] | has['SQ']
+            cases = [(~last_end, None),
+                     (question & last_question, _GOOD_PUNCTUATION),
+                     (question, _SPECIAL),
+                     (last_question, _WRONG_PUNCTUATION),
+                     (everything, _GOOD_PUNCTUATION)]
+        elif rule == 'r5':
+            cases = [(s_root & ~has['NP'], _NO_SUBJECT),
+                     (~subject, _NO_SUBJECT),
+                     (everything, _SUBJECT)]
+        elif rule == 'r6':
+            cases = [(has['NP'] & has['VP'], _COMPLETE), (everything, _INCOMPLETE)]
+        else:
+            cases = [(everything, None)]
+        # a single word is always checked on its own
+        _apply_cases([(word, None)] + cases, column, types, messages, fallback, message_ids)
+
+    for row in np.flatnonzero(fallback.any(axis=1)):
+        columns = np.flatnonzero(fallback[row])
+        for column, (_, fb) in zip(columns, trees[row].check_rules([rules[c] for c in columns])):
+            types[row, column] = fb.type
+            messages[row, column] = message_ids.setdefault(fb.message, len(message_ids))
+    message_table = list(message_ids)
+
+    # keep only the messages that occur, in order of first occurrence
+    used, first, inverse = np.unique(messages.ravel(), return_index=True,
+                                     return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty(len(order), dtype=COLUMNS['message'])
+    rank[order] = np.arange(len(order))
+    rule_ids = np.array([RULES.index(rule) for rule in rules], dtype=COLUMNS['rule'])
+    return FeedbackTable(
+        np.repeat(np.array([doc for doc, _, _ in sentences], dtype=COLUMNS['doc']), len(rules)),
+        np.repeat(np.array([s for _, s, _ in sentences], dtype=COLUMNS['sentence']), len(rules)),
+        np.tile(rule_ids, len(trees)),
+        types.ravel(),
+        rank[inverse].astype(COLUMNS['message']),
+        [message_table[used[index]] for index in order])
+
+
+def _root_features(tree: GrammarCheckingTree) -> tuple[bool, ...]:
+    """Return whether the first word of tree is a PRP, whether its root is an S, whether
+    its root has an S child, whether a child of its root other than a VP contains an NP,
+    whether the last child of its root is "." or "!", whether it is "?", and whether tree
+    is a single word.
+    """
+    first = tree
+    while first.subtrees != []:
+        first = first.subtrees[0]
+    s_child = subject = False
+    for child in tree.subtrees:
+        s_child = s_child or child.root['label'] == 'S'
+        subject = subject or (child.root['label'] != 'VP' and child.contain_type('NP'))
+    last = tree.subtrees[-1].root['text'] if tree.subtrees != [] else ''
+    return (first.root['label'] == 'PRP', tree.root['label'] == 'S', s_child, subject,
+            last in {'.', '!', '?'}, last == '?', tree.subtrees == [])
+
+
+def _apply_cases(cases: list[tuple[np.ndarray, Optional[tuple[int, str]]]], column: int,
+                 types: np.ndarray, messages: np.ndarray, fallback: np.ndarray,
+                 message_ids: dict[str, int]) -> None:
+    """Fill the given column of types and messages with the outcome of the first case
+    whose condition holds for each sentence, or mark it in fallback if that outcome is
+    None (i.e. the sentence must be checked one tree at a time).
+    """
+    decided = np.zeros(len(types), dtype=bool)
+    for condition, outcome in cases:
+        rows = condition & ~decided
+        decided |= condition
+        if outcome is None:
+            fallback[rows, column] = True
+        else:
+            types[rows, column] = outcome[0]
+            messages[rows, column] = message_ids.setdefault(outcome[1], len(message_ids))
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['typing', 'numpy', 'feedback_table', 'grammar_checking_tree',
+                          'grammar_tree'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,154 @@
+"""
+This file contains a benchmark of building and checking GrammarCheckingTree objects with
+and without a SubtreeInterner.
+
+The texts are parsed once up front with translator.translate_stream and written to a
+treebank in PTB bracket notation, so only reading the trees of the treebank (with
+tree_io.read_ptb) and rule checking are timed. Memory is the size of the Python
+allocations that are still alive while all the trees of the corpus are held, as measured
+by tracemalloc.
+
+Usage:
+    python benchmark_interning.py [corpus.txt]
+    python benchmark_interning.py --ptb treebank.mrg
+    python benchmark_interning.py --random trees
+where every non-empty line of corpus.txt is a text (by default, the texts of
+benchmark_memory.SAMPLE_TEXT are repeated), treebank.mrg is a treebank of parsed trees
+and trees is the number of distinct random trees (see random_trees.py) of a treebank
+drawn from the words of RANDOM_WORDS; the last two need neither spaCy nor benepar.
+
+A corpus or treebank with repeated texts is the best case for interning, since every
+repeated tree is shared as a whole, so its results are an upper bound of the savings;
+random trees, which only share single words and small phrases, are closer to the worst
+case.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import random
+import sys
+import time
+import tracemalloc
+from typing import Optional
+from grammar_checking_tree import GrammarCheckingTree
+from random_trees import build_tree, random_description
+from subtree_interner import SubtreeInterner
+from tree_io import read_ptb, write_ptb
+
+RANDOM_PHRASES = ['S', 'NP', 'VP', 'PP', 'SBAR', 'ADJP', 'ADVP']
+RANDOM_WORDS = [(tag, word) for tag, words in [
+    ('NN', 'house car dog city river teacher book idea'),
+    ('NNS', 'houses cars dogs cities rivers teachers books ideas'),
+    ('VBZ', 'is lives likes sees has'), ('VBP', 'are live like see have'),
+    ('VBD', 'was lived liked saw had'), ('VBG', 'swimming reading living'),
+    ('JJ', 'cool old small green quiet'), ('RB', 'very often'),
+    ('DT', 'the a this'), ('IN', 'in near of that'), ('PRP', 'he she they I'),
+    ('CC', 'and'), (',', ','), ('.', '.')] for word in words.split()]
+RANDOM_DEPTH = 5
+
+
+def parse_treebank(texts: list[str]) -> str:
+    """Return the trees of every sentence of texts in PTB bracket notation, one tree per
+    line.
+    """
+    # imported here so that a treebank can be benchmarked without spaCy or benepar
+    from translator import translate_stream
+    treebank = io.StringIO()
+    write_ptb((tree for _, _, tree in translate_stream(texts)), treebank)
+    return treebank.getvalue()
+
+
+def random_treebank(trees: int, seed: int = 0) -> str:
+    """Return a treebank of the given number of distinct random trees in PTB bracket
+    notation, one tree per line. Only the trees on which every rule can be checked are
+    kept, since some rules raise errors on some trees (e.g. check_parallelism on a CC
+    without a following phrase).
+    """
+    generator = random.Random(seed)
+    descriptions = set()
+    while len(descriptions) < trees:
+        description = random_description(generator, RANDOM_DEPTH, RANDOM_PHRASES,
+                                         RANDOM_WORDS)
+        if description[2] != [] and _checkable(build_tree(description)):
+            descriptions.add(_hashable(description))
+    treebank = io.StringIO()
+    write_ptb((build_tree(description) for description in sorted(descriptions)), treebank)
+    return treebank.getvalue()
+
+
+def _checkable(tree: GrammarCheckingTree) -> bool:
+    """Return whether every rule can be checked on tree without an error."""
+    try:
+        tree.check_selected_rules(["*"])
+    except (IndexError, AttributeError):
+        return False
+    return True
+
+
+def _hashable(description: tuple) -> tuple:
+    """Return description with its lists of subtrees replaced by tuples."""
+    label, text, subtrees = description
+    return label, text, tuple(_hashable(subtree) for subtree in subtrees)
+
+
+def _build_and_check(treebank: str, interner: Optional[SubtreeInterner]) -> \
+        tuple[float, float, int, int]:
+    """Return the build time, check time, retained memory in bytes and number of
+    distinct tree nodes of building and checking every tree of treebank.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    trees = list(read_ptb(io.StringIO(treebank), interner))
+    build_time = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for tree in trees:
+        if interner is None:
+            tree.check_selected_rules(["*"])
+        else:
+            interner.check_selected_rules(tree, ["*"])
+    check_time = time.perf_counter() - start
+
+    if interner is None:
+        nodes = sum(_count_nodes(tree) for tree in trees)
+    else:
+        nodes = len(interner)
+    return build_time, check_time, retained, nodes
+
+
+def _count_nodes(tree: GrammarCheckingTree) -> int:
+    """Return the number of nodes in tree."""
+    return 1 + sum(_count_nodes(subtree) for subtree in tree.subtrees)
+
+
+def run_benchmark(treebank: str) -> None:
+    """Print the cost of building and checking the trees of treebank with and without
+    interning.
+    """
+    results = {}
+    for mode, interner in [('plain', None), ('interned', SubtreeInterner())]:
+        results[mode] = _build_and_check(treebank, interner)
+        build_time, check_time, retained, nodes = results[mode]
+        print(f'{mode:>9}: build {build_time:.3f}s, check {check_time:.3f}s, '
+              f'{retained / 1024:.0f} KB retained, {nodes} distinct nodes')
+    plain, interned = results['plain'], results['interned']
+    print(f'memory saved: {1 - interned[2] / plain[2]:.1%}, '
+          f'speedup: {(plain[0] + plain[1]) / (interned[0] + interned[1]):.2f}x')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--random':
+        corpus_treebank = random_treebank(int(sys.argv[2]))
+    elif len(sys.argv) > 2 and sys.argv[1] == '--ptb':
+        with open(sys.argv[2], encoding='utf-8') as ptb_file:
+            corpus_treebank = ptb_file.read()
+    elif len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as corpus:
+            corpus_treebank = parse_treebank([line.strip() for line in corpus
+                                              if line.strip() != ''])
+    else:
+        from benchmark_memory import SAMPLE_TEXT
+        corpus_treebank = parse_treebank([SAMPLE_TEXT] * 200)
+    run_benchmark(corpus_treebank)
@@ -0,0 +1,88 @@
+"""
+This file contains a benchmark of the construction cost of eager GrammarCheckingTree
+objects and LazyGrammarCheckingTree objects (see lazy_tree.py) for each rule selection.
+
+For every single rule and for all rules ("*"), the trees of a corpus are built and
+checked both ways, and the time and the proportion of tree nodes built are printed.
+Parsing is not timed: with a treebank, the trees are read from their PTB bracket
+notation; otherwise the texts of benchmark_quantization.CORPUS are parsed once up front,
+and the eager trees are converted from the benepar parse (as translator.translate does)
+while the lazy trees are built from the parse strings.
+
+Usage:
+    python benchmark_lazy.py [treebank.mrg] [repeats]
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import sys
+import time
+from typing import Any, Callable
+from benchmark_rules import count_nodes
+from grammar_checking_tree import GrammarCheckingTree
+from lazy_tree import LazyGrammarCheckingTree, lazy_tree
+from tree_io import iter_ptb_strings, read_ptb
+
+SELECTIONS = [['r1'], ['r2'], ['r3'], ['r4'], ['r5'], ['r6'], ['r7'], ['r8'], ['r9'], ['*']]
+
+
+def measure(build: Callable[[Any], GrammarCheckingTree], sources: list[Any], rules: list[str],
+            repeats: int) -> tuple[float, int]:
+    """Return the smallest time in seconds of repeats runs of building the tree of every
+    source with build and checking rules on it, and the number of tree nodes built.
+    """
+    best = float('inf')
+    built = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        trees = [build(source) for source in sources]
+        for tree in trees:
+            tree.check_rules(rules)
+        best = min(best, time.perf_counter() - start)
+        built = sum(tree.built_size() if isinstance(tree, LazyGrammarCheckingTree)
+                    else count_nodes(tree) for tree in trees)
+    return best, built
+
+
+def treebank_builders(path: str) -> tuple[list[Any], Callable, Callable]:
+    """Return the trees of the treebank at path in PTB bracket notation, and the eager
+    and lazy functions that build a tree from its notation.
+    """
+    with open(path, encoding='utf-8') as treebank:
+        sources = list(iter_ptb_strings(treebank))
+    return sources, lambda s: next(read_ptb(io.StringIO(s))), \
+        lambda s: lazy_tree(s, unescape=True)
+
+
+def parser_builders() -> tuple[list[Any], Callable, Callable]:
+    """Return the parsed sentences of benchmark_quantization.CORPUS, and the eager and
+    lazy functions that build the tree of a parsed sentence.
+    """
+    # pylint: disable=import-outside-toplevel
+    from benchmark_quantization import CORPUS
+    from translator import nlp, _create_grammar_tree
+    sources = [sentence for text in CORPUS for sentence in nlp(text).sents]
+    return sources, _create_grammar_tree, \
+        lambda s: lazy_tree(str(s._.parse_string), merge_chains=True)
+
+
+def run_benchmark(sources: list[Any], eager: Callable, lazy: Callable, repeats: int) -> None:
+    """Print the time and the nodes built by eager and lazy construction for every rule
+    selection.
+    """
+    _, total = measure(eager, sources, ['r6'], 1)
+    print(f'{len(sources)} trees, {total} nodes')
+    print(f'{"rules":>5} {"eager ms":>9} {"lazy ms":>8} {"speedup":>8} {"nodes built":>12}')
+    for rules in SELECTIONS:
+        eager_time, _ = measure(eager, sources, rules, repeats)
+        lazy_time, built = measure(lazy, sources, rules, repeats)
+        print(f'{" ".join(rules):>5} {eager_time * 1000:>9.2f} {lazy_time * 1000:>8.2f} '
+              f'{eager_time / lazy_time:>7.2f}x {built / total:>12.1%}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run_benchmark(*treebank_builders(sys.argv[1]),
+                      int(sys.argv[2]) if len(sys.argv) > 2 else 5)
+    else:
+        run_benchmark(*parser_builders(), 5)
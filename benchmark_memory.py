@@ -0,0 +1,101 @@
+"""
+This file contains a memory benchmark comparing translate() with the memory-conscious
+check_stream() function across batch sizes.
+
+For every batch size, both the peak resident set size (VmHWM, reset before each run via
+/proc/self/clear_refs when possible) and the peak of Python allocations traced by
+tracemalloc are reported, relative to the memory in use before the run.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import gc
+import resource
+import tracemalloc
+from typing import Callable
+from translator import translate, check_stream
+
+SAMPLE_TEXT = "I live in a house near the mountains. " \
+              "I have two brothers and one sister, and I was born last. " \
+              "My grandmother cooks the best food! " \
+              "The quick brown fox jumped over the lazy dog."
+
+
+def _current_rss_kb() -> int:
+    """Return the current resident set size of this process in kilobytes."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def _peak_rss_kb() -> int:
+    """Return the peak resident set size of this process in kilobytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the peak resident set size of this process and return whether it succeeded.
+    Without a reset, the reported peak can only grow across runs, so batch sizes are
+    always measured in increasing order.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _measure(run: Callable[[list[str]], None], texts: list[str]) -> tuple[int, int]:
+    """Return the (peak RSS growth, tracemalloc peak) in kilobytes of run(texts)."""
+    gc.collect()
+    _reset_peak_rss()
+    rss_before = _current_rss_kb()
+    tracemalloc.start()
+    run(texts)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return max(_peak_rss_kb() - rss_before, 0), traced_peak // 1024
+
+
+def _run_eager(texts: list[str]) -> None:
+    """Translate the whole batch as one text, keep every tree, then check all of them."""
+    trees = translate(' '.join(texts))
+    for tree in trees:
+        tree.check_selected_rules(["*"])
+
+
+def _run_streaming(texts: list[str]) -> None:
+    """Check every text with check_stream(), keeping only the feedback."""
+    for _ in check_stream(texts, ["*"], keep_trees=False):
+        pass
+
+
+def run_benchmark(batch_sizes: list[int]) -> None:
+    """Print the memory use of the eager and streaming modes for each batch size.
+
+    Preconditions:
+        - batch_sizes == sorted(batch_sizes)
+    """
+    # warm up the pipeline so that lazily allocated model buffers are not counted
+    _run_streaming([SAMPLE_TEXT])
+    print(f'{"batch":>8} {"mode":>10} {"peak RSS (KB)":>14} {"tracemalloc (KB)":>17}')
+    for batch_size in batch_sizes:
+        texts = [SAMPLE_TEXT] * batch_size
+        for mode, run in [('eager', _run_eager), ('streaming', _run_streaming)]:
+            rss_peak, traced_peak = _measure(run, texts)
+            print(f'{batch_size:>8} {mode:>10} {rss_peak:>14} {traced_peak:>17}')
+
+
+if __name__ == '__main__':
+    run_benchmark([10, 100, 1000])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['gc', 'resource', 'tracemalloc', 'typing', 'translator'],
+        'allowed-io': ['_current_rss_kb', '_reset_peak_rss', 'run_benchmark'],
+        'max-nested-blocks': 4
+    })
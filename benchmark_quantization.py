@@ -0,0 +1,129 @@
+"""
+This file contains a benchmark of the int8-quantised fast-inference mode of the parser
+(see translator.enable_fast_inference) and a report of its agreement with the
+full-precision parser.
+
+A fixed corpus is parsed with the full-precision model and then with the quantised
+model. The report contains the parse throughput of both models, the proportion of
+identical trees, the labeled bracket precision/recall/F1 of the quantised trees against
+the full-precision trees, and, for each of r1-r9, the proportion of sentences for which
+check_selected_rules produces the same feedback.
+
+Usage:
+    python benchmark_quantization.py [corpus.txt]
+where every non-empty line of corpus.txt is a text (by default, CORPUS is used).
+
+translator is only imported when a corpus is parsed, so that the agreement measures can
+be tested without the parsing model (see tests_quantization.py, which also checks the
+agreement of the quantised parser on CORPUS).
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import sys
+import time
+from collections import Counter
+from grammar_checking_tree import GrammarCheckingTree
+
+RULES = ['r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8', 'r9']
+
+CORPUS = [
+    'Many beautiful cars is in New York City.',
+    'This handsome professor have excellent reputation.',
+    'A girl are thinking and boys swims.',
+    'Computer science is cool!',
+    'want to have a lunch.',
+    'She beautiful.',
+    'The man who is handsome has a cool car.',
+    'The man who happy play.',
+    'Is he cool?',
+    'He eats eating',
+    'The man who likes eating and drinking.',
+    'A cool and clever Canadian man.',
+    'I live in a house near the mountains.',
+    'I have two brothers and one sister, and I was born last.',
+    'My grandmother cooks the best food!',
+    'The quick brown fox jumped over the lazy dog.',
+]
+
+
+def parse_corpus(texts: list[str]) -> tuple[list[GrammarCheckingTree], float]:
+    """Return the trees of every sentence of texts and the number of sentences parsed
+    per second.
+    """
+    from translator import translate_stream  # pylint: disable=import-outside-toplevel
+    start = time.perf_counter()
+    trees = [tree for _, _, tree in translate_stream(texts)]
+    return trees, len(trees) / (time.perf_counter() - start)
+
+
+def labeled_brackets(tree: GrammarCheckingTree) -> Counter:
+    """Return the multiset of (label, first leaf, end leaf) constituents of tree."""
+    brackets = Counter()
+    _add_brackets(tree, 0, brackets)
+    return brackets
+
+
+def _add_brackets(tree: GrammarCheckingTree, start: int, brackets: Counter) -> int:
+    """Add the constituents of tree, whose first leaf is the start-th leaf of the
+    sentence, to brackets and return the index of the leaf after tree.
+    """
+    if tree.subtrees == []:
+        return start + 1
+    end = start
+    for subtree in tree.subtrees:
+        end = _add_brackets(subtree, end, brackets)
+    brackets[(tree.root['label'], start, end)] += 1
+    return end
+
+
+def agreement_report(full: list[GrammarCheckingTree],
+                     quantised: list[GrammarCheckingTree]) -> dict[str, float]:
+    """Return the agreement of the quantised trees with the full-precision trees.
+
+    Preconditions:
+        - len(full) == len(quantised) and the trees at the same index are the same
+        sentence.
+    """
+    matched = gold_total = predicted_total = 0
+    for gold, predicted in zip(full, quantised):
+        gold_brackets, predicted_brackets = labeled_brackets(gold), labeled_brackets(predicted)
+        matched += sum((gold_brackets & predicted_brackets).values())
+        gold_total += sum(gold_brackets.values())
+        predicted_total += sum(predicted_brackets.values())
+    precision, recall = matched / predicted_total, matched / gold_total
+    report = {'identical trees': sum(g == p for g, p in zip(full, quantised)) / len(full),
+              'bracket precision': precision,
+              'bracket recall': recall,
+              'bracket F1': 2 * precision * recall / (precision + recall)}
+    for rule in RULES:
+        same = sum(g.check_selected_rules([rule]) == p.check_selected_rules([rule])
+                   for g, p in zip(full, quantised))
+        report[f'{rule} feedback'] = same / len(full)
+    return report
+
+
+def run_benchmark(texts: list[str]) -> None:
+    """Print the throughput and agreement report of the quantised parser on texts."""
+    from translator import enable_fast_inference  # pylint: disable=import-outside-toplevel
+    parse_corpus(texts[:1])
+    full, full_speed = parse_corpus(texts)
+    enable_fast_inference()
+    parse_corpus(texts[:1])
+    quantised, quantised_speed = parse_corpus(texts)
+    print(f'full precision: {full_speed:.1f} sentences/s')
+    print(f'int8 quantised: {quantised_speed:.1f} sentences/s '
+          f'({quantised_speed / full_speed:.2f}x)')
+    if len(full) != len(quantised):
+        print('the models split the corpus into different sentences; no agreement report')
+        return
+    for name, value in agreement_report(full, quantised).items():
+        print(f'{name:>18}: {value:.2%}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as corpus:
+            corpus_texts = [line.strip() for line in corpus if line.strip() != '']
+    else:
+        corpus_texts = CORPUS
+    run_benchmark(corpus_texts)
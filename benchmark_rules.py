@@ -0,0 +1,97 @@
+"""
+This file contains a synthetic scaling benchmark of check_adjective (r7) and check_verb
+(r8) on trees from 10 to 10,000 nodes.
+
+Two families of trees are built without parsing any text:
+    - a long coordinated NP, "cool cars and cool cars and ...", in which every conjunct
+    is an NP with an adjective;
+    - a deep nesting of clauses, "he is cool that he is cool that ... he is swimming",
+    in which every S contains a VP whose last subtree is an SBAR.
+For every tree the time per node is printed; it stays roughly constant as the trees grow
+when both rules take time linear in the size of the tree. That both rules give the same
+feedback as before they were made linear is tested in tests_grammar_checking_tree.py.
+
+Usage:
+    python benchmark_rules.py [repeats]
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import sys
+import time
+from typing import Callable
+from grammar_checking_tree import GrammarCheckingTree
+
+SIZES = [10, 100, 1000, 10000]
+
+
+def coordinated_np(size: int) -> GrammarCheckingTree:
+    """Return a coordinated NP of about size nodes."""
+    conjuncts = []
+    # each conjunct and its conjunction is 4 nodes
+    for _ in range(max(1, size // 4)):
+        if conjuncts:
+            conjuncts.append(GrammarCheckingTree('CC', [], 'and'))
+        conjuncts.append(GrammarCheckingTree('NP', [GrammarCheckingTree('JJ', [], 'cool'),
+                                                    GrammarCheckingTree('NNS', [], 'cars')]))
+    return GrammarCheckingTree('S', [GrammarCheckingTree('NP', conjuncts),
+                                     GrammarCheckingTree('.', [], '.')])
+
+
+def nested_clauses(size: int) -> GrammarCheckingTree:
+    """Return a deep nesting of clauses of about size nodes, whose innermost clause
+    contains a verb-ing.
+    """
+    tree = GrammarCheckingTree('S', [
+        GrammarCheckingTree('NP', [GrammarCheckingTree('PRP', [], 'he')]),
+        GrammarCheckingTree('VP', [GrammarCheckingTree('VBZ', [], 'is'),
+                                   GrammarCheckingTree('VP', [
+                                       GrammarCheckingTree('VBG', [], 'swimming')])])])
+    # each level of nesting is 9 nodes
+    for _ in range(max(0, size // 9 - 1)):
+        tree = GrammarCheckingTree('S', [
+            GrammarCheckingTree('NP', [GrammarCheckingTree('PRP', [], 'he')]),
+            GrammarCheckingTree('VP', [
+                GrammarCheckingTree('VBZ', [], 'is'),
+                GrammarCheckingTree('ADJP', [GrammarCheckingTree('JJ', [], 'cool')]),
+                GrammarCheckingTree('SBAR', [GrammarCheckingTree('IN', [], 'that'), tree])])])
+    return tree
+
+
+def count_nodes(tree: GrammarCheckingTree) -> int:
+    """Return the number of nodes in tree."""
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.subtrees)
+    return count
+
+
+def measure(check: Callable[[], object], repeats: int) -> float:
+    """Return the smallest time in seconds of repeats calls of check."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        check()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(repeats: int) -> None:
+    """Print the time per node of check_adjective and check_verb on every synthetic tree."""
+    # the rules recurse once per level of the deepest trees
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * max(SIZES)))
+    print(f'{"tree":>15} {"nodes":>6} {"check_adjective":>19} {"check_verb":>14}')
+    for name, build in [('coordinated NP', coordinated_np), ('nested clauses', nested_clauses)]:
+        for size in SIZES:
+            tree = build(size)
+            nodes = count_nodes(tree)
+            adjective = measure(lambda: tree.check_adjective(), repeats) / nodes
+            verb = measure(lambda: tree.check_verb(), repeats) / nodes
+            print(f'{name:>15} {nodes:>6} {adjective * 1e6:>14.3f} us/n '
+                  f'{verb * 1e6:>9.3f} us/n')
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
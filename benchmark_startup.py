@@ -0,0 +1,87 @@
+"""
+This file contains a benchmark of the startup time and the memory of worker processes
+for every way of loading the word vectors of the parsing model (see
+translator.load_pipeline).
+
+For each mode, the given number of worker processes import translator at the same time
+with settings.VECTORS_VARIABLE set to the mode and parse a sentence. Once every worker has
+started, the memory of each worker is measured (see prefork.process_memory) and the
+average startup time, RSS, PSS (shared pages divided among the processes sharing them)
+and USS (pages used only by that worker) are printed. The vectors are exported to the
+given .npy file first if it does not exist.
+
+Usage:
+    python benchmark_startup.py [workers] [vectors.npy]
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import json
+import os
+import subprocess
+import sys
+from settings import VECTORS_VARIABLE
+
+# the code run by every worker: report the startup time, wait for every worker to
+# start, then report the memory
+WORKER = '''
+import json, os, sys, time
+start = time.perf_counter()
+import translator
+translator.translate('He is cool.')
+print(time.perf_counter() - start, flush=True)
+sys.stdin.readline()
+from prefork import process_memory
+print(json.dumps(process_memory(os.getpid())), flush=True)
+'''
+
+
+def export(path: str) -> None:
+    """Export the word vectors of the parsing model to the .npy file at path."""
+    subprocess.run([sys.executable, '-c',
+                    f'import translator; translator.export_vectors({path!r})'],
+                   env=_environment('load'), check=True)
+
+
+def measure(mode: str, workers: int) -> dict[str, float]:
+    """Return the average startup time in seconds ("startup") and memory in kilobytes
+    ("rss", "pss" and "uss") of workers processes that load the vectors with mode.
+    """
+    processes = [subprocess.Popen([sys.executable, '-c', WORKER], env=_environment(mode),
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                 for _ in range(workers)]
+    startup = [float(process.stdout.readline()) for process in processes]
+    memory = []
+    for process in processes:
+        process.stdin.write('\n')
+        process.stdin.flush()
+        memory.append(json.loads(process.stdout.readline()))
+    for process in processes:
+        process.communicate()
+    return {'startup': sum(startup) / workers,
+            **{field: sum(m[field] for m in memory) / workers for field in ['rss', 'pss', 'uss']}}
+
+
+def _environment(mode: str) -> dict[str, str]:
+    """Return the environment of a worker that loads the vectors with mode."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return {**os.environ, VECTORS_VARIABLE: mode,
+            'PYTHONPATH': os.pathsep.join(filter(None, [directory,
+                                                         os.environ.get('PYTHONPATH')]))}
+
+
+def run_benchmark(workers: int, vectors_path: str) -> None:
+    """Print the startup time and the memory per worker for every vectors mode."""
+    if not os.path.exists(vectors_path):
+        export(vectors_path)
+    print(f'{workers} workers')
+    print(f'{"vectors":>12} {"startup s":>10} {"RSS MB":>8} {"PSS MB":>8} {"USS MB":>8}')
+    for mode in ['load', 'none', vectors_path]:
+        result = measure(mode, workers)
+        print(f'{os.path.basename(mode):>12} {result["startup"]:>10.2f} '
+              f'{result["rss"] / 1024:>8.1f} {result["pss"] / 1024:>8.1f} '
+              f'{result["uss"] / 1024:>8.1f}')
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+                  sys.argv[2] if len(sys.argv) > 2 else 'vectors.npy')
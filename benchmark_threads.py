@@ -0,0 +1,65 @@
+"""
+This file contains a scaling benchmark that runs batch_check.py on a corpus with every
+split of this machine's cores into worker processes x parser threads per process, and
+recommends the split with the highest throughput.
+
+Each configuration runs batch_check.py with --prefork --pin-cores, so the parsing model
+is loaded once per run and the workers do not compete for cores. The measured time
+includes loading the model, so the corpus should take at least a few minutes to check
+for the comparison to be meaningful.
+
+Usage:
+    python benchmark_threads.py corpus.txt [max_cores]
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def splits(cores: int) -> list[tuple[int, int]]:
+    """Return the (processes, threads) splits to benchmark on the given number of cores:
+    every pair of powers of two (and cores itself) whose product is at most cores.
+    """
+    counts = sorted({2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores} | {cores})
+    return [(processes, threads) for processes in counts for threads in counts
+            if processes * threads <= cores]
+
+
+def measure(corpus: str, processes: int, threads: int) -> float:
+    """Return the number of sentences per second checked by batch_check.py on corpus with
+    the given number of worker processes and parser threads per process.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'batch_check.py')
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'feedback.jsonl')
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script, corpus, '-o', output,
+                        '-j', str(processes), '--threads', str(threads),
+                        '--interop-threads', '1', '--prefork', '--pin-cores'], check=True)
+        elapsed = time.perf_counter() - start
+        with open(output, encoding='utf-8') as feedback:
+            sentences = sum(1 for _ in feedback)
+    return sentences / elapsed
+
+
+def run_benchmark(corpus: str, cores: int) -> tuple[int, int]:
+    """Print the throughput of every split of cores on corpus and return the best
+    (processes, threads) split.
+    """
+    results = {}
+    print(f'{"processes":>9} {"threads":>7} {"sentences/s":>12}')
+    for processes, threads in splits(cores):
+        results[(processes, threads)] = measure(corpus, processes, threads)
+        print(f'{processes:>9} {threads:>7} {results[(processes, threads)]:>12.1f}')
+    best = max(results, key=results.get)
+    print(f'recommended: {best[0]} processes x {best[1]} threads')
+    return best
+
+
+if __name__ == '__main__':
+    max_cores = int(sys.argv[2]) if len(sys.argv) > 2 else len(os.sched_getaffinity(0))
+    run_benchmark(sys.argv[1], max_cores)
@@ -0,0 +1,180 @@
+"""
+This file contains the FeedbackTable class, which stores the feedback of many sentences
+as columnar NumPy arrays, and the check_table() and check_texts() functions, which check
+batches of sentences and return their feedback as a FeedbackTable.
+
+A FeedbackTable has one row per checked rule of every sentence, and the columns
+    - doc: the id of the document of the sentence,
+    - sentence: the index of the sentence in its document,
+    - rule: the index of the rule in RULES (e.g. 0 for "r1"),
+    - type: the type of the Feedback (1, 2 or 3, see Feedback),
+    - message: the index of the message of the Feedback in the messages table,
+where every distinct message text is stored once in the messages table. The rows are
+appended to compact typed buffers while checking, so no per-row Python object (such as
+the strings of check_selected_rules) outlives its sentence.
+
+A FeedbackTable is saved to a directory as one .npy file per column (see numpy.save) and
+a JSON file of the messages table, and the columns can be loaded back as memory maps, so
+analysis jobs can read tables of any size without copying them into memory:
+
+    table = check_texts(texts, ["*"])
+    table.save('feedback/')
+    table = FeedbackTable.load('feedback/')
+    errors = table.doc[table.type == 2]
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import array
+import json
+import os
+from typing import Iterable
+import numpy as np
+from grammar_checking_tree import GrammarCheckingTree
+
+RULES = ['r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8', 'r9']
+
+# the NumPy type of each column and the code of the array.array of the same type
+COLUMNS = {'doc': np.int64, 'sentence': np.int32, 'rule': np.int8, 'type': np.int8,
+           'message': np.int32}
+_ARRAY_CODES = {'doc': 'q', 'sentence': 'i', 'rule': 'b', 'type': 'b', 'message': 'i'}
+_MESSAGES_FILE = 'messages.json'
+
+
+class FeedbackTable:
+    """
+    The feedback of a batch of sentences as columnar NumPy arrays.
+    Instance Attributes:
+        - doc, sentence, rule, type, message:
+            The columns of the table (see the description of this file).
+        - messages:
+            The messages table: messages[m] is the text of the message with index m.
+    Representation Invariants:
+        - len(self.doc) == len(self.sentence) == len(self.rule) == len(self.type) \
+          == len(self.message)
+        - all(0 <= m < len(self.messages) for m in self.message)
+    """
+    doc: np.ndarray
+    sentence: np.ndarray
+    rule: np.ndarray
+    type: np.ndarray
+    message: np.ndarray
+    messages: list[str]
+
+    def __init__(self, doc: np.ndarray, sentence: np.ndarray, rule: np.ndarray,
+                 type: np.ndarray, message: np.ndarray, messages: list[str]) -> None:
+        self.doc = doc
+        self.sentence = sentence
+        self.rule = rule
+        self.type = type
+        self.message = message
+        self.messages = messages
+
+    def __len__(self) -> int:
+        """Return the number of rows of this table."""
+        return len(self.doc)
+
+    def row(self, index: int) -> tuple[int, int, str, int, str]:
+        """Return the (doc, sentence, rule, type, message text) of the row with the given
+        index.
+        """
+        return (int(self.doc[index]), int(self.sentence[index]), RULES[self.rule[index]],
+                int(self.type[index]), self.messages[self.message[index]])
+
+    def save(self, directory: str) -> None:
+        """Save this table to the given directory, creating it if it does not exist."""
+        os.makedirs(directory, exist_ok=True)
+        for column in COLUMNS:
+            np.save(os.path.join(directory, column + '.npy'), getattr(self, column))
+        with open(os.path.join(directory, _MESSAGES_FILE), 'w', encoding='utf-8') as file:
+            json.dump(self.messages, file)
+
+    @staticmethod
+    def load(directory: str, mmap: bool = True) -> 'FeedbackTable':
+        """Return the table saved to the given directory. If mmap is True, the columns are
+        read-only memory maps of the saved files rather than copies in memory.
+        """
+        columns = [np.load(os.path.join(directory, column + '.npy'),
+                           mmap_mode='r' if mmap else None) for column in COLUMNS]
+        with open(os.path.join(directory, _MESSAGES_FILE), encoding='utf-8') as file:
+            messages = json.load(file)
+        return FeedbackTable(*columns, messages)
+
+    @staticmethod
+    def concatenate(tables: list['FeedbackTable']) -> 'FeedbackTable':
+        """Return the table of the rows of all the given tables, in order, with a single
+        messages table (e.g. to combine the tables of batches checked by different
+        processes).
+        """
+        message_ids = {}
+        columns = {column: [] for column in COLUMNS}
+        for table in tables:
+            # the index in the new messages table of every message of table
+            remap = np.array([message_ids.setdefault(text, len(message_ids))
+                              for text in table.messages], dtype=COLUMNS['message'])
+            for column in COLUMNS:
+                values = np.asarray(getattr(table, column))
+                columns[column].append(remap[values] if column == 'message' else values)
+        return FeedbackTable(*(np.concatenate(columns[column]).astype(dtype, copy=False)
+                               if columns[column] else np.zeros(0, dtype)
+                               for column, dtype in COLUMNS.items()), list(message_ids))
+
+
+def check_table(sentences: Iterable[tuple[int, int, GrammarCheckingTree]],
+                rules: list[str]) -> FeedbackTable:
+    """Return the FeedbackTable of checking rules on the tree of every (doc, sentence,
+    tree) tuple in sentences, where doc is the id of the document of the sentence and
+    sentence is its index in the document.
+
+    Preconditions:
+        - rules satisfies the precondition of check_selected_rules.
+    """
+    rule_ids = {rule: index for index, rule in enumerate(RULES)}
+    message_ids = {}
+    buffers = {column: array.array(code) for column, code in _ARRAY_CODES.items()}
+    for doc, sentence, tree in sentences:
+        for rule, fb in tree.check_rules(rules):
+            buffers['doc'].append(doc)
+            buffers['sentence'].append(sentence)
+            buffers['rule'].append(rule_ids[rule])
+            buffers['type'].append(fb.type)
+            buffers['message'].append(message_ids.setdefault(fb.message, len(message_ids)))
+    return FeedbackTable(*(np.frombuffer(buffers[column], dtype=dtype)
+                           for column, dtype in COLUMNS.items()), list(message_ids))
+
+
+def check_texts(texts: Iterable[str], rules: list[str], lazy: bool = False) -> FeedbackTable:
+    """Return the FeedbackTable of checking rules on every sentence of texts, where the
+    id of the document of a sentence is the index of its text in texts. The trees are
+    built as in translator.translate() with the given lazy.
+
+    Preconditions:
+        - every text in texts satisfies the precondition of translator.translate().
+        - rules satisfies the precondition of check_selected_rules.
+    """
+    from translator import translate_stream  # pylint: disable=import-outside-toplevel
+    return check_table(_number_sentences(translate_stream(texts, lazy=lazy)), rules)
+
+
+def _number_sentences(sentences: Iterable[tuple[int, int, GrammarCheckingTree]]) -> \
+        Iterable[tuple[int, int, GrammarCheckingTree]]:
+    """Yield a (text_index, sentence_index, tree) tuple for every (text_index, start_char,
+    tree) tuple of translator.translate_stream(), where sentence_index is the index of
+    the sentence in its text.
+    """
+    last_index, sentence_index = -1, 0
+    for text_index, _, tree in sentences:
+        sentence_index = sentence_index + 1 if text_index == last_index else 0
+        last_index = text_index
+        yield text_index, sentence_index, tree
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'W0622'],
+        'extra-imports': ['array', 'json', 'os', 'typing', 'numpy', 'grammar_checking_tree',
+                          'translator'],
+        'allowed-io': ['save', 'load'],
+        'max-nested-blocks': 4
+    })
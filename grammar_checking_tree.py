@@ -4,6 +4,10 @@ that represents a constituent parse tree of an English sentence. This class has
 for checking grammar rules.
 This file also contains the Feedback class, which represents a grammar-checking
 feedback returned by the grammar-checking methods in GrammarCheckingTree.
+
+The grammar-checking methods never modify the tree they check and keep no state between
+calls (every call returns new Feedback objects), so any number of threads may check the
+same or different trees at the same time.
 This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
 """
 from typing import Optional
@@ -18,14 +22,19 @@ class Feedback:
         - type: integer representing the type of feedback.
         - type: string description of the type of feedback.
         - message: message accompanied with the feedback.
+        - sentence_span: the (start, end) character offsets in the original text of the
+          whole sentence the feedback refers to (not of the part of it the feedback is
+          about), or None if they are unknown.
     Representation Invariants:
         - self.type_str in {"Possible Error", "Test Ineffective", "Error Undetected"}
     """
     type: int
     type_str: str
     message: str
+    sentence_span: Optional[tuple[int, int]]
 
-    def __init__(self, type: int, msg: str = "") -> None:
+    def __init__(self, type: int, msg: str = "",
+                 sentence_span: Optional[tuple[int, int]] = None) -> None:
         """
         Precondition:
             - type in [1, 2, 3]
@@ -35,6 +44,7 @@ class Feedback:
         self.type = type
         self.type_str = type_map[type]
         self.message = msg
+        self.sentence_span = sentence_span
 
 
 class GrammarCheckingTree(GrammarTree):
@@ -54,6 +64,24 @@ class GrammarCheckingTree(GrammarTree):
         """Checks the selected grammar rules on the tree and return feedback.
         Note that if the input list contains only "*", the function checks all
         implemented grammar rules on the tree and return feedback.
+        Preconditions:
+            - every element in rules_lst are keys in methods_mapping defined in
+            check_rules or rules_lst == ["*"].
+        """
+        feedback = []
+        for rule, fb in self.check_rules(rules_lst):
+            if fb.message == "":
+                feedback.append(f'{rule}: {fb.type_str}.')
+            else:
+                feedback.append(f'{rule}: {fb.type_str}. {fb.message}')
+        return feedback
+
+    def check_rules(self, rules_lst: list[str]) -> list[tuple[str, Feedback]]:
+        """Checks the selected grammar rules on the tree and return a (rule, feedback)
+        tuple for each checked rule, in the order the rules are checked. The sentence_span
+        of each Feedback is the span of this tree (see GrammarTree.set_source).
+        Note that if the input list contains only "*", the function checks all
+        implemented grammar rules on the tree.
         Preconditions:
             - every element in rules_lst are keys in methods_mapping or
             rules_lst == ["*"].
@@ -77,15 +105,9 @@ class GrammarCheckingTree(GrammarTree):
         else:
             checks_lst = rules_lst
         for rule in checks_lst:
-            if rule in {'r7', 'r8'}:
-                # r7 and r8 needs an extra [] as argument
-                fb = methods_mapping[rule]([])
-            else:
-                fb = methods_mapping[rule]()
-            if fb.message == "":
-                feedback.append(f'{rule}: {fb.type_str}.')
-            else:
-                feedback.append(f'{rule}: {fb.type_str}. {fb.message}')
+            fb = methods_mapping[rule]()
+            fb.sentence_span = self.span
+            feedback.append((rule, fb))
         return feedback
 
     # ----------------------------------------------------------------
@@ -238,8 +260,8 @@ class GrammarCheckingTree(GrammarTree):
         else:
             return Feedback(1, "Sentence is complete.")
 
-    def check_adjective(self, result_so_far: list, whether_question: Optional[bool] = False) -> \
-            Feedback:
+    def check_adjective(self, result_so_far: Optional[list] = None,
+                        whether_question: Optional[bool] = False) -> Feedback:
         """Check whether the adj in the sentence satisfies one of the cases bellow:
             1. adj is before a noun
             2. adj is after a linking verb
@@ -247,11 +269,19 @@ class GrammarCheckingTree(GrammarTree):
         eg. 'He is cool.' satisfies the case 2.
             'The man who play happy.' does not satisfy both cases.
 
+        Every subtree is checked at most once and contain_type() takes constant time, so
+        this method takes time linear in the size of the tree.
+
+        result_so_far collects the evidence found in the subtrees checked so far; it is
+        only passed by the recursive calls, and a new list is used when it is None.
+
         IMPORTANT: This method may be ineffective for certain sentence types (see
         Discussion in project report).
 
         Example usages see main.py.
         """
+        if result_so_far is None:
+            result_so_far = []
         if self.contain_type('JJ') or self.contain_type('ADJP'):
             # check the type of self first
             if self.root['label'] == 'SQ':
@@ -368,15 +398,23 @@ class GrammarCheckingTree(GrammarTree):
         else:
             return Feedback(2, 'no adj inside or use adj wrongly')
 
-    def check_verb(self, result_so_far: list) -> Feedback:
+    def check_verb(self, result_so_far: Optional[list] = None) -> Feedback:
         """check whether the verb-ing form in the sentence satisfies the case below:
             case1: be-verb/like + verbing
 
         eg. 'He is drinking.' satisfies it.
             'The man who likes drinking is happy.' satisfies it.
 
+        Every subtree is checked at most once and contain_type() takes constant time, so
+        this method takes time linear in the size of the tree.
+
+        result_so_far collects the evidence found in the subtrees checked so far; it is
+        only passed by the recursive calls, and a new list is used when it is None.
+
         Example usages see main.py.
         """
+        if result_so_far is None:
+            result_so_far = []
 
         if self.contain_type('VBG'):
             # check the type of self
@@ -396,6 +434,8 @@ class GrammarCheckingTree(GrammarTree):
                     if result.message != 'no verb_ing inside or use verb_ing incorrectly' \
                             and result.type != 1:
                         return result
+                # checking the subtrees again (as below) would give the same results
+                return Feedback(1, 'can not easily judge')
 
             # If VP or S contains VBG
             if self.root['label'] == 'VP' or self.root['label'] == 'S':
@@ -420,6 +460,7 @@ class GrammarCheckingTree(GrammarTree):
                     if result.message != 'no verb_ing inside or use verb_ing incorrectly' \
                             and result.type != 1:
                         return result
+                return Feedback(1, 'can not easily judge')
 
             # not types listed above
             for x in self.subtrees:
@@ -441,8 +482,10 @@ class GrammarCheckingTree(GrammarTree):
         if self.contain_type('CC'):
             for i in range(0, len(self.subtrees)):
                 if self.subtrees[i].root['label'] == 'CC' and \
-                        self.subtrees[i - 1].subtrees != self.subtrees[i + 1].subtrees:
+                        self.subtrees[i - 1].children_shape_fingerprint != \
+                        self.subtrees[i + 1].children_shape_fingerprint:
                     # if they are parallel, the type of them are the same.
+                    # (the shapes of the two sides are compared in constant time)
                     return Feedback(2, 'hard to determinate: the left side of the '
                                        'conjunction is not parallel to the right side.')
 
@@ -4,6 +4,26 @@ that represents a constituent parse tree of an English sentence.
 
 This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
 """
+import threading
+from typing import Optional
+
+# the bit of each constituent tag in the label masks of trees, assigned on first use;
+# _label_lock is held while a new tag is assigned its bit, so that trees built in
+# different threads never give two tags the same bit
+_LABEL_BITS = {}
+_label_lock = threading.Lock()
+
+
+def label_bit(label: str) -> int:
+    """Return the bit that represents the given constituent tag in label masks."""
+    bit = _LABEL_BITS.get(label)
+    if bit is None:
+        with _label_lock:
+            bit = _LABEL_BITS.get(label)
+            if bit is None:
+                bit = 1 << len(_LABEL_BITS)
+                _LABEL_BITS[label] = bit
+    return bit
 
 
 class GrammarTree:
@@ -19,15 +39,91 @@ class GrammarTree:
             Stores a list of GrammarTree objects that represent children of the
             constituent parse tree this GrammarTree is representing. subtrees is
             empty means this GrammarTree represents a constituent parse tree of a word.
+        - fingerprint:
+            A hash of the constituent tags and words of the whole tree, computed from the
+            fingerprints of the subtrees when the tree is constructed.
+        - shape_fingerprint:
+            A hash of the constituent tags (but not the words) of the whole tree.
+        - children_shape_fingerprint:
+            A hash of the constituent tags of the subtrees, i.e. shape_fingerprint without
+            the tag of the root.
+        - label_mask:
+            The bitwise or of label_bit() of every constituent tag in the tree, computed
+            from the label masks of the subtrees when the tree is constructed.
+        - leaf_offsets:
+            None, or, if set_source() was called, the (start, end) character offsets of
+            the words/punctuation marks of the tree in the original text.
+        - span:
+            None, or, if set_source() was called, the (start, end) character offsets of
+            the whole tree in the original text.
+    Private Instance Attributes:
+        - _texts:
+            None, or, if this tree is frozen, the set of the words/punctuation marks in
+            this tree.
+        - _leaves:
+            None, or, if set_source() was called, the words/punctuation marks of the tree.
     Representation Invariants:
         - (self.subtrees == []) == (self.root["text"] != "")
+
+    Two GrammarTree objects are equal when they have the same constituent tags and words
+    in the same shape. Comparing trees with different fingerprints takes constant time,
+    and GrammarTree objects can be used as dict keys and set elements. Since the
+    fingerprints are computed on construction, a tree must not be modified once it has
+    been used as the subtree of another tree.
+    Note that fingerprints, like hash(), differ between Python processes.
     """
     root: dict[str: str]
     subtrees: list["GrammarTree"]
+    fingerprint: int
+    shape_fingerprint: int
+    children_shape_fingerprint: int
+    label_mask: int
+    leaf_offsets: Optional[list[tuple[int, int]]]
+    span: Optional[tuple[int, int]]
+    _texts: Optional[frozenset]
+    _leaves: Optional[list[str]]
 
     def __init__(self, label: str, subtrees: list["GrammarTree"], text: str = "") -> None:
         self.root = {"label": label, "text": text}
         self.subtrees = subtrees
+        self.fingerprint = hash((label, text, tuple(s.fingerprint for s in subtrees)))
+        self.children_shape_fingerprint = hash(tuple(s.shape_fingerprint for s in subtrees))
+        self.shape_fingerprint = hash((label, self.children_shape_fingerprint))
+        self.label_mask = label_bit(label)
+        for subtree in subtrees:
+            self.label_mask |= subtree.label_mask
+        self.leaf_offsets = None
+        self.span = None
+        self._texts = None
+        self._leaves = None
+
+    def __eq__(self, other: object) -> bool:
+        """Return whether this tree has the same constituent tags and words in the same
+        shape as other.
+        """
+        if self is other:
+            return True
+        elif not isinstance(other, GrammarTree) or self.fingerprint != other.fingerprint:
+            return False
+        else:
+            return self.root == other.root and self.subtrees == other.subtrees
+
+    def __hash__(self) -> int:
+        """Return the hash of this tree, which is its fingerprint."""
+        return self.fingerprint
+
+    def freeze(self) -> None:
+        """Mark this tree as immutable, so that the words it contains are computed once and
+        reused by contain_content().
+
+        Preconditions:
+            - every subtree of this tree is frozen.
+            - neither this tree nor any of its subtrees is modified afterwards.
+        """
+        texts = {self.root['text']}
+        for subtree in self.subtrees:
+            texts.update(subtree._texts)
+        self._texts = frozenset(texts)
 
     def __str__(self) -> str:
         """Return a string representation of this tree.
@@ -38,16 +134,22 @@ class GrammarTree:
         """Return an indented string representation of this tree.
         The indentation level is specified by the <depth> parameter.
         """
+        lines = []
+        self._str_lines(depth, lines)
+        return ''.join(lines)
+
+    def _str_lines(self, depth: int, lines: list[str]) -> None:
+        """Append the lines of the indented string representation of this tree to lines.
+        The indentation level is specified by the <depth> parameter.
+        """
         if self.root == []:
-            return ''
+            return
+        if len(self.root["text"]) > 0:
+            lines.append('  ' * depth + f'{self.root["label"]}: {self.root["text"]}\n')
         else:
-            if len(self.root["text"]) > 0:
-                s = '  ' * depth + f'{self.root["label"]}: {self.root["text"]}\n'
-            else:
-                s = '  ' * depth + f'{self.root["label"]}\n'
-            for subtree in self.subtrees:
-                s += subtree._str_indented(depth + 1)
-            return s
+            lines.append('  ' * depth + f'{self.root["label"]}\n')
+        for subtree in self.subtrees:
+            subtree._str_lines(depth + 1, lines)
 
     def find_the_last(self) -> str:
         """Return the end punctuation of the sentence represented by the tree, if
@@ -61,43 +163,69 @@ class GrammarTree:
 
     def contain_type(self, kind: str) -> bool:
         """Return whether the entire tree contains the input type of constituent tag.
+        This takes constant time, since it only looks up self.label_mask.
         Example usages see test_contain_type() in tests_grammar_tree_methods.py.
         """
-        if self.root['label'] == kind:
-            return True
-        else:
-            return any(i.contain_type(kind) for i in self.subtrees)
+        # a tag that has no bit yet is in no tree, and looking it up does not assign one
+        bit = _LABEL_BITS.get(kind)
+        return bit is not None and self.label_mask & bit != 0
 
     def contain_content(self, word_or_punc: str) -> bool:
         """Return whether the entire tree contains the input word/punctuation mark.
         Example usages see test_contain_content() in tests_grammar_tree_methods.py.
         """
-        if self.root['text'] == word_or_punc:
+        if self._texts is not None:
+            return word_or_punc in self._texts
+        elif self.root['text'] == word_or_punc:
             return True
         else:
             return any(i.contain_content(word_or_punc) for i in self.subtrees)
 
     def get_sentence(self) -> str:
         """Returns the English sentence represented by the tree.
+        The words/punctuation marks are separated by spaces, except that there is no space
+        before ",", ".", "!" or "?", wherever it is in the tree (including at the start of
+        a nested phrase, as in "He, I think, is cool.").
         Example usages see test_get_sentence() in tests_grammar_tree_methods.py.
         """
-        if self.root["text"] != "":
-            # self is a leaf
-            return self.root["text"]
-        else:
-            sent_lst = []
-            for subtree in self.subtrees:
-                sent_lst.append(subtree.get_sentence())
-            sent_lst = [v for v in sent_lst if v != ""]
-
+        sent_lst = []
+        for word in self.leaves():
+            if word == "":
+                continue
             # remove the space between a word and a succeeding punctuation
-            punc_index_lst = [i for i, x in enumerate(sent_lst) if x in {",", ".", "!", "?"}]
-            sent_lst_partitioned = [sent_lst[i:j] for i, j in
-                                    zip([0] + punc_index_lst, punc_index_lst + [None])]
-            sent = ""
-            for lst in sent_lst_partitioned:
-                sent += " ".join(lst)
-            return sent
+            if sent_lst and word not in {",", ".", "!", "?"}:
+                sent_lst.append(" ")
+            sent_lst.append(word)
+        return "".join(sent_lst)
+
+    def leaves(self) -> list[str]:
+        """Return the words/punctuation marks of the tree from left to right.
+        If set_source() was called on this tree, the stored list (which must not be
+        modified) is returned without traversing the tree.
+        """
+        if self._leaves is not None:
+            return self._leaves
+        leaves = []
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            if tree.subtrees == []:
+                leaves.append(tree.root["text"])
+            else:
+                stack.extend(reversed(tree.subtrees))
+        return leaves
+
+    def set_source(self, leaf_offsets: list[tuple[int, int]]) -> None:
+        """Store the words/punctuation marks of the tree together with the (start, end)
+        character offsets of each of them in the original text, and set self.span.
+
+        Preconditions:
+            - len(leaf_offsets) == len(self.leaves())
+            - leaf_offsets != []
+        """
+        self._leaves = self.leaves()
+        self.leaf_offsets = leaf_offsets
+        self.span = (leaf_offsets[0][0], leaf_offsets[-1][1])
 
 
 if __name__ == '__main__':
@@ -105,7 +233,7 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'max-line-length': 100,
         'disable': ['E1136'],
-        'extra-imports': [],
+        'extra-imports': ['threading', 'typing'],
         'allowed-io': [],
         'max-nested-blocks': 4
     })
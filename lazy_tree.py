@@ -0,0 +1,304 @@
+"""
+This file contains the LazyGrammarCheckingTree class, a GrammarCheckingTree whose
+subtrees are only built when they are first accessed, and lazy_tree(), which returns the
+LazyGrammarCheckingTree of a parse in PTB bracket notation (e.g. the parse_string of a
+sentence parsed by benepar).
+
+The parse is first flattened in a single pass into lists of the constituent tags, words
+and label masks of its nodes. A LazyGrammarCheckingTree is a view of one node of these
+lists: contain_type(), contain_content(), leaves() and the fingerprints are answered from
+the lists, and only the rules that look at subtrees build them, one level at a time. For
+example, check_complete_sentence() (r6) builds no subtree at all and
+existence_of_subject() (r5) only builds the children of the root; see
+benchmark_lazy.py for the construction cost of each rule.
+
+A LazyGrammarCheckingTree is equal (==) to the GrammarCheckingTree that tree_io.read_ptb
+returns for the same parse, and gives the same feedback for every rule. With
+merge_chains=True, it is instead equal to the tree translator._create_grammar_tree builds
+from the benepar spans of the parse (see lazy_tree()), which is how translator builds
+its lazy trees.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import re
+from typing import Optional
+from grammar_checking_tree import GrammarCheckingTree
+from grammar_tree import label_bit
+from tree_io import EMPTY_ELEMENT, normalize_label
+
+_TOKEN_RE = re.compile(r'\(|\)|[^\s()]+')
+_PTB_UNESCAPES = {'-LRB-': '(', '-RRB-': ')'}
+
+
+class _ParseData:
+    """
+    A parse tree flattened in preorder, shared by all the LazyGrammarCheckingTree objects
+    of the parse.
+    Instance Attributes:
+        - labels: labels[i] is the constituent tag of node i.
+        - texts: texts[i] is the word of node i, or "" if node i is not a word.
+        - ends: the descendants of node i are the nodes i + 1 to ends[i] - 1.
+        - masks: masks[i] is the label mask (see GrammarTree.label_mask) of node i.
+        - fingerprints:
+            None, or the (fingerprint, shape_fingerprint, children_shape_fingerprint)
+            lists of all nodes, once they have been computed.
+    """
+    labels: list[str]
+    texts: list[str]
+    ends: list[int]
+    masks: list[int]
+    fingerprints: Optional[tuple[list[int], list[int], list[int]]]
+
+    def __init__(self) -> None:
+        self.labels, self.texts, self.ends, self.masks = [], [], [], []
+        self.fingerprints = None
+
+    def children(self, index: int) -> list[int]:
+        """Return the indices of the children of node index."""
+        children = []
+        child = index + 1
+        while child < self.ends[index]:
+            children.append(child)
+            child = self.ends[child]
+        return children
+
+    def compute_fingerprints(self) -> tuple[list[int], list[int], list[int]]:
+        """Compute (once) and return the fingerprint lists of all nodes, which are the
+        fingerprints the GrammarCheckingTree of each node would have.
+        """
+        if self.fingerprints is None:
+            size = len(self.labels)
+            full, shape, children_shape = [0] * size, [0] * size, [0] * size
+            # in reverse preorder, the children of a node come before the node
+            for index in range(size - 1, -1, -1):
+                children = self.children(index)
+                full[index] = hash((self.labels[index], self.texts[index],
+                                    tuple(full[child] for child in children)))
+                children_shape[index] = hash(tuple(shape[child] for child in children))
+                shape[index] = hash((self.labels[index], children_shape[index]))
+            self.fingerprints = (full, shape, children_shape)
+        return self.fingerprints
+
+
+class LazyGrammarCheckingTree(GrammarCheckingTree):
+    """A GrammarCheckingTree whose subtrees are built on first access. Use lazy_tree()
+    to create one.
+
+    IMPORTANT: a LazyGrammarCheckingTree must never be modified, and it cannot be built
+    by a SubtreeInterner.
+    """
+    _data: _ParseData
+    _index: int
+    _subtrees: Optional[list["LazyGrammarCheckingTree"]]
+
+    def __init__(self, data: _ParseData, index: int) -> None:
+        # GrammarTree.__init__ is not called: it computes the fingerprints and the label
+        # mask from the subtrees, which would build all of them, and the fingerprints and
+        # subtrees are read-only properties computed from data here instead
+        self.root = {'label': data.labels[index], 'text': data.texts[index]}
+        self.label_mask = data.masks[index]
+        self.leaf_offsets = None
+        self.span = None
+        self._texts = None
+        self._leaves = None
+        self._data = data
+        self._index = index
+        self._subtrees = None
+
+    @property
+    def subtrees(self) -> list["LazyGrammarCheckingTree"]:
+        """The subtrees of this tree, which are built on first access."""
+        if self._subtrees is None:
+            self._subtrees = [LazyGrammarCheckingTree(self._data, child)
+                              for child in self._data.children(self._index)]
+        return self._subtrees
+
+    @property
+    def fingerprint(self) -> int:
+        """See GrammarTree."""
+        return self._data.compute_fingerprints()[0][self._index]
+
+    @property
+    def shape_fingerprint(self) -> int:
+        """See GrammarTree."""
+        return self._data.compute_fingerprints()[1][self._index]
+
+    @property
+    def children_shape_fingerprint(self) -> int:
+        """See GrammarTree."""
+        return self._data.compute_fingerprints()[2][self._index]
+
+    def contain_content(self, word_or_punc: str) -> bool:
+        """Return whether the entire tree contains the input word/punctuation mark,
+        without building any subtree.
+        """
+        return word_or_punc in self._data.texts[self._index:self._data.ends[self._index]]
+
+    def leaves(self) -> list[str]:
+        """Return the words/punctuation marks of the tree from left to right, without
+        building any subtree.
+        """
+        if self._leaves is not None:
+            return self._leaves
+        return [text for text in self._data.texts[self._index:self._data.ends[self._index]]
+                if text != '']
+
+    def built_size(self) -> int:
+        """Return the number of nodes of this tree that have been built so far."""
+        count = 0
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            count += 1
+            if tree._subtrees is not None:
+                stack.extend(tree._subtrees)
+        return count
+
+
+def lazy_tree(parse_string: str, unescape: bool = False,
+              merge_chains: bool = False) -> LazyGrammarCheckingTree:
+    """Return the LazyGrammarCheckingTree of the given tree in PTB bracket notation.
+    If unescape is True, the words "-LRB-" and "-RRB-" are replaced by "(" and ")" as in
+    tree_io.read_ptb. Like tree_io.read_ptb, an extra pair of brackets around the tree
+    is accepted, and labels are normalised and empty elements dropped as in
+    tree_io.read_ptb.
+
+    If merge_chains is True, parse_string is the parse_string of a sentence parsed by
+    benepar, and the tree is the one translator._create_grammar_tree builds from its
+    spans: benepar gives all the phrases of a unary chain over the same words (e.g. the
+    S and the VP of "(S (VP (VBZ is) (ADJP (JJ cool))))") to a single span, and only the
+    top phrase of the chain is kept, with the children of the bottom one. Chains that end
+    in a single word, such as "(NP (PRP He))", are kept whole.
+
+    Raise ValueError if parse_string is not a single tree in PTB bracket notation, or if
+    the tree only contains empty elements.
+    """
+    data = _ParseData()
+    # the indices of the unfinished nodes
+    stack = []
+    expect_label = False
+    finished = False
+    root = 0
+    for token in _TOKEN_RE.findall(parse_string):
+        if finished:
+            raise ValueError(f'unexpected {token!r} after the tree in {parse_string!r}')
+        if token == '(':
+            if stack and data.texts[stack[-1]] != '':
+                raise ValueError(f'word followed by a subtree in {parse_string!r}')
+            stack.append(len(data.labels))
+            data.labels.append('')
+            data.texts.append('')
+            data.ends.append(0)
+            data.masks.append(0)
+            expect_label = True
+        elif token == ')':
+            if not stack:
+                raise ValueError(f'unbalanced ")" in {parse_string!r}')
+            index = stack.pop()
+            expect_label = False
+            has_children = data.ends[index] == -1
+            data.ends[index] = len(data.labels)
+            if index == 0 and data.labels[0] == '' and len(data.children(0)) == 1:
+                # the extra brackets around a tree in some treebanks
+                root = 1
+            elif data.labels[index] == '' or (data.texts[index] == '') != has_children:
+                raise ValueError(f'invalid tree in {parse_string!r}')
+            else:
+                data.masks[index] |= label_bit(data.labels[index])
+                if stack:
+                    data.masks[stack[-1]] |= data.masks[index]
+            finished = not stack
+        elif not stack:
+            raise ValueError(f'unexpected {token!r} outside of the tree in {parse_string!r}')
+        elif expect_label:
+            data.labels[stack[-1]] = normalize_label(token)
+            expect_label = False
+            if len(stack) > 1:
+                # marks the parent as having children until the parent is finished
+                data.ends[stack[-2]] = -1
+        elif data.texts[stack[-1]] != '' or data.ends[stack[-1]] == -1:
+            raise ValueError(f'unexpected {token!r} in {parse_string!r}')
+        else:
+            data.texts[stack[-1]] = _PTB_UNESCAPES.get(token, token) if unescape else token
+    if not finished:
+        raise ValueError(f'unexpected end of {parse_string!r}')
+    if EMPTY_ELEMENT in data.labels:
+        data = _rebuild(data, _without_empty_elements(data))
+        if len(data.labels) <= root:
+            raise ValueError(f'no words in {parse_string!r}')
+    if merge_chains:
+        data = _rebuild(data, _without_merged_chains(data))
+    return LazyGrammarCheckingTree(data, root)
+
+
+def _without_empty_elements(data: _ParseData) -> list[bool]:
+    """Return whether each node of data is kept when the empty elements, and the phrases
+    that only contain empty elements, are dropped.
+    """
+    size = len(data.labels)
+    keep = [True] * size
+    # in reverse preorder, the children of a node come before the node
+    for index in range(size - 1, -1, -1):
+        children = data.children(index)
+        keep[index] = data.labels[index] != EMPTY_ELEMENT and \
+            (children == [] or any(keep[child] for child in children))
+    return keep
+
+
+def _without_merged_chains(data: _ParseData) -> list[bool]:
+    """Return whether each node of data is kept when the phrases below the top phrase of
+    every unary chain of phrases that ends in a phrase with several children are
+    dropped (see lazy_tree()).
+    """
+    size = len(data.labels)
+    children = [data.children(index) for index in range(size)]
+    # whether node index is a phrase that starts a chain ending in several children
+    branches = [False] * size
+    for index in range(size - 1, -1, -1):
+        if len(children[index]) > 1:
+            branches[index] = True
+        elif len(children[index]) == 1 and data.texts[children[index][0]] == '':
+            branches[index] = branches[children[index][0]]
+    keep = [True] * size
+    for index in range(size):
+        # the empty label is that of the extra brackets around a tree
+        if len(children[index]) == 1 and data.labels[index] != '':
+            child = children[index][0]
+            keep[child] = data.texts[child] != '' or not branches[child]
+    return keep
+
+
+def _rebuild(data: _ParseData, keep: list[bool]) -> _ParseData:
+    """Return the parse of the nodes of data that are kept, where the kept descendants of
+    a node that is not kept become children of its nearest kept ancestor.
+    """
+    size = len(data.labels)
+    # kept[i] is the number of nodes before node i that are kept
+    kept = [0] * (size + 1)
+    for index in range(size):
+        kept[index + 1] = kept[index] + keep[index]
+    rebuilt = _ParseData()
+    for index in range(size):
+        if keep[index]:
+            rebuilt.labels.append(data.labels[index])
+            rebuilt.texts.append(data.texts[index])
+            rebuilt.ends.append(kept[data.ends[index]])
+            rebuilt.masks.append(0)
+    # in reverse preorder, the children of a node come before the node
+    for index in range(len(rebuilt.labels) - 1, -1, -1):
+        mask = label_bit(rebuilt.labels[index]) if rebuilt.labels[index] != '' else 0
+        for child in rebuilt.children(index):
+            mask |= rebuilt.masks[child]
+        rebuilt.masks[index] = mask
+    return rebuilt
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'W0212'],
+        'extra-imports': ['re', 'typing', 'grammar_checking_tree', 'grammar_tree', 'tree_io'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
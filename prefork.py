@@ -0,0 +1,128 @@
+"""
+This file contains the PreforkPool class, a pool of worker processes that share the
+parsing model loaded by the parent process copy-on-write, and functions reporting the
+memory used by each worker.
+
+Without pre-forking, every worker process that imports translator loads its own copy of
+the spaCy and benepar models. A PreforkPool instead loads them once in the parent,
+freezes them (see translator.freeze_for_inference) and forks the workers, so each worker
+only adds the memory it writes to (its unique set size, USS) to the total.
+
+Example usage:
+    with PreforkPool(8) as pool:
+        for feedback in pool.imap_unordered(check, texts):
+            ...
+        print(pool.memory_report())
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import multiprocessing
+import os
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# the fields of /proc/<pid>/smaps_rollup reported by process_memory, in kilobytes
+_MEMORY_FIELDS = {'Rss', 'Pss', 'Private_Clean', 'Private_Dirty', 'Shared_Clean',
+                  'Shared_Dirty'}
+
+
+def process_memory(pid: int) -> dict[str, int]:
+    """Return the memory use in kilobytes of the process with the given pid.
+
+    The returned dictionary maps "rss" to the resident set size, "pss" to the
+    proportional set size (shared pages divided among the processes sharing them),
+    "uss" to the unique set size (pages used only by this process) and "shared" to the
+    resident pages shared with other processes.
+
+    Preconditions:
+        - the system provides /proc/<pid>/smaps_rollup (Linux 4.14 or later).
+    """
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            name, _, value = line.partition(':')
+            if name in _MEMORY_FIELDS:
+                fields[name] = int(value.split()[0])
+    return {'rss': fields['Rss'],
+            'pss': fields['Pss'],
+            'uss': fields['Private_Clean'] + fields['Private_Dirty'],
+            'shared': fields['Shared_Clean'] + fields['Shared_Dirty']}
+
+
+class PreforkPool:
+    """
+    A pool of worker processes forked after the parent process has loaded and frozen the
+    parsing model.
+    Instance Attributes:
+        - workers: the number of worker processes.
+    """
+    workers: int
+    _pool: Any
+
+    def __init__(self, workers: int, initializer: Optional[Callable] = None,
+                 initargs: tuple = ()) -> None:
+        """Load the parsing model in this process, freeze it and fork the workers, each of
+        which calls initializer(*initargs) first if initializer is given.
+
+        Preconditions:
+            - workers >= 1
+            - the platform supports the "fork" start method.
+        """
+        import translator  # pylint: disable=import-outside-toplevel
+        translator.freeze_for_inference()
+        self.workers = workers
+        context = multiprocessing.get_context('fork')
+        self._pool = context.Pool(workers, initializer=initializer, initargs=initargs)
+
+    def imap_unordered(self, func: Callable, iterable: Iterable, chunksize: int = 1) -> \
+            Iterator:
+        """Return an iterator over func applied to every element of iterable in the
+        workers, in any order.
+        """
+        return self._pool.imap_unordered(func, iterable, chunksize)
+
+    def map(self, func: Callable, iterable: Iterable, chunksize: Optional[int] = None) -> list:
+        """Return the list of func applied to every element of iterable in the workers."""
+        return self._pool.map(func, iterable, chunksize)
+
+    def memory_report(self) -> dict[str, Any]:
+        """Return the memory use in kilobytes of the parent process ("parent"), of each
+        worker process ("workers", mapping each pid to a dictionary as returned by
+        process_memory) and the average incremental memory of a worker
+        ("per_worker_uss"), i.e. the memory each additional worker costs.
+
+        Only the live worker processes of this pool are reported, not the other child
+        processes of this process.
+        """
+        # multiprocessing.pool.Pool keeps its worker processes in _pool
+        processes = self._pool._pool  # pylint: disable=protected-access
+        workers = {process.pid: process_memory(process.pid)
+                   for process in processes if process.is_alive()}
+        per_worker = sum(m['uss'] for m in workers.values()) // max(len(workers), 1)
+        return {'parent': process_memory(os.getpid()),
+                'workers': workers,
+                'per_worker_uss': per_worker}
+
+    def close(self) -> None:
+        """Stop accepting work and wait for the workers to finish the submitted work."""
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self) -> 'PreforkPool':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if exc_info[0] is None:
+            self.close()
+        else:
+            self._pool.terminate()
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['multiprocessing', 'os', 'typing', 'translator'],
+        'allowed-io': ['process_memory'],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,65 @@
+"""
+This file contains a generator of random trees, shared by the tests that compare two
+implementations of the rules or of the trees on many trees and by benchmark_interning.py.
+
+A random tree is first drawn as a (label, text, subtrees) description, where subtrees is
+a list of descriptions and text is the word of a single-word tree (and "" otherwise), so
+that the same tree can be built as several kinds of trees (see build_tree).
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import random
+from grammar_checking_tree import GrammarCheckingTree
+
+# the probability that a subtree above the maximum depth is a single word
+WORD_PROBABILITY = 0.3
+
+
+def random_description(generator: random.Random, depth: int, phrases: list[str],
+                       words: list[tuple[str, str]], min_subtrees: int = 1,
+                       max_subtrees: int = 4) -> tuple:
+    """Return a random (label, text, subtrees) description of a tree of at most the given
+    depth, whose phrases have a constituent tag in phrases and between min_subtrees and
+    max_subtrees subtrees, and whose single words are (constituent tag, word) tuples of
+    words.
+
+    Preconditions:
+        - depth >= 0
+        - phrases != [] and words != []
+        - 1 <= min_subtrees <= max_subtrees
+    """
+    if depth == 0 or generator.random() < WORD_PROBABILITY:
+        label, text = generator.choice(words)
+        return label, text, []
+    return generator.choice(phrases), '', [
+        random_description(generator, depth - 1, phrases, words, min_subtrees,
+                           max_subtrees)
+        for _ in range(generator.randint(min_subtrees, max_subtrees))]
+
+
+def build_tree(description: tuple, tree_class: type = GrammarCheckingTree) -> \
+        GrammarCheckingTree:
+    """Return the tree of the given (label, text, subtrees) description, built with
+    tree_class (GrammarCheckingTree or a subclass of it).
+    """
+    label, text, subtrees = description
+    return tree_class(label, [build_tree(subtree, tree_class) for subtree in subtrees], text)
+
+
+def random_tree(generator: random.Random, depth: int, phrases: list[str],
+                words: list[tuple[str, str]]) -> GrammarCheckingTree:
+    """Return a random GrammarCheckingTree of at most the given depth (see
+    random_description).
+    """
+    return build_tree(random_description(generator, depth, phrases, words))
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['random', 'grammar_checking_tree'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,292 @@
+"""
+This file contains the CheckScheduler class, which runs the parse and check pipeline for
+requests of different priority classes on a fixed number of worker threads, so that
+interactive checks (e.g. from an editor) are not held up by bulk re-checks of large
+documents.
+
+Every request is a text, the rules to check on it, a priority class (INTERACTIVE or
+BULK) and an optional deadline. The text is cut into sentence-aligned batches of at most
+batch_chars characters (see segmenter.sentence_chunks); a sentence longer than batch_chars
+is a batch of its own, and only sentences longer than segmenter.MAX_CHUNK_CHARS are cut
+(see translator.translate_chunk for the sentences benepar rejects). A worker runs one
+batch at a time: it always takes the next batch of the waiting request with the highest
+priority class, and of the earliest deadline within a class. After each batch, a request
+with more batches goes back to the queue, so a bulk request is preempted between two
+batches as soon as an interactive request arrives, and an interactive request never
+waits for more than one batch per worker. A request whose deadline passes before its next batch
+starts fails with TimeoutError, without checking its remaining batches.
+
+The parsing itself runs one chunk at a time per process (see the thread-safety notes in
+translator.py), so the number of workers only matters for check functions that can run
+in parallel; the scheduler decides the order of the work, not its throughput.
+
+The scheduler records the queueing delay (from the submission of a request to the start
+of its first batch) and the latency (from the submission to the result) of the last
+METRICS_WINDOW requests of each priority class; see metrics().
+
+Example usage:
+    with CheckScheduler() as scheduler:
+        report = scheduler.submit(document, ["*"], BULK)
+        feedback = scheduler.submit(paragraph, ["*"], INTERACTIVE, timeout=0.5).result()
+        print(scheduler.metrics())
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import collections
+import heapq
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Iterator, Optional
+from segmenter import MAX_CHUNK_CHARS, sentence_chunks
+
+# the priority classes, from the most to the least urgent
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BULK: 'bulk'}
+
+BATCH_CHARS = 2000
+METRICS_WINDOW = 10000
+
+
+def check_chunk(chunk: str, offset: int, rules: list[str]) -> \
+        list[tuple[int, str, list[str]]]:
+    """Return a (start_char, sentence, feedback) tuple for every sentence of chunk, which
+    starts at the character offset offset in its text, where feedback is the output of
+    check_selected_rules(rules) on the sentence.
+
+    Preconditions:
+        - chunk satisfies the precondition of translator.translate().
+        - rules satisfies the precondition of check_selected_rules.
+    """
+    from translator import translate_chunk  # pylint: disable=import-outside-toplevel
+    return [(start_char, tree.get_sentence(), tree.check_selected_rules(rules))
+            for start_char, tree in translate_chunk(chunk, offset)]
+
+
+class _Request:
+    """
+    A submitted request and the state of its batches.
+    Instance Attributes:
+        - priority: the priority class of the request.
+        - deadline: the time.monotonic() time by which every batch must have started.
+        - rules: the rules to check.
+        - future: the Future of the result of the request.
+        - submitted: the time.monotonic() time of the submission.
+        - started: whether the first batch of the request has started.
+        - batches: the (offset, chunk) tuples of the batches not fetched yet.
+        - pending: the next batch to check, or None if every batch has been checked.
+        - results: the (start_char, sentence, feedback) tuples checked so far.
+    """
+    priority: int
+    deadline: float
+    rules: list[str]
+    future: Future
+    submitted: float
+    started: bool
+    batches: Iterator[tuple[int, str]]
+    pending: Optional[tuple[int, str]]
+    results: list[tuple[int, str, list[str]]]
+
+    def __init__(self, text: str, rules: list[str], priority: int, deadline: float,
+                 batch_chars: int) -> None:
+        self.priority = priority
+        self.deadline = deadline
+        self.rules = rules
+        self.future = Future()
+        self.submitted = time.monotonic()
+        self.started = False
+        self.batches = sentence_chunks(text, batch_chars, max(batch_chars, MAX_CHUNK_CHARS))
+        self.pending = None
+        self.results = []
+
+
+class CheckScheduler:
+    """
+    A priority and deadline aware scheduler of grammar checking requests.
+    Instance Attributes:
+        - workers: the number of worker threads.
+        - batch_chars: the maximum number of characters of a batch of several sentences.
+    """
+    workers: int
+    batch_chars: int
+    _check: Callable[[str, int, list[str]], list[tuple[int, str, list[str]]]]
+    # a heap of (priority, deadline, sequence number, request) tuples
+    _queue: list[tuple[int, float, int, _Request]]
+    _condition: threading.Condition
+    _sequence: Iterator[int]
+    _closed: bool
+    _threads: list[threading.Thread]
+    _queue_delays: dict[int, collections.deque]
+    _latencies: dict[int, collections.deque]
+    _deadline_misses: dict[int, int]
+
+    def __init__(self, check: Callable[[str, int, list[str]], list] = check_chunk,
+                 workers: int = 1, batch_chars: int = BATCH_CHARS) -> None:
+        """Start the given number of worker threads, which check every batch with
+        check(chunk, offset, rules), a function with the signature and the result of
+        check_chunk().
+
+        Preconditions:
+            - workers >= 1
+            - batch_chars >= 1
+        """
+        self.workers = workers
+        self.batch_chars = batch_chars
+        self._check = check
+        self._queue = []
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._closed = False
+        self._queue_delays = {p: collections.deque(maxlen=METRICS_WINDOW)
+                              for p in PRIORITY_NAMES}
+        self._latencies = {p: collections.deque(maxlen=METRICS_WINDOW) for p in PRIORITY_NAMES}
+        self._deadline_misses = {p: 0 for p in PRIORITY_NAMES}
+        self._threads = [threading.Thread(target=self._work, daemon=True)
+                         for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, text: str, rules: list[str], priority: int = INTERACTIVE,
+               timeout: Optional[float] = None) -> Future:
+        """Return a Future of the list of (start_char, sentence, feedback) tuples of
+        check_chunk() for every sentence of text, checked with the given priority class.
+        If timeout is given, the deadline of the request is timeout seconds after its
+        submission. The deadline is only checked before each batch of the request
+        starts: the Future fails with TimeoutError if the next batch has not started by
+        the deadline, but a batch that is running when the deadline passes is not
+        interrupted, so a request whose last batch started in time completes after its
+        deadline.
+
+        Preconditions:
+            - priority in PRIORITY_NAMES
+            - text and rules satisfy the preconditions of check_chunk().
+        """
+        deadline = math.inf if timeout is None else time.monotonic() + timeout
+        request = _Request(text, rules, priority, deadline, self.batch_chars)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('cannot submit a request after shutdown')
+            self._push(request)
+        return request.future
+
+    def queued(self) -> dict[int, int]:
+        """Return the number of requests waiting for their next batch in each priority
+        class.
+        """
+        with self._condition:
+            counts = collections.Counter(priority for priority, _, _, _ in self._queue)
+        return {priority: counts[priority] for priority in PRIORITY_NAMES}
+
+    def metrics(self) -> dict[str, dict[str, float]]:
+        """Return, for the name of each priority class, the number of requests finished
+        and recorded ("requests"), the median and 99th percentile of their queueing delays
+        and latencies in seconds ("queue_delay_p50", "queue_delay_p99", "latency_p50",
+        "latency_p99"), and the number of requests that missed their deadline
+        ("deadline_misses").
+        """
+        with self._condition:
+            return {name: {'requests': len(self._latencies[priority]),
+                           'queue_delay_p50': percentile(self._queue_delays[priority], 0.5),
+                           'queue_delay_p99': percentile(self._queue_delays[priority], 0.99),
+                           'latency_p50': percentile(self._latencies[priority], 0.5),
+                           'latency_p99': percentile(self._latencies[priority], 0.99),
+                           'deadline_misses': self._deadline_misses[priority]}
+                    for priority, name in PRIORITY_NAMES.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting requests. The workers finish every submitted request and then
+        stop; if wait is True, wait for them to stop.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self) -> 'CheckScheduler':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
+
+    def _push(self, request: _Request) -> None:
+        """Queue the next batch of request. The caller must hold self._condition."""
+        heapq.heappush(self._queue, (request.priority, request.deadline,
+                                     next(self._sequence), request))
+        self._condition.notify()
+
+    def _work(self) -> None:
+        """Run batches until the scheduler is shut down and the queue is empty."""
+        while True:
+            with self._condition:
+                while self._queue == [] and not self._closed:
+                    self._condition.wait()
+                if self._queue == []:
+                    return
+                request = heapq.heappop(self._queue)[3]
+            if self._run_batch(request):
+                with self._condition:
+                    self._push(request)
+
+    def _run_batch(self, request: _Request) -> bool:
+        """Check the next batch of request and return whether it has more batches.
+        Complete the Future of request if it has no more batches, missed its deadline or
+        failed.
+        """
+        now = time.monotonic()
+        if not request.started:
+            if not request.future.set_running_or_notify_cancel():
+                return False
+            request.started = True
+            request.pending = next(request.batches, None)
+            with self._condition:
+                self._queue_delays[request.priority].append(now - request.submitted)
+        if now > request.deadline:
+            with self._condition:
+                self._deadline_misses[request.priority] += 1
+            request.future.set_exception(TimeoutError(
+                f'deadline missed by {now - request.deadline:.3f} seconds'))
+            return False
+        try:
+            if request.pending is not None:
+                offset, chunk = request.pending
+                request.results.extend(self._check(chunk, offset, request.rules))
+                request.pending = next(request.batches, None)
+        except Exception as error:  # pylint: disable=broad-except
+            request.future.set_exception(error)
+            return False
+        if request.pending is not None:
+            return True
+        with self._condition:
+            self._latencies[request.priority].append(time.monotonic() - request.submitted)
+        request.future.set_result(request.results)
+        return False
+
+
+def percentile(values: Any, fraction: float) -> float:
+    """Return the nearest-rank percentile of values at the given fraction (e.g. 0.99 for
+    the 99th percentile), or 0.0 if values is empty.
+
+    Preconditions:
+        - 0 < fraction <= 1
+    """
+    ordered = sorted(values)
+    if ordered == []:
+        return 0.0
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['collections', 'heapq', 'itertools', 'math', 'threading', 'time',
+                          'concurrent.futures', 'typing', 'segmenter', 'translator'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
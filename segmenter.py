@@ -0,0 +1,172 @@
+"""
+This file contains a fast rule-based sentencizer that cuts a document into
+sentence-aligned chunks before it is parsed, so that each chunk can be parsed on its own
+(and in parallel with the other chunks).
+
+Parsing a whole document with one call of nlp fails for documents longer than spaCy's
+max_length or with sentences longer than benepar supports, and it holds the parse data of
+the whole document in memory at once. A chunk is at most MAX_CHUNK_CHARS characters long
+and consists of whole sentences, except for sentences longer than MAX_SENTENCE_CHARS,
+which are cut at the last space before the limit. Both limits can be given separately:
+with a sentence limit above the chunk limit, a sentence longer than a chunk is a chunk of
+its own and only sentences longer than the sentence limit are cut (see
+translator.translate_chunk, which only cuts the sentences the parser rejects).
+
+A sentence ends after ".", "!" or "?" (and any closing quotes or brackets) followed by
+whitespace and a capital letter, a digit, a quote or an opening bracket, or at a blank
+line. A "." after a common abbreviation (e.g. "Mr.") or an initial (e.g. "J.") does not end
+a sentence. Since the chunks are only an upper bound on how the text is split, a missed
+sentence end only makes a chunk longer, and the parser still splits every chunk into
+sentences itself.
+
+Every chunk is returned with its character offset in the document, so that offsets in
+a chunk can be converted to offsets in the document (see translator.translate_chunk).
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import re
+from typing import Iterable, Iterator, Optional, TextIO
+
+MAX_CHUNK_CHARS = 10000
+MAX_SENTENCE_CHARS = 1000
+READ_SIZE = 1 << 16
+
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'etc', 'e.g', 'i.e',
+                 'inc', 'ltd', 'co', 'corp', 'no', 'fig', 'approx', 'mt', 'gen', 'capt', 'lt',
+                 'col', 'sgt', 'rev', 'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep',
+                 'sept', 'oct', 'nov', 'dec'}
+
+_BOUNDARY_RE = re.compile(r'[.!?]+[\'")\]]*(?=\s)|\n[^\S\n]*\n')
+_WORD_BEFORE_RE = re.compile(r'[\w.]*$')
+_NON_SPACE_RE = re.compile(r'\S')
+_SENTENCE_STARTS = '"\'([“‘'
+
+
+def sentence_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS,
+                    max_sentence_chars: int = MAX_SENTENCE_CHARS) -> Iterator[tuple[int, str]]:
+    """Yield an (offset, chunk) tuple for every sentence-aligned chunk of text, where
+    text[offset:offset + len(chunk)] == chunk. The chunks contain every character of text
+    except for the whitespace between them.
+
+    Preconditions:
+        - max_chars >= 1
+        - max_sentence_chars >= 1
+    """
+    return _chunks([text], max_chars, max_sentence_chars)
+
+
+def read_chunks(file: TextIO, max_chars: int = MAX_CHUNK_CHARS,
+                max_sentence_chars: int = MAX_SENTENCE_CHARS) -> Iterator[tuple[int, str]]:
+    """Yield the (offset, chunk) tuples of sentence_chunks() for the text of file, reading
+    it READ_SIZE characters at a time, so that at most max_chars + READ_SIZE characters
+    of file are held in memory.
+
+    Preconditions:
+        - max_chars >= 1
+        - max_sentence_chars >= 1
+    """
+    return _chunks(iter(lambda: file.read(READ_SIZE), ''), max_chars, max_sentence_chars)
+
+
+def sentence_ends(text: str, start: int = 0, end: Optional[int] = None) -> Iterator[int]:
+    """Yield, in increasing order, the offsets in text right after the last character of
+    every sentence of text[start:end] that is followed by another sentence.
+    """
+    previous = start
+    for match in _BOUNDARY_RE.finditer(text, start, len(text) if end is None else end):
+        if match.group()[0] == '\n':
+            # a blank line, which may directly follow a sentence end
+            if match.start() > previous:
+                previous = match.start()
+                yield previous
+            continue
+        following = match.end()
+        while following < len(text) and text[following].isspace():
+            following += 1
+        if following == len(text):
+            continue
+        first = text[following]
+        if not (first.isupper() or first.isdigit() or first in _SENTENCE_STARTS):
+            continue
+        if match.group()[0] == '.' and _is_abbreviation(text, start, match.start()):
+            continue
+        previous = match.end()
+        yield previous
+
+
+def _is_abbreviation(text: str, start: int, end: int) -> bool:
+    """Return whether the word in text[start:end] that ends at end (right before a ".") is
+    an abbreviation or an initial.
+    """
+    word = _WORD_BEFORE_RE.search(text, max(start, end - 20), end).group()
+    return word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isupper())
+
+
+def _chunks(blocks: Iterable[str], max_chars: int, max_sentence_chars: int) -> \
+        Iterator[tuple[int, str]]:
+    """Yield the (offset, chunk) tuples of the sentence-aligned chunks of the text that
+    is the concatenation of blocks.
+    """
+    buffer = ''
+    # the offset of buffer in the text, and the start of the next chunk in buffer
+    offset, start = 0, 0
+    blocks = iter(blocks)
+    final = False
+    while not final:
+        block = next(blocks, None)
+        if block is None:
+            final = True
+        else:
+            buffer, offset, start = buffer[start:] + block, offset + start, 0
+        end = _chunk_end(buffer, start, max_chars, max_sentence_chars, final)
+        while end is not None and start < len(buffer):
+            while start < end and buffer[start].isspace():
+                start += 1
+            chunk = buffer[start:end].rstrip()
+            if chunk != '':
+                yield offset + start, chunk
+            start = end
+            end = _chunk_end(buffer, start, max_chars, max_sentence_chars, final)
+
+
+def _chunk_end(buffer: str, start: int, max_chars: int, max_sentence_chars: int,
+               final: bool) -> Optional[int]:
+    """Return the end of the chunk of buffer that starts at start, or None if it cannot
+    be decided without the text that follows (when final is False).
+    """
+    # the chunk ends at a sentence end at most max_chars after start (or, for a first
+    # sentence longer than max_chars, max_sentence_chars after start), and deciding
+    # whether an offset is a sentence end needs the first non-whitespace character after it
+    window = start + max(max_chars, max_sentence_chars) + 1
+    if not final and _NON_SPACE_RE.search(buffer, window) is None:
+        return None
+    previous = start
+    for end in sentence_ends(buffer, start, min(len(buffer), window)):
+        if end - previous > max_sentence_chars:
+            break
+        if end - start > max_chars:
+            # a first sentence longer than max_chars is a chunk of its own
+            return previous if previous > start else end
+        previous = end
+    else:
+        if len(buffer) - previous <= max_sentence_chars and \
+                (len(buffer) - start <= max_chars or previous == start):
+            # the rest of the text fits in one chunk
+            return len(buffer)
+    if previous > start:
+        return previous
+    # the first sentence is too long, so it is cut at the last space before the limit
+    limit = start + max_sentence_chars
+    space = max(buffer.rfind(' ', start, limit + 1), buffer.rfind('\n', start, limit + 1))
+    return space if space > start else limit
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['re', 'typing'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
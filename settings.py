@@ -0,0 +1,22 @@
+"""
+This file contains the settings shared by translator.py, which loads the parsing model,
+and the programs that configure it without importing spaCy or benepar themselves (e.g.
+batch_check.py, whose --ptb runs do not load the parsing model).
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+
+# the environment variable that sets the vectors argument of translator.load_pipeline()
+# for translator.nlp
+VECTORS_VARIABLE = 'GRAMMAR_CHECKER_VECTORS'
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': [],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,112 @@
+"""
+This file contains the SubtreeInterner class, which shares structurally identical
+subtrees between the GrammarCheckingTree objects built for a batch of sentences
+(hash-consing).
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import threading
+from grammar_checking_tree import GrammarCheckingTree
+
+
+class SubtreeInterner:
+    """
+    Builds GrammarCheckingTree objects so that structurally identical subtrees (same
+    labels, same words, same shape) are represented by one shared object.
+
+    Since a subtree is only interned after all of its children are interned, two
+    subtrees are structurally identical exactly when they have the same label, the same
+    text and the same (identical) children, which is what the table is keyed by.
+
+    Interned trees are frozen (see GrammarTree.freeze), so the results of
+    contain_content() computed on a shared subtree are reused by every sentence it
+    appears in, and the feedback of sentences with identical trees is computed only once
+    by check_selected_rules(). The root of a sentence tree built by translator is never
+    shared, since it stores the source span of that particular sentence.
+
+    IMPORTANT: interned trees are shared and must never be modified.
+
+    An interner may be used by several threads at once: interning is serialised by a
+    lock, and two threads that check the same tree at the same time may both compute its
+    feedback, but they store and return the same result.
+
+    Instance Attributes:
+        - requested:
+            The number of subtrees requested from this interner.
+        - created:
+            The number of distinct subtrees this interner has created.
+    """
+    requested: int
+    created: int
+    _table: dict[tuple, GrammarCheckingTree]
+    _feedback: dict[tuple, list[str]]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self.requested = 0
+        self.created = 0
+        self._table = {}
+        self._feedback = {}
+        self._lock = threading.Lock()
+
+    def intern(self, label: str, subtrees: list[GrammarCheckingTree], text: str = "") -> \
+            GrammarCheckingTree:
+        """Return the shared GrammarCheckingTree with the given label, subtrees and text,
+        creating it if it does not exist yet.
+
+        Preconditions:
+            - every tree in subtrees was returned by this interner.
+        """
+        key = _key(label, subtrees, text)
+        with self._lock:
+            self.requested += 1
+            tree = self._table.get(key)
+            if tree is None:
+                tree = GrammarCheckingTree(label, subtrees, text)
+                tree.freeze()
+                self._table[key] = tree
+                self.created += 1
+        return tree
+
+    def check_selected_rules(self, tree: GrammarCheckingTree, rules_lst: list[str]) -> \
+            list[str]:
+        """Return tree.check_selected_rules(rules_lst), reusing the result computed for
+        a tree with the same root and the same interned subtrees and rules if there is one.
+
+        Preconditions:
+            - every subtree of tree was returned by this interner.
+            - rules_lst satisfies the precondition of check_selected_rules.
+        """
+        key = (_key(tree.root['label'], tree.subtrees, tree.root['text']), tuple(rules_lst))
+        feedback = self._feedback.get(key)
+        if feedback is None:
+            feedback = self._feedback.setdefault(key, tree.check_selected_rules(rules_lst))
+        return list(feedback)
+
+    def clear(self) -> None:
+        """Forget every interned subtree and cached feedback, e.g. at the end of a batch.
+        Trees returned before are still valid but are no longer shared with new ones.
+        """
+        with self._lock:
+            self._table.clear()
+            self._feedback.clear()
+
+    def __len__(self) -> int:
+        """Return the number of distinct subtrees in this interner."""
+        return len(self._table)
+
+
+def _key(label: str, subtrees: list[GrammarCheckingTree], text: str) -> tuple:
+    """Return the key of a tree with the given label, interned subtrees and text."""
+    return label, text, tuple(id(subtree) for subtree in subtrees)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['threading', 'grammar_checking_tree'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,186 @@
+"""
+This file contains unit tests for the command-line batch grammar checker of
+batch_check.py.
+
+The tests check treebanks of pre-parsed trees (--ptb), so they do not need spaCy or
+benepar, except for test_documents_without_sentences, which is skipped without them.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import json
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+import batch_check
+from tests_tree_io import WSJ
+from tree_io import read_ptb
+
+RECORD_KEYS = {'doc', 'sentence', 'offset', 'text', 'feedback', 'final'}
+
+
+def _run(paths: list[str], output: str, *options: str) -> list[dict]:
+    """Run the batch checker on the treebanks at paths with the given options and return
+    the records written to output.
+    """
+    batch_check.main([*paths, '--ptb', '--extensions', '.mrg', '-o', output, *options])
+    with open(output, encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+def test_ptb_records(tmp_path: str) -> None:
+    """Unit tests for the JSON Lines records of a treebank, including a tree with only
+    empty elements, with eager and lazy trees and with several workers.
+    """
+    path = os.path.join(tmp_path, 'wsj.mrg')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(WSJ)
+    output = os.path.join(tmp_path, 'out.jsonl')
+    records = _run([path], output, '-r', 'r1', 'r4', '-j', '1')
+    trees = list(read_ptb(io.StringIO(WSJ)))
+    assert all(set(record) == RECORD_KEYS and record['final'] for record in records)
+    assert [record['doc'] for record in records] == [f'{path}:{i}' for i in range(1, 6)]
+    assert records[3] == {'doc': f'{path}:4', 'sentence': None, 'offset': None,
+                          'text': None, 'feedback': [], 'final': True}
+    del records[3]
+    assert [record['text'] for record in records] == [tree.get_sentence() for tree in trees]
+    assert all(record['sentence'] == 0 and record['offset'] is None for record in records)
+    assert [record['feedback'] for record in records] == \
+        [[{'rule': rule, 'type': fb.type, 'type_str': fb.type_str, 'message': fb.message}
+          for rule, fb in tree.check_rules(['r1', 'r4'])] for tree in trees]
+    eager = _run([path], output, '-r', 'r1', 'r4', '-j', '1')
+    assert _run([path], output, '-r', 'r1', 'r4', '-j', '1', '--lazy') == eager
+    assert _run([str(tmp_path)], output, '-r', 'r1', 'r4', '-j', '2') == eager
+
+
+def test_resume(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Unit tests for --resume: a partially written document is checked again, every
+    complete document (including one without sentences) is skipped, and the output is
+    the same as that of a single run.
+    """
+    path = os.path.join(tmp_path, 'wsj.mrg')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(WSJ)
+    output = os.path.join(tmp_path, 'out.jsonl')
+    expected = _run([path], output, '-j', '1')
+    with open(output, 'rb') as file:
+        lines = file.readlines()
+
+    checked = []
+    check_trees = batch_check.check_trees
+
+    def counting_check(batch: list[tuple[str, str]]) -> str:
+        checked.extend(doc_id for doc_id, _ in batch)
+        return check_trees(batch)
+
+    monkeypatch.setattr(batch_check, 'check_trees', counting_check)
+    with open(output, 'wb') as file:
+        file.write(b''.join(lines[:4]) + lines[4][:10])
+    assert _run([path], output, '-j', '1', '--resume') == expected
+    assert checked == [f'{path}:5']
+    checked.clear()
+    assert _run([path], output, '-j', '1', '--resume') == expected
+    assert checked == []
+
+
+def test_iter_documents(tmp_path: str) -> None:
+    """Unit tests for the documents of text files and directories, skipping blank lines
+    and the documents already done.
+    """
+    os.mkdir(os.path.join(tmp_path, 'corpus'))
+    path = os.path.join(tmp_path, 'corpus', 'a.txt')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('He is cool.\n\n   \nShe is nice.\n')
+    with open(os.path.join(tmp_path, 'corpus', 'b.md'), 'w', encoding='utf-8') as file:
+        file.write('Skipped.\n')
+    assert list(batch_check.iter_documents([str(tmp_path)], ('.txt',))) == \
+        [(f'{path}:1', 'He is cool.'), (f'{path}:4', 'She is nice.')]
+    assert list(batch_check.iter_documents([path], ('.txt',), {f'{path}:1'})) == \
+        [(f'{path}:4', 'She is nice.')]
+
+
+def test_rule_errors(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Unit tests for the records of a tree on which a rule raises an error (check_parallelism
+    on a CC without a following phrase) and of an invalid tree, which do not stop the
+    other trees from being checked, with one or several workers and with lazy trees, and
+    which are complete documents for --resume.
+    """
+    path = os.path.join(tmp_path, 'errors.mrg')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('(S (NP (NNP Tom)) (CC and))\n(S (NP (NN x)) y)\n' + WSJ)
+    output = os.path.join(tmp_path, 'out.jsonl')
+    records = _run([path], output, '-j', '1')
+    assert len(records) == 7 and all(record['final'] for record in records)
+    assert records[0]['text'] == 'Tom and'
+    assert [fb['rule'] for fb in records[0]['feedback']] == batch_check.RULES
+    assert records[0]['feedback'][-1] == {'rule': 'r9',
+                                          'error': 'IndexError: list index out of range'}
+    assert all(set(fb) == {'rule', 'type', 'type_str', 'message'}
+               for fb in records[0]['feedback'][:-1])
+    assert records[1]['text'] is None and records[1]['error'].startswith('ValueError')
+    assert _run([path], output, '-j', '2') == records
+    assert _run([path], output, '-j', '1', '--lazy') == records
+
+    checked = []
+    check_trees = batch_check.check_trees
+
+    def counting_check(batch: list[tuple[str, str]]) -> str:
+        checked.extend(doc_id for doc_id, _ in batch)
+        return check_trees(batch)
+
+    monkeypatch.setattr(batch_check, 'check_trees', counting_check)
+    assert _run([path], output, '-j', '1', '--resume') == records
+    assert checked == []
+    assert _run([path], output, '-j', '1', '-r', 'r9', 'r1')[0]['feedback'] == \
+        [{'rule': 'r9', 'error': 'IndexError: list index out of range'},
+         {'rule': 'r1', 'type': 1, 'type_str': 'Error Undetected', 'message': ''}]
+
+
+@pytest.mark.parametrize('options, threads, cores', [
+    ([], None, None), (['--threads', '2'], 2, None), (['--pin-cores'], 1, 1),
+    (['--pin-cores', '--threads', '2'], 2, 2)])
+def test_thread_options(tmp_path: str, monkeypatch: pytest.MonkeyPatch,
+                        options: list[str], threads: int, cores: int) -> None:
+    """Unit tests for the parser threads and the pinned cores of the process checking the
+    documents with -j 1, including the default of one thread per pinned core.
+    """
+    calls = []
+    monkeypatch.setitem(sys.modules, 'translator', SimpleNamespace(
+        configure_threads=lambda *args: calls.append(('threads', *args)),
+        pin_to_cores=lambda *args: calls.append(('pin', *args))))
+    output = os.path.join(tmp_path, 'out.jsonl')
+    batch_check.main([str(tmp_path), '-o', output, '-j', '1', *options])
+    assert calls == [('threads', threads, None)] + ([('pin', 0, cores)] if cores else [])
+
+
+def test_memory_report_requires_prefork(tmp_path: str) -> None:
+    """Unit tests for rejecting --memory-report without --prefork."""
+    with pytest.raises(SystemExit):
+        batch_check.main([str(tmp_path), '-o', os.path.join(tmp_path, 'out.jsonl'),
+                          '--memory-report'])
+
+
+def test_documents_without_sentences() -> None:
+    """Unit tests for the final records of documents without any sentence."""
+    pytest.importorskip('translator')
+    records = [json.loads(line) for line in batch_check.check_documents(
+        [('a', '   '), ('b', 'He is cool. She is nice.'), ('c', ''),
+         ('d', 'Is he cool?')]).splitlines()]
+    assert [(record['doc'], record['sentence'], record['final']) for record in records] == \
+        [('a', None, True), ('b', 0, False), ('b', 1, True), ('c', None, True),
+         ('d', 0, True)]
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_batch_check.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['io', 'json', 'os', 'sys', 'types', 'pytest', 'batch_check',
+                          'tests_tree_io', 'tree_io'],
+        'allowed-io': ['_run', 'test_ptb_records', 'test_resume', 'test_iter_documents'],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,84 @@
+"""
+This file contains unit tests for the vectorised rule checking of batch_rules.py.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import random
+import pytest
+from batch_rules import TAGS, check_batch, label_matrix
+from feedback_table import RULES, FeedbackTable, check_table
+from grammar_checking_tree import GrammarCheckingTree
+from lazy_tree import lazy_tree
+from random_trees import random_tree
+from tests_thread_safety import TREEBANK
+from tree_io import iter_ptb_strings, read_ptb
+
+PHRASES = ['S', 'NP', 'VP', 'SBAR', 'SQ', 'SBARQ', 'ADJP', 'FRAG']
+WORDS = [('NN', 'dog'), ('NNS', 'dogs'), ('VBZ', 'is'), ('VBD', 'was'), ('CC', 'and'),
+         ('PRP', 'He'), ('JJ', 'red'), ('DT', 'the'), ('.', '.'), ('.', '?'), ('.', '!')]
+
+
+def _rows(table: FeedbackTable) -> list[tuple[int, int, str, int, str]]:
+    """Return the rows of table."""
+    return [table.row(index) for index in range(len(table))]
+
+
+def test_label_matrix() -> None:
+    """Unit tests for the sentences x tags matrix against contain_type."""
+    generator = random.Random(1)
+    trees = [random_tree(generator, 4, PHRASES, WORDS) for _ in range(200)]
+    matrix = label_matrix(trees, TAGS)
+    assert matrix.shape == (200, len(TAGS))
+    assert all(matrix[i, j] == tree.contain_type(tag)
+               for i, tree in enumerate(trees) for j, tag in enumerate(TAGS))
+    assert label_matrix([], TAGS).shape == (0, len(TAGS))
+
+
+def test_same_as_check_table() -> None:
+    """Unit tests for the feedback of the treebank, as eager and lazy trees."""
+    texts = list(iter_ptb_strings(io.StringIO(TREEBANK)))
+    for build in [lambda text: next(read_ptb(io.StringIO(text))),
+                  lambda text: lazy_tree(text, unescape=True)]:
+        sentences = [(index, 0, build(text)) for index, text in enumerate(texts)]
+        for rules in [["*"], ['r6', 'r1', 'r9', 'r4']]:
+            expected = check_table(sentences, rules)
+            table = check_batch(sentences, rules)
+            assert _rows(table) == _rows(expected) and table.messages == expected.messages
+
+
+def test_random_trees() -> None:
+    """Unit tests for the vectorised rules on random trees, including single words and
+    trees that need the per-tree fallback.
+    """
+    generator = random.Random(2)
+    trees = [random_tree(generator, 5, PHRASES, WORDS) for _ in range(1000)]
+    sentences = [(index // 4, index % 4, tree) for index, tree in enumerate(trees)]
+    for rule in ['r1', 'r2', 'r5', 'r6']:
+        assert _rows(check_batch(sentences, [rule])) == _rows(check_table(sentences, [rule]))
+    # find_the_last() fails on a single punctuation mark, so r4 skips single words
+    ended = [(doc, sentence, tree) for doc, sentence, tree in sentences if tree.subtrees != []]
+    assert _rows(check_batch(ended, ['r4', 'r1'])) == _rows(check_table(ended, ['r4', 'r1']))
+
+
+def test_empty_batch() -> None:
+    """Unit tests for a batch without sentences."""
+    table = check_batch([], ["*"])
+    assert len(table) == 0 and table.messages == []
+    assert list(check_batch([(0, 0, GrammarCheckingTree('NN', [], 'dog'))], ["*"]).rule) \
+        == list(range(len(RULES)))
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_batch_rules.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['io', 'random', 'pytest', 'batch_rules', 'feedback_table',
+                          'grammar_checking_tree', 'lazy_tree', 'random_trees',
+                          'tests_thread_safety', 'tree_io'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,81 @@
+"""
+This file contains unit tests for the columnar feedback tables of feedback_table.py.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import pathlib
+import numpy as np
+import pytest
+from feedback_table import COLUMNS, FeedbackTable, check_table
+from grammar_checking_tree import GrammarCheckingTree
+from tests_thread_safety import TREEBANK
+from tree_io import read_ptb
+
+
+def _sentences() -> list[tuple[int, int, GrammarCheckingTree]]:
+    """Return (doc, sentence, tree) tuples for the trees of TREEBANK, three per document."""
+    trees = list(read_ptb(io.StringIO(TREEBANK)))
+    return [(index // 3, index % 3, tree) for index, tree in enumerate(trees)]
+
+
+def test_check_table() -> None:
+    """Unit tests for checking sentences into a FeedbackTable."""
+    sentences = _sentences()
+    table = check_table(sentences, ['r4', 'r1', 'r8'])
+    assert len(table) == 3 * len(sentences)
+    assert all(getattr(table, column).dtype == dtype for column, dtype in COLUMNS.items())
+    expected = [(doc, sentence, rule, fb.type, fb.message) for doc, sentence, tree in sentences
+                for rule, fb in tree.check_rules(['r4', 'r1', 'r8'])]
+    assert [table.row(index) for index in range(len(table))] == expected
+    assert len(table.messages) == len(set(table.messages)) == len({row[4] for row in expected})
+    assert list(table.rule[:3]) == [3, 0, 7]
+
+
+def test_empty_table(tmp_path: pathlib.Path) -> None:
+    """Unit tests for a table without rows."""
+    table = check_table([], ["*"])
+    assert len(table) == 0 and table.messages == []
+    table.save(str(tmp_path))
+    assert len(FeedbackTable.load(str(tmp_path))) == 0
+    assert len(FeedbackTable.concatenate([])) == 0
+
+
+def test_save_and_load(tmp_path: pathlib.Path) -> None:
+    """Unit tests for saving a table and loading it back with and without memory maps."""
+    table = check_table(_sentences(), ["*"])
+    table.save(str(tmp_path / 'table'))
+    for mmap in [True, False]:
+        loaded = FeedbackTable.load(str(tmp_path / 'table'), mmap)
+        assert isinstance(loaded.doc, np.memmap) == mmap
+        assert loaded.messages == table.messages
+        for column in COLUMNS:
+            assert np.array_equal(getattr(loaded, column), getattr(table, column))
+    assert np.array_equal(np.load(str(tmp_path / 'table' / 'type.npy')), table.type)
+
+
+def test_concatenate(tmp_path: pathlib.Path) -> None:
+    """Unit tests for combining tables with different messages tables."""
+    sentences = _sentences()
+    first = check_table(sentences[:4], ["*"])
+    first.save(str(tmp_path))
+    second = check_table(sentences[4:], ['r7', 'r3'])
+    combined = FeedbackTable.concatenate([FeedbackTable.load(str(tmp_path)), second])
+    assert [combined.row(index) for index in range(len(combined))] == \
+        [first.row(index) for index in range(len(first))] + \
+        [second.row(index) for index in range(len(second))]
+    assert len(combined.messages) == len(set(first.messages) | set(second.messages))
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_feedback_table.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['io', 'pathlib', 'numpy', 'pytest', 'feedback_table',
+                          'grammar_checking_tree', 'tests_thread_safety', 'tree_io'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,148 @@
+"""
+This file contains unit tests for the rules of grammar_checking_tree.py that are checked
+on trees built by hand, so they do not need spaCy or benepar, and for the source offsets
+of such trees.
+
+check_adjective (r7) and check_verb (r8) are compared with the implementations they had
+before label masks, in which contain_type() walked the whole tree and check_verb checked
+the subtrees of an SBAR, VP or S a second time.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import random
+from typing import Callable
+import pytest
+from benchmark_rules import coordinated_np, nested_clauses
+from grammar_checking_tree import Feedback, GrammarCheckingTree
+from random_trees import build_tree, random_description
+
+PHRASES = ['S', 'NP', 'VP', 'SBAR', 'SQ', 'ADJP', 'ADVP', 'FRAG']
+WORDS = [('JJ', 'cool'), ('NN', 'car'), ('NNS', 'cars'), ('NNP', 'John'), ('VBZ', 'is'),
+         ('VBP', 'are'), ('VBD', 'was'), ('VBZ', 'likes'), ('VBP', 'like'),
+         ('VBG', 'swimming'), ('PRP', 'he'), ('IN', 'that'), ('RB', 'very'), ('.', '.')]
+TREES = 20000
+
+
+class _QuadraticTree(GrammarCheckingTree):
+    """A GrammarCheckingTree whose contain_type() and check_verb() are those before label
+    masks.
+    """
+
+    def contain_type(self, kind: str) -> bool:
+        """Return whether the tree contains the given constituent tag, by walking it."""
+        return self.root['label'] == kind or any(i.contain_type(kind) for i in self.subtrees)
+
+    def check_verb(self, result_so_far: list) -> Feedback:
+        """Return the feedback of check_verb, checking the subtrees of an SBAR, VP or S a
+        second time.
+        """
+        if not self.contain_type('VBG'):
+            return Feedback(2, 'no verb_ing inside or use verb_ing incorrectly')
+        if self.root['label'] == 'VBG':
+            if all(result_so_far) and len(result_so_far) != 0:
+                return Feedback(1)
+            return Feedback(2, 'it may lack be-verb/like before verb_ing')
+        if self.root['label'] == 'SQ':
+            return Feedback(3, 'This is a question sentence and hard to judge')
+        if self.root['label'] == 'SBAR':
+            result = self._check_subtrees(result_so_far)
+            if result is not None:
+                return result
+        if self.root['label'] in {'VP', 'S'}:
+            first = self.subtrees[0].root['text']
+            if len(self.subtrees) > 1 and first in {'am', 'is', 'are', 'was', 'were'} and \
+                    self.subtrees[1].subtrees[0].root['label'] == 'VBG':
+                result_so_far.append(True)
+            if first in {'like', 'likes'}:
+                if self.subtrees[1].subtrees[0].root['label'] == 'VBG':
+                    return Feedback(1)
+                if self.subtrees[1].subtrees[0].subtrees[0].root['label'] == 'VBG':
+                    return Feedback(1)
+            result = self._check_subtrees(result_so_far)
+            if result is not None:
+                return result
+        result = self._check_subtrees(result_so_far)
+        return Feedback(1, 'can not easily judge') if result is None else result
+
+    def _check_subtrees(self, result_so_far: list) -> Feedback:
+        """Return the first feedback of check_verb on the subtrees that reports an error,
+        or None if there is none.
+        """
+        for x in self.subtrees:
+            result = x.check_verb(result_so_far)
+            if result.message != 'no verb_ing inside or use verb_ing incorrectly' \
+                    and result.type != 1:
+                return result
+        return None
+
+
+def _outcome(check: Callable[[list], Feedback]) -> tuple:
+    """Return the type and message of the feedback of check() and the set of results so
+    far it appended, or the type of the error it raised.
+
+    The rules only use whether the results so far are all True and not empty, so the
+    same results appended a second time (as by the old check_verb) do not matter.
+    """
+    result_so_far = []
+    try:
+        feedback = check(result_so_far)
+    except (IndexError, AttributeError) as error:
+        return type(error)
+    return feedback.type, feedback.message, set(result_so_far)
+
+
+def test_same_as_quadratic_rules() -> None:
+    """Unit tests for check_adjective and check_verb on 20,000 random trees, against
+    their implementations before label masks.
+    """
+    generator = random.Random(3)
+    for _ in range(TREES):
+        description = random_description(generator, 5, PHRASES, WORDS)
+        tree, old = build_tree(description), build_tree(description, _QuadraticTree)
+        assert _outcome(tree.check_adjective) == _outcome(old.check_adjective)
+        assert _outcome(tree.check_verb) == _outcome(old.check_verb)
+
+
+def test_source_offsets() -> None:
+    """Unit tests for the offsets stored by GrammarTree.set_source() on a tree built by
+    hand, and for the sentence span of its feedback.
+    """
+    text = 'Oh. He  is cool!'
+    tree = build_tree(('S', '', [('NP', '', [('PRP', 'He', [])]),
+                               ('VP', '', [('VBZ', 'is', []),
+                                           ('ADJP', '', [('JJ', 'cool', [])])]),
+                               ('.', '!', [])]))
+    assert tree.span is None
+    assert all(fb.sentence_span is None for _, fb in tree.check_rules(['*']))
+    offsets = [(4, 6), (8, 10), (11, 15), (15, 16)]
+    tree.set_source(offsets)
+    assert tree.span == (4, 16) and tree.leaf_offsets == offsets
+    assert [text[start:end] for start, end in offsets] == tree.leaves() == \
+        ['He', 'is', 'cool', '!']
+    assert tree.get_sentence() == 'He is cool!'
+    assert all(fb.sentence_span == (4, 16) for _, fb in tree.check_rules(['*']))
+    assert tree.subtrees[1].span is None
+
+
+@pytest.mark.parametrize('build', [coordinated_np, nested_clauses])
+def test_large_trees(build: Callable[[int], GrammarCheckingTree]) -> None:
+    """Unit tests for check_adjective and check_verb on the large trees of
+    benchmark_rules.py, which take time exponential in their depth with the old rules.
+    """
+    tree = build(1000)
+    assert tree.check_adjective([]).type in {1, 2, 3}
+    assert tree.check_verb([]).type in {1, 2, 3}
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_grammar_checking_tree.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['random', 'typing', 'pytest', 'benchmark_rules',
+                          'grammar_checking_tree', 'random_trees'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
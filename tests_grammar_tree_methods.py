@@ -3,6 +3,7 @@ This file contains unit tests for some methods of the GrammarTree class.
 
 This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
 """
+from grammar_tree import GrammarTree
 from translator import translate
 
 
@@ -43,6 +44,41 @@ def test_get_sentence() -> None:
     assert tree.get_sentence() == sent
 
 
+def test_get_sentence_nested_punctuation() -> None:
+    """Regression test for GrammarTree.get_sentence() on punctuation that starts a nested
+    phrase, which is not preceded by a space either.
+    """
+    clause = GrammarTree('S', [GrammarTree('NP', [GrammarTree('PRP', [], 'I')]),
+                               GrammarTree('VP', [GrammarTree('VBP', [], 'think')])])
+    tree = GrammarTree('S', [
+        GrammarTree('NP', [GrammarTree('PRP', [], 'He')]),
+        GrammarTree('PRN', [GrammarTree(',', [], ','), clause, GrammarTree(',', [], ',')]),
+        GrammarTree('VP', [GrammarTree('VBZ', [], 'is'),
+                           GrammarTree('ADJP', [GrammarTree('JJ', [], 'cool')])]),
+        GrammarTree('.', [], '.')])
+    assert tree.get_sentence() == 'He, I think, is cool.'
+    assert tree.subtrees[1].get_sentence() == ', I think,'
+
+
+def test_source_offsets() -> None:
+    """Unit tests for the source offsets stored by GrammarTree.set_source()."""
+    text = "He is mad. She is sad!"
+    tree1, tree2 = translate(text)
+    assert tree1.span == (0, 10)
+    assert tree2.span == (11, 22)
+    assert [text[start:end] for start, end in tree2.leaf_offsets] == tree2.leaves()
+    assert all(fb.sentence_span == (11, 22) for _, fb in tree2.check_rules(["*"]))
+
+
+def test_equality() -> None:
+    """Unit tests for GrammarTree.__eq__() and the fingerprints."""
+    tree1, tree2, tree3 = translate("He eats food. He eats food. She eats rice.")
+    assert tree1 == tree2 and hash(tree1) == hash(tree2)
+    assert tree1 != tree3
+    assert tree1.shape_fingerprint == tree3.shape_fingerprint
+    assert len({tree1, tree2, tree3}) == 2
+
+
 if __name__ == '__main__':
     import pytest
     pytest.main(['tests_grammar_tree_methods.py'])
@@ -51,7 +87,7 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'max-line-length': 100,
         'disable': [],
-        'extra-imports': ['translator'],
+        'extra-imports': ['grammar_tree', 'translator'],
         'allowed-io': [],
         'max-nested-blocks': 4
     })
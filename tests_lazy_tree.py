@@ -0,0 +1,145 @@
+"""
+This file contains unit tests for the lazily built trees of lazy_tree.py.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import random
+from types import SimpleNamespace
+from typing import Any
+import pytest
+from lazy_tree import lazy_tree
+from random_trees import random_description
+from tests_thread_safety import TREEBANK
+from tree_io import iter_ptb_strings, read_ptb
+
+PHRASES = ['S', 'NP', 'VP', 'SBAR', 'ADJP', 'PP']
+WORDS = [('NN', 'dog'), ('VBZ', 'is'), ('PRP', 'He'), ('JJ', 'red'), ('.', '.')]
+
+
+def test_same_as_eager_trees() -> None:
+    """Unit tests for the equality and the feedback of lazy and eager trees."""
+    for text in iter_ptb_strings(io.StringIO(TREEBANK)):
+        eager = next(read_ptb(io.StringIO(text)))
+        lazy = lazy_tree(text, unescape=True)
+        assert lazy == eager and eager == lazy and hash(lazy) == hash(eager)
+        assert lazy.check_selected_rules(["*"]) == eager.check_selected_rules(["*"])
+        assert lazy.get_sentence() == eager.get_sentence()
+        assert str(lazy) == str(eager)
+
+
+def test_shallow_rules_build_little() -> None:
+    """Unit tests for the number of nodes built by rules that look at shallow structure."""
+    text = '(S (NP (DT The) (NNS cars)) (VP (VBZ is) (ADJP (JJ red))) (. .))'
+    tree = lazy_tree(text)
+    assert tree.check_complete_sentence().type == 1
+    assert tree.contain_content('red') and tree.leaves() == ['The', 'cars', 'is', 'red', '.']
+    assert tree.built_size() == 1
+    assert tree.existence_of_subject().type == 1
+    assert tree.built_size() == 4
+    assert tree.subtrees[1].subtrees[1].root == {'label': 'ADJP', 'text': ''}
+    assert tree.built_size() == 6
+
+
+def test_lazy_tree_formats() -> None:
+    """Unit tests for escaped brackets and the extra brackets around a tree."""
+    tree = lazy_tree('( (S (-LRB- -LRB-) (NN word) (-RRB- -RRB-)) )', unescape=True)
+    assert tree.root['label'] == 'S' and tree.leaves() == ['(', 'word', ')']
+    assert lazy_tree('(NN -LRB-)').root['text'] == '-LRB-'
+
+
+def test_lazy_tree_invalid() -> None:
+    """Unit tests for rejecting input that is not a single tree in PTB bracket notation."""
+    for text in ['(S (NP (PRP He))', '(S (NP He (PRP He)))', 'S (NP (PRP He))', '(S)',
+                 '(NN dog cat)', '(S (NN dog)))', '(NN a) (NN b)', '']:
+        with pytest.raises(ValueError):
+            lazy_tree(text)
+
+
+def test_merge_chains() -> None:
+    """Unit tests for merging the unary chains of phrases of benepar spans."""
+    tree = lazy_tree('(S (VP (VBZ is) (ADJP (JJ cool))))', merge_chains=True)
+    assert tree == next(read_ptb(io.StringIO('(S (VBZ is) (ADJP (JJ cool)))')))
+    assert not tree.contain_type('VP') and tree.contain_type('ADJP')
+    assert tree.check_selected_rules(["*"]) == \
+        next(read_ptb(io.StringIO('(S (VBZ is) (ADJP (JJ cool)))'))).check_selected_rules(["*"])
+    text = '(S (NP (PRP He)) (VP (VP (VBZ is) (NP (NN dog))) (CC and) (VP (VBZ is))))'
+    assert lazy_tree(text, merge_chains=True) == lazy_tree(text)
+    text = '( (S (SBAR (S (NP (PRP He)) (VP (VBZ is)))) (. .)) )'
+    assert str(lazy_tree(text, merge_chains=True)) == \
+        str(next(read_ptb(io.StringIO('(S (SBAR (NP (PRP He)) (VP (VBZ is))) (. .))'))))
+
+
+def _span(labels: tuple[str, ...], children: tuple[Any, ...] = (), tag: str = '',
+          word: str = '') -> Any:
+    """Return a stand-in for a benepar span with the given unary chain of labels and
+    either the given child spans or, if it is a single word, the given tag and word.
+    """
+    inner = ' '.join(str(child._.parse_string) for child in children) or f'({tag} {word})'
+    for label in reversed(labels):
+        inner = f'({label} {inner})'
+    return SimpleNamespace(_=SimpleNamespace(labels=labels, children=list(children),
+                                             parse_string=inner))
+
+
+def _random_span(generator: random.Random, depth: int) -> Any:
+    """Return a random stand-in for a benepar span of at most the given depth."""
+    return _description_span(generator, random_description(generator, depth, PHRASES, WORDS,
+                                                            min_subtrees=2, max_subtrees=3))
+
+
+def _description_span(generator: random.Random, description: tuple) -> Any:
+    """Return a stand-in for a benepar span of the tree of the given (label, text, subtrees)
+    description (see random_trees.py), with a random unary chain of up to two more labels
+    above every word and below every phrase label.
+    """
+    label, text, subtrees = description
+    chain = tuple(generator.choice(PHRASES) for _ in range(generator.randint(0, 2)))
+    if subtrees == []:
+        return _span(chain, tag=label, word=text)
+    return _span((label,) + chain, tuple(_description_span(generator, subtree)
+                                         for subtree in subtrees))
+
+
+def test_same_as_translator() -> None:
+    """Compare the lazy trees translator builds from benepar parse strings with the eager
+    trees of translator._create_grammar_tree, on spans with several labels.
+    """
+    translator = pytest.importorskip('translator')
+    generator = random.Random(3)
+    spans = [_span(('S', 'VP'), (_span((), tag='VBZ', word='is'),
+                                 _span(('ADJP',), tag='JJ', word='cool'))),
+             _span(('NP', 'NP'), tag='PRP', word='He')] + \
+        [_random_span(generator, 4) for _ in range(500)]
+    for span in spans:
+        eager = translator._create_grammar_tree(span)
+        lazy = lazy_tree(str(span._.parse_string), merge_chains=True)
+        assert lazy == eager and str(lazy) == str(eager)
+        assert _outcomes(lazy) == _outcomes(eager)
+
+
+def _outcomes(tree: Any) -> list[Any]:
+    """Return the feedback of every rule on tree, or the type of the error the rule
+    raises (e.g. r4 on a tree that is a single punctuation mark).
+    """
+    outcomes = []
+    for rule in ['r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8', 'r9']:
+        try:
+            outcomes.append(tree.check_selected_rules([rule]))
+        except IndexError as error:
+            outcomes.append(type(error))
+    return outcomes
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_lazy_tree.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['io', 'random', 'types', 'typing', 'pytest', 'lazy_tree',
+                          'random_trees', 'tests_thread_safety', 'tree_io', 'translator'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
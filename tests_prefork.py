@@ -0,0 +1,80 @@
+"""
+This file contains unit tests for the pre-forked worker pool and the memory reports of
+prefork.py, and for translator.freeze_for_inference.
+
+Every test except test_process_memory loads the parsing model, so it is skipped if spaCy
+or benepar is not installed.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import gc
+import multiprocessing
+import os
+import pytest
+from prefork import PreforkPool, process_memory
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup'),
+                    reason='needs /proc/<pid>/smaps_rollup')
+def test_process_memory() -> None:
+    """Unit tests for the memory use of this process."""
+    memory = process_memory(os.getpid())
+    assert set(memory) == {'rss', 'pss', 'uss', 'shared'}
+    assert 0 < memory['uss'] <= memory['pss'] <= memory['rss']
+    assert memory['uss'] + memory['shared'] == memory['rss']
+
+
+def test_prefork_pool() -> None:
+    """Unit tests for running work in the workers of a PreforkPool and for reporting the
+    memory of exactly those workers.
+    """
+    pytest.importorskip('translator')
+    stop = multiprocessing.Event()
+    other = multiprocessing.Process(target=stop.wait)
+    other.start()
+    try:
+        with PreforkPool(2) as pool:
+            assert sorted(pool.map(abs, range(-5, 5))) == sorted(abs(i) for i in range(-5, 5))
+            pids = set(pool.imap_unordered(_pid, range(20)))
+            report = pool.memory_report()
+    finally:
+        stop.set()
+        other.join()
+    assert len(report['workers']) == 2 and other.pid not in report['workers']
+    assert pids <= set(report['workers']) and os.getpid() not in report['workers']
+    assert report['per_worker_uss'] == \
+        sum(memory['uss'] for memory in report['workers'].values()) // 2
+    assert set(report['parent']) == {'rss', 'pss', 'uss', 'shared'}
+
+
+def test_freeze_for_inference() -> None:
+    """Unit tests for switching the parsing model to inference-only mode and freezing the
+    objects allocated so far.
+    """
+    translator = pytest.importorskip('translator')
+    try:
+        translator.freeze_for_inference()
+        parser = translator._benepar_parser()  # pylint: disable=protected-access
+        assert not parser.training
+        assert not any(parameter.requires_grad for parameter in parser.parameters())
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def _pid(_: int) -> int:
+    """Return the pid of the process running this function."""
+    return os.getpid()
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_prefork.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['gc', 'multiprocessing', 'os', 'pytest', 'prefork', 'translator'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,85 @@
+"""
+This file contains unit tests for the agreement measures of benchmark_quantization.py
+and for the agreement of the int8-quantised parser (see
+translator.enable_fast_inference) with the full-precision parser.
+
+test_quantised_agreement loads the parsing model, so it is skipped if spaCy or benepar is
+not installed.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+from collections import Counter
+import pytest
+from benchmark_quantization import CORPUS, RULES, agreement_report, labeled_brackets, \
+    parse_corpus
+from grammar_checking_tree import GrammarCheckingTree
+
+# the lowest agreement of the quantised parser with the full-precision parser on CORPUS
+# that is accepted (target values, not yet measured with the models)
+MIN_BRACKET_F1 = 0.95
+MIN_RULE_AGREEMENT = 0.9
+
+
+def _he_is_cool(adjective_label: str) -> GrammarCheckingTree:
+    """Return the tree of "He is cool.", with the given label for the phrase of "cool"."""
+    return GrammarCheckingTree('S', [
+        GrammarCheckingTree('NP', [GrammarCheckingTree('PRP', [], 'He')]),
+        GrammarCheckingTree('VP', [GrammarCheckingTree('VBZ', [], 'is'),
+                                   GrammarCheckingTree(adjective_label, [
+                                       GrammarCheckingTree('JJ', [], 'cool')])]),
+        GrammarCheckingTree('.', [], '.')])
+
+
+def test_labeled_brackets() -> None:
+    """Unit tests for the labeled constituents of a tree."""
+    assert labeled_brackets(_he_is_cool('ADJP')) == Counter(
+        {('S', 0, 4): 1, ('NP', 0, 1): 1, ('VP', 1, 3): 1, ('ADJP', 2, 3): 1})
+    assert labeled_brackets(GrammarCheckingTree('NN', [], 'dog')) == Counter()
+
+
+def test_agreement_report() -> None:
+    """Unit tests for the bracket precision, recall and F1 and the per-rule agreement."""
+    full = [_he_is_cool('ADJP'), _he_is_cool('ADJP')]
+    report = agreement_report(full, [_he_is_cool('ADJP'), _he_is_cool('ADJP')])
+    assert report == {'identical trees': 1.0, 'bracket precision': 1.0,
+                      'bracket recall': 1.0, 'bracket F1': 1.0,
+                      **{f'{rule} feedback': 1.0 for rule in RULES}}
+    report = agreement_report(full, [_he_is_cool('ADJP'), _he_is_cool('NP')])
+    assert report['identical trees'] == 0.5
+    assert report['bracket precision'] == report['bracket recall'] == 7 / 8
+    assert report['bracket F1'] == pytest.approx(7 / 8)
+    assert report['r7 feedback'] == 0.5 and report['r1 feedback'] == 1.0
+
+
+def test_quantised_agreement() -> None:
+    """Unit tests for the bracket F1 and the per-rule agreement of the quantised parser
+    with the full-precision parser on CORPUS.
+    """
+    translator = pytest.importorskip('translator')
+    full, _ = parse_corpus(CORPUS)
+    component = translator.nlp.get_pipe('benepar')
+    parser = component._parser  # pylint: disable=protected-access
+    try:
+        translator.enable_fast_inference()
+        quantised, _ = parse_corpus(CORPUS)
+    finally:
+        # the other tests parse with the full-precision model
+        component._parser = parser  # pylint: disable=protected-access
+    assert len(quantised) == len(full)
+    report = agreement_report(full, quantised)
+    assert report['bracket F1'] >= MIN_BRACKET_F1
+    assert all(report[f'{rule} feedback'] >= MIN_RULE_AGREEMENT for rule in RULES)
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_quantization.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['collections', 'pytest', 'benchmark_quantization',
+                          'grammar_checking_tree', 'translator'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,205 @@
+"""
+This file contains unit tests and a load test for the CheckScheduler of scheduler.py.
+
+The load test gives the scheduler a check function that simulates the cost of parsing on
+a virtual clock, which advances by a time proportional to the length of each batch it
+checks, and that submits the interactive requests while the bulk batches are checked.
+The latencies are measured on that clock, so they do not depend on the speed of the
+machine, and these tests do not need spaCy or benepar.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import threading
+import time
+from typing import Optional
+import pytest
+from scheduler import BULK, INTERACTIVE, CheckScheduler, percentile
+from segmenter import sentence_chunks
+
+# the simulated parsing time of a batch
+FIXED_COST = 0.001
+CHAR_COST = 2.5e-6
+
+SENTENCE = 'The quick brown fox jumps over the lazy dog. '
+INTERACTIVE_TEXT = 'He is cool. She is nice.'
+BULK_DOCUMENT = SENTENCE * 8000
+BATCH_CHARS = 2000
+# an interactive request is submitted while every SUBMIT_EVERY-th bulk batch is checked
+SUBMIT_EVERY = 4
+
+
+def _cost(chunk: str) -> float:
+    """Return the simulated parsing time of chunk."""
+    return FIXED_COST + CHAR_COST * len(chunk)
+
+
+class _SimulatedParser:
+    """
+    A check function for a CheckScheduler with one worker, which advances a virtual
+    clock by the simulated parsing time of every batch instead of parsing it.
+    Instance Attributes:
+        - scheduler: the scheduler to submit the interactive requests to.
+        - clock: the simulated time spent checking batches so far.
+        - bulk_batches: the number of bulk batches checked so far.
+        - latencies: the simulated latency of every interactive request completed so far,
+          from the time of its submission to the time its batch is checked.
+        - completed: the clock at the completion of every interactive request.
+    """
+    scheduler: Optional[CheckScheduler]
+    clock: float
+    bulk_batches: int
+    latencies: list[float]
+    completed: list[float]
+    _finished: threading.Semaphore
+
+    def __init__(self) -> None:
+        self.scheduler = None
+        self.clock = 0.0
+        self.bulk_batches = 0
+        self.latencies = []
+        self.completed = []
+        self._finished = threading.Semaphore(0)
+
+    def __call__(self, chunk: str, offset: int, _: list[str]) -> list[tuple[int, str, list]]:
+        """Check chunk on the virtual clock and return one result for it. While every
+        SUBMIT_EVERY-th bulk batch is checked, submit an interactive request, as if it
+        arrived as soon as the batch started.
+        """
+        if chunk != INTERACTIVE_TEXT:
+            if self.bulk_batches % SUBMIT_EVERY == 0:
+                self.submit_interactive()
+            self.bulk_batches += 1
+        self.clock += _cost(chunk)
+        return [(offset, chunk, [])]
+
+    def submit_interactive(self) -> None:
+        """Submit an interactive request to the scheduler, whose latency is recorded on
+        the virtual clock when it completes.
+        """
+        submitted = self.clock
+
+        def record(_: object) -> None:
+            self.latencies.append(self.clock - submitted)
+            self.completed.append(self.clock)
+            self._finished.release()
+
+        self.scheduler.submit(INTERACTIVE_TEXT, ["*"]).add_done_callback(record)
+
+    def wait(self, requests: int) -> None:
+        """Wait until the given number of interactive requests have completed."""
+        for _ in range(requests):
+            self._finished.acquire()
+
+
+def test_interactive_latency_under_bulk_load() -> None:
+    """Load test: the 99th percentile latency of interactive requests stays within one
+    bulk batch of its value without load while a bulk job is running, whereas checking
+    the bulk job as a single batch holds interactive requests up for its whole duration.
+    """
+    batches = [offset for offset, _ in sentence_chunks(BULK_DOCUMENT, BATCH_CHARS)]
+    requests = len(range(0, len(batches), SUBMIT_EVERY))
+    parser = _SimulatedParser()
+    with CheckScheduler(parser, batch_chars=BATCH_CHARS) as scheduler:
+        parser.scheduler = scheduler
+        parser.submit_interactive()
+        parser.wait(1)
+        idle = parser.latencies.pop()
+        bulk = scheduler.submit(BULK_DOCUMENT, ["*"], BULK)
+        assert [offset for offset, _, _ in bulk.result()] == batches
+        bulk_done = parser.clock
+        parser.wait(requests)
+        metrics = scheduler.metrics()
+    loaded = percentile(parser.latencies, 0.99)
+    assert idle == pytest.approx(_cost(INTERACTIVE_TEXT))
+    assert len(parser.latencies) == requests
+    # within the rest of the bulk batch being checked when the request arrives
+    assert idle < loaded <= idle + FIXED_COST + CHAR_COST * BATCH_CHARS
+    assert max(parser.completed) < bulk_done
+    assert metrics['interactive']['requests'] == requests + 1
+    assert metrics['bulk']['requests'] == 1
+
+    parser = _SimulatedParser()
+    with CheckScheduler(parser, batch_chars=len(BULK_DOCUMENT)) as scheduler:
+        parser.scheduler = scheduler
+        scheduler.submit(BULK_DOCUMENT, ["*"], BULK)
+        parser.wait(1)
+    assert parser.latencies == [pytest.approx(_cost(BULK_DOCUMENT.strip()) + idle)]
+    assert parser.latencies[0] > 10 * loaded
+
+
+def test_priority_and_deadline_order() -> None:
+    """Unit tests for running interactive requests first, by earliest deadline."""
+    release = threading.Event()
+    order = []
+
+    def check(chunk: str, offset: int, rules: list[str]) -> list[tuple[int, str, list]]:
+        release.wait()
+        order.append(chunk)
+        return [(offset, chunk, rules)]
+
+    with CheckScheduler(check) as scheduler:
+        first = scheduler.submit('First.', ["*"], BULK)
+        time.sleep(0.05)
+        futures = [scheduler.submit('Bulk.', ["*"], BULK),
+                   scheduler.submit('Late.', ["*"], INTERACTIVE),
+                   scheduler.submit('Soon.', ["r1"], INTERACTIVE, timeout=60)]
+        assert scheduler.queued() == {INTERACTIVE: 2, BULK: 1}
+        release.set()
+    assert first.result() == [(0, 'First.', ["*"])]
+    assert futures[2].result() == [(0, 'Soon.', ["r1"])]
+    assert order == ['First.', 'Soon.', 'Late.', 'Bulk.']
+
+
+def test_deadlines_errors_and_shutdown() -> None:
+    """Unit tests for missed deadlines, failing checks, cancelled requests and submitting
+    after shutdown.
+    """
+    release = threading.Event()
+
+    def check(chunk: str, offset: int, _: list[str]) -> list[tuple[int, str, list]]:
+        release.wait()
+        if chunk == 'Fail.':
+            raise ValueError(chunk)
+        return [(offset, chunk, [])]
+
+    scheduler = CheckScheduler(check)
+    scheduler.submit('Busy.', ["*"])
+    time.sleep(0.05)
+    missed = scheduler.submit('Missed.', ["*"], timeout=0.01)
+    failed = scheduler.submit('Fail.', ["*"])
+    cancelled = scheduler.submit('Cancelled.', ["*"])
+    empty = scheduler.submit('', ["*"])
+    assert cancelled.cancel()
+    time.sleep(0.05)
+    release.set()
+    scheduler.shutdown()
+    with pytest.raises(TimeoutError):
+        missed.result()
+    with pytest.raises(ValueError):
+        failed.result()
+    assert empty.result() == []
+    assert scheduler.metrics()['interactive']['deadline_misses'] == 1
+    with pytest.raises(RuntimeError):
+        scheduler.submit('Late.', ["*"])
+
+
+def test_percentile() -> None:
+    """Unit tests for nearest-rank percentiles."""
+    assert percentile([], 0.99) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile(range(1, 101), 0.99) == 99
+    assert percentile([5.0], 0.01) == 5.0
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_scheduler.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['threading', 'time', 'typing', 'pytest', 'scheduler',
+                          'segmenter'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,81 @@
+"""
+This file contains unit tests for cutting documents into sentence-aligned chunks in
+segmenter.py.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import pytest
+import segmenter
+from segmenter import read_chunks, sentence_chunks, sentence_ends
+
+TEXT = 'Mr. Smith went to Washington. He said "Hello!" Then he left.\n\n' \
+       'It rained, e.g. on Monday. 3 dogs ran. J. K. Rowling wrote (a lot).'
+
+
+def test_sentence_ends() -> None:
+    """Unit tests for finding the ends of sentences."""
+    ends = list(sentence_ends(TEXT))
+    assert [TEXT[end - 5:end] for end in ends] == ['gton.', 'llo!"', 'left.', 'nday.', ' ran.']
+    assert list(sentence_ends('He left. he said')) == []
+    assert list(sentence_ends('He left.   ')) == []
+
+
+def test_sentence_chunks() -> None:
+    """Unit tests for grouping sentences into chunks with offsets in the document."""
+    chunks = list(sentence_chunks(TEXT, 60, 40))
+    assert [chunk for _, chunk in chunks] == [
+        'Mr. Smith went to Washington. He said "Hello!" Then he left.',
+        'It rained, e.g. on Monday. 3 dogs ran.', 'J. K. Rowling wrote (a lot).']
+    for offset, chunk in chunks:
+        assert TEXT[offset:offset + len(chunk)] == chunk
+    assert list(sentence_chunks(TEXT)) == [(0, TEXT)]
+    assert list(sentence_chunks('  \n ')) == []
+
+
+def test_long_sentences() -> None:
+    """Unit tests for cutting sentences longer than the limit at a space."""
+    text = 'A ' + 'very ' * 10 + 'long sentence. Short one.'
+    chunks = list(sentence_chunks(text, 30, 20))
+    assert all(len(chunk) <= 20 for _, chunk in chunks)
+    assert ' '.join(chunk for _, chunk in chunks) == text
+    assert [chunk for _, chunk in sentence_chunks('x' * 25, 10, 10)] == ['x' * 10, 'x' * 10,
+                                                                         'x' * 5]
+
+
+def test_sentences_longer_than_chunks() -> None:
+    """Unit tests for sentences longer than a chunk but within the sentence limit, which
+    are chunks of their own instead of being cut.
+    """
+    text = 'He ran. A ' + 'very ' * 10 + 'long sentence. Short one. Another one.'
+    chunks = list(sentence_chunks(text, 30, 100))
+    assert [chunk for _, chunk in chunks] == [
+        'He ran.', 'A ' + 'very ' * 10 + 'long sentence.', 'Short one. Another one.']
+    for offset, chunk in chunks:
+        assert text[offset:offset + len(chunk)] == chunk
+    assert [chunk for _, chunk in sentence_chunks('A ' + 'very ' * 10 + 'long.', 10, 100)] \
+        == ['A ' + 'very ' * 10 + 'long.']
+    assert all(len(chunk) <= 40 for _, chunk in sentence_chunks(text, 30, 40))
+
+
+@pytest.mark.parametrize('read_size', [1, 3, 7, 64])
+def test_read_chunks(monkeypatch: pytest.MonkeyPatch, read_size: int) -> None:
+    """Unit tests for reading the chunks of a file a few characters at a time."""
+    monkeypatch.setattr(segmenter, 'READ_SIZE', read_size)
+    text = TEXT * 5 + '   '
+    for max_chars, max_sentence_chars in [(70, 40), (30, 10), (200, 200), (30, 90)]:
+        assert list(read_chunks(io.StringIO(text), max_chars, max_sentence_chars)) == \
+            list(sentence_chunks(text, max_chars, max_sentence_chars))
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_segmenter.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['io', 'pytest', 'segmenter'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
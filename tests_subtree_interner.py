@@ -0,0 +1,125 @@
+"""
+This file contains unit tests for the hash-consing of subtrees by the SubtreeInterner of
+subtree_interner.py and for GrammarTree.freeze().
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import threading
+from typing import Callable
+import pytest
+from grammar_checking_tree import GrammarCheckingTree
+from subtree_interner import SubtreeInterner
+from tests_thread_safety import TREEBANK
+from tree_io import read_ptb
+
+
+def _np(build: Callable[..., GrammarCheckingTree], words: list[tuple[str, str]]) -> \
+        GrammarCheckingTree:
+    """Return an NP of the given (label, word) tuples, built with build(label, subtrees,
+    text).
+    """
+    return build('NP', [build(label, [], word) for label, word in words], '')
+
+
+def test_intern() -> None:
+    """Unit tests for sharing structurally identical subtrees and the counters."""
+    interner = SubtreeInterner()
+    first = _np(interner.intern, [('DT', 'the'), ('NN', 'dog')])
+    second = _np(interner.intern, [('DT', 'the'), ('NN', 'dog')])
+    other = _np(interner.intern, [('DT', 'the'), ('NNS', 'dog')])
+    assert first is second and first is not other
+    assert first.subtrees[0] is other.subtrees[0]
+    assert first == _np(GrammarCheckingTree, [('DT', 'the'), ('NN', 'dog')])
+    assert (interner.requested, interner.created, len(interner)) == (9, 5, 5)
+
+
+def test_read_ptb_shares_subtrees() -> None:
+    """Unit tests for the trees of a treebank built by an interner, which are equal to the
+    trees built without it and share their identical subtrees.
+    """
+    interner = SubtreeInterner()
+    trees = list(read_ptb(io.StringIO(TREEBANK * 2), interner))
+    assert trees == list(read_ptb(io.StringIO(TREEBANK * 2)))
+    half = len(trees) // 2
+    assert all(tree is copy for tree, copy in zip(trees[:half], trees[half:]))
+    he_trees = [tree for tree in trees[:half] if tree.leaves()[0] == 'He']
+    assert he_trees[0].subtrees[0] is he_trees[1].subtrees[0]
+    assert interner.created == len(interner) < interner.requested
+
+
+def test_check_selected_rules() -> None:
+    """Unit tests for reusing the feedback of identical trees."""
+    interner = SubtreeInterner()
+    tree = next(read_ptb(io.StringIO(TREEBANK), interner))
+    expected = tree.check_selected_rules(["*"])
+    assert interner.check_selected_rules(tree, ["*"]) == expected
+    # a new root over the same interned subtrees reuses the feedback of tree
+    copy = GrammarCheckingTree(tree.root['label'], tree.subtrees, tree.root['text'])
+    copy.check_selected_rules = None
+    feedback = interner.check_selected_rules(copy, ["*"])
+    assert feedback == expected
+    feedback.append('changed')
+    assert interner.check_selected_rules(tree, ["*"]) == expected
+    assert interner.check_selected_rules(tree, ['r4']) == tree.check_selected_rules(['r4'])
+
+
+def test_clear() -> None:
+    """Unit tests for forgetting the interned subtrees and the cached feedback."""
+    interner = SubtreeInterner()
+    before = _np(interner.intern, [('NN', 'dog')])
+    interner.check_selected_rules(before, ["*"])
+    interner.clear()
+    assert len(interner) == 0
+    after = _np(interner.intern, [('NN', 'dog')])
+    assert after == before and after is not before
+    assert before.contain_content('dog')
+
+
+def test_concurrent_intern() -> None:
+    """Unit tests for interning the same subtrees from several threads at once."""
+    interner = SubtreeInterner()
+    results = []
+    barrier = threading.Barrier(8)
+
+    def intern_all() -> None:
+        barrier.wait()
+        results.append([_np(interner.intern, [('DT', 'a'), ('NN', f'dog{i}')])
+                        for i in range(200)])
+
+    threads = [threading.Thread(target=intern_all) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result[i] is results[0][i] for result in results for i in range(200))
+    assert interner.created == 401 and interner.requested == 8 * 600
+
+
+def test_freeze() -> None:
+    """Unit tests for the words of frozen trees, which give the same answers as the words
+    of unfrozen trees.
+    """
+    tree = _np(GrammarCheckingTree, [('DT', 'the'), ('JJ', 'cool'), ('NN', 'dog')])
+    words = ['the', 'cool', 'dog', 'cat', '', '.']
+    expected = [tree.contain_content(word) for word in words]
+    for subtree in tree.subtrees:
+        subtree.freeze()
+    tree.freeze()
+    assert tree._texts == frozenset({'the', 'cool', 'dog', ''})  # pylint: disable=protected-access
+    assert [tree.contain_content(word) for word in words] == expected
+    assert tree.subtrees[2].contain_content('dog') and not tree.subtrees[2].contain_content('the')
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_subtree_interner.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['io', 'threading', 'typing', 'pytest', 'grammar_checking_tree',
+                          'subtree_interner', 'tests_thread_safety', 'tree_io'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
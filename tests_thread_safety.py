@@ -0,0 +1,154 @@
+"""
+This file contains stress tests that check trees from many threads at once and compare
+the feedback with that of serial checking.
+
+The trees are read from PTB bracket notation, so these tests do not need spaCy or
+benepar.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+import pytest
+import grammar_tree
+from grammar_checking_tree import GrammarCheckingTree
+from subtree_interner import SubtreeInterner
+from tree_io import read_ptb
+
+TREEBANK = '''
+(S (NP (JJ Many) (JJ beautiful) (NNS cars)) (VP (VBZ is) (PP (IN in) (NP (NNP New)
+    (NNP York) (NNP City)))) (. .))
+(S (NP (DT This) (JJ handsome) (NN professor)) (VP (VBP have) (NP (JJ excellent)
+    (NN reputation))) (. .))
+(S (S (NP (DT A) (NN girl)) (VP (VBP are) (VP (VBG thinking)))) (CC and)
+    (S (NP (NNS boys)) (VP (VBZ swims))) (. .))
+(S (NP (NN Computer) (NN science)) (VP (VBZ is) (ADJP (JJ cool))) (. !))
+(S (VP (VBP want) (S (VP (TO to) (VP (VB have) (NP (DT a) (NN lunch)))))) (. .))
+(S (NP (PRP She)) (ADJP (JJ beautiful)) (. .))
+(S (NP (NP (DT The) (NN man)) (SBAR (WHNP (WP who)) (S (VP (VBZ is) (ADJP (JJ handsome))))))
+    (VP (VBZ has) (NP (DT a) (JJ cool) (NN car))) (. .))
+(SQ (VBZ Is) (NP (PRP he)) (ADJP (JJ cool)) (. ?))
+(S (NP (PRP He)) (VP (VBZ eats) (S (VP (VBG eating)))))
+(S (NP (PRP He)) (VP (VBZ is) (VP (VBG drinking))) (. .))
+(NP (NP (DT A) (JJ cool) (CC and) (JJ clever) (JJ Canadian) (NN man)) (. .))
+(S (NP (PRP I)) (VP (VBP like) (NP (NN swimming)) (CC and) (S (VP (TO to) (VP (VB run)))))
+    (. .))
+'''
+
+THREADS = 16
+ROUNDS = 50
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches() -> Iterator[None]:
+    """Make the interpreter switch threads as often as possible during a test, so that
+    the checks of different threads interleave.
+    """
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _feedback(tree: GrammarCheckingTree) -> list[tuple]:
+    """Return every field of the feedback of all rules on tree."""
+    return [(rule, fb.type, fb.message, fb.sentence_span) for rule, fb in tree.check_rules(["*"])]
+
+
+def test_concurrent_checks() -> None:
+    """Check every tree of TREEBANK from many threads and compare the feedback with that
+    of serial checking.
+    """
+    trees = list(read_ptb(io.StringIO(TREEBANK)))
+    expected = [_feedback(tree) for tree in trees]
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(_feedback, trees * ROUNDS))
+    assert results == expected * ROUNDS
+
+
+def test_concurrent_rule_methods() -> None:
+    """Call check_adjective and check_verb, which keep intermediate results while they
+    recurse, on the same trees from many threads at once.
+    """
+    trees = list(read_ptb(io.StringIO(TREEBANK)))
+    expected = [(t.check_adjective().message, t.check_verb().message) for t in trees]
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(lambda t: (t.check_adjective().message,
+                                               t.check_verb().message), trees * ROUNDS))
+    assert results == expected * ROUNDS
+
+
+def test_concurrent_interning() -> None:
+    """Read and check the trees of TREEBANK with one shared SubtreeInterner from many
+    threads, and compare the trees and feedback with those of serial reading and checking.
+    """
+    trees = list(read_ptb(io.StringIO(TREEBANK)))
+    expected = [tree.check_selected_rules(["*"]) for tree in trees]
+    interner = SubtreeInterner()
+
+    def read_and_check(_: int) -> list[tuple[GrammarCheckingTree, list[str]]]:
+        """Read and check every tree of TREEBANK with interner."""
+        return [(tree, interner.check_selected_rules(tree, ["*"]))
+                for tree in read_ptb(io.StringIO(TREEBANK), interner)]
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(read_and_check, range(ROUNDS)))
+    for result in results:
+        assert [tree for tree, _ in result] == trees
+        assert [feedback for _, feedback in result] == expected
+        # every thread got the same shared trees
+        assert all(tree is first for (tree, _), (first, _) in zip(result, results[0]))
+    serial = SubtreeInterner()
+    list(read_ptb(io.StringIO(TREEBANK), serial))
+    assert (interner.requested, interner.created) == (ROUNDS * serial.requested, serial.created)
+
+
+class _SwitchingDict(dict):
+    """A dict whose len() lets other threads run, which widens the window of any race
+    between reading the size of the dict and adding to it.
+    """
+    def __len__(self) -> int:
+        time.sleep(0.0001)
+        return super().__len__()
+
+
+def test_concurrent_new_labels(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Build trees with constituent tags that no earlier tree has used from many threads
+    at once, and check that every tag gets its own bit in the label masks.
+    """
+    monkeypatch.setattr(grammar_tree, '_LABEL_BITS', _SwitchingDict())
+    barrier = threading.Barrier(THREADS)
+
+    def build(thread: int) -> list[tuple[str, GrammarCheckingTree]]:
+        """Build ROUNDS trees, each with a new tag of this thread."""
+        barrier.wait()
+        return [(label, GrammarCheckingTree(label, [GrammarCheckingTree('NN', [], 'dog')]))
+                for label in (f'NEW-{thread}-{index}' for index in range(ROUNDS))]
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        built = [pair for pairs in executor.map(build, range(THREADS)) for pair in pairs]
+    assert len({grammar_tree.label_bit(label) for label, _ in built}) == THREADS * ROUNDS
+    for label, tree in built:
+        assert tree.contain_type(label) and tree.contain_type('NN')
+        assert not any(tree.contain_type(other) for other, _ in built[:20] if other != label)
+    assert not built[0][1].contain_type('NEVER-USED')
+    assert 'NEVER-USED' not in grammar_tree._LABEL_BITS
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_thread_safety.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['io', 'sys', 'threading', 'time', 'concurrent.futures', 'typing',
+                          'pytest', 'grammar_checking_tree', 'grammar_tree',
+                          'subtree_interner', 'tree_io'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,119 @@
+"""
+This file contains unit tests for the streaming, chunking and model loading functions of
+translator.py.
+
+These tests load the parsing model, so they are skipped if spaCy or benepar is not
+installed.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import gc
+import os
+import weakref
+import numpy as np
+import pytest
+from settings import VECTORS_VARIABLE
+
+translator = pytest.importorskip('translator')
+
+TEXTS = ['He is cool. The cars is red!', '', '   ', 'Is he cool?']
+
+
+def test_translate_stream() -> None:
+    """Unit tests for the text indices, offsets and trees of translate_stream()."""
+    sentences = list(translator.translate_stream(TEXTS))
+    assert [text_index for text_index, _, _ in sentences] == [0, 0, 3]
+    for text_index, start_char, tree in sentences:
+        sentence = tree.get_sentence()
+        assert TEXTS[text_index][start_char:start_char + len(sentence)] == sentence
+        assert tree.span[0] == start_char
+    assert [tree for _, _, tree in sentences] == \
+        [tree for text in TEXTS for tree in translator.translate(text)]
+    lazy = [tree for _, _, tree in translator.translate_stream(TEXTS, lazy=True)]
+    assert lazy == [tree for _, _, tree in sentences]
+
+
+def test_check_stream() -> None:
+    """Unit tests for the feedback of check_stream(), with and without the trees."""
+    trees = [tree for text in TEXTS for tree in translator.translate(text)]
+    expected = [tree.check_selected_rules(['r1', 'r4']) for tree in trees]
+    results = list(translator.check_stream(TEXTS, ['r1', 'r4']))
+    assert [feedback for _, _, _, feedback, _ in results] == expected
+    assert [sentence for _, _, sentence, _, _ in results] == \
+        [tree.get_sentence() for tree in trees]
+    assert all(tree is None for _, _, _, _, tree in results)
+    kept = list(translator.check_stream(TEXTS, ['r1', 'r4'], keep_trees=True))
+    assert [tree for _, _, _, _, tree in kept] == trees
+
+
+def test_stream_releases_trees() -> None:
+    """Unit tests for freeing the tree of a sentence once the caller is done with it,
+    before the other sentences of its chunk.
+    """
+    stream = translator.translate_stream(['He is cool. She is nice. They are here.'])
+    _, _, tree = next(stream)
+    reference = weakref.ref(tree)
+    del tree
+    next(stream)
+    gc.collect()
+    assert reference() is None
+
+
+def test_long_sentences(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Unit tests for keeping sentences longer than segmenter.MAX_SENTENCE_CHARS whole,
+    and for only cutting them when benepar rejects them as too long.
+    """
+    long_sentence = 'He ' + 'really ' * 200 + 'is cool.'
+    text = 'Hi there. ' + long_sentence + ' Bye now.'
+    assert long_sentence in [tree.get_sentence() for tree in translator.translate(text)]
+    sentences = [(start_char, tree.get_sentence())
+                 for start_char, tree in translator.translate_chunk(text)]
+    assert (10, long_sentence) in sentences
+
+    parse = translator.nlp
+
+    def limited_parse(chunk: str) -> object:
+        if len(chunk) > 1000:
+            raise ValueError('Sentence of length 2000 (in sub-word tokens) exceeds the '
+                             'maximum supported length of 512')
+        return parse(chunk)
+
+    monkeypatch.setattr(translator, 'nlp', limited_parse)
+    cut = translator.translate_chunk(text, 5)
+    assert len(cut) > len(sentences)
+    for start_char, tree in cut:
+        sentence = tree.get_sentence()
+        assert text[start_char - 5:start_char - 5 + len(sentence)] == sentence
+    monkeypatch.setattr(translator, 'nlp', lambda _: limited_parse('x' * 2000))
+    with pytest.raises(ValueError):
+        translator.translate('Hi there.')
+
+
+@pytest.mark.skipif(os.environ.get(VECTORS_VARIABLE, 'load') != 'load',
+                    reason='translator.nlp must be loaded with its vectors')
+def test_mapped_vectors(tmp_path: str) -> None:
+    """Smoke test for loading the pipeline with the vectors memory-mapped from a file
+    written by export_vectors(): the vectors and the parses are the same as with 'load'.
+    """
+    path = os.path.join(tmp_path, 'vectors.npy')
+    translator.export_vectors(path)
+    mapped = translator.load_pipeline(path)
+    vectors = translator.nlp.vocab.vectors
+    assert np.array_equal(mapped.vocab.vectors.data, vectors.data)
+    assert dict(mapped.vocab.vectors.key2row) == dict(vectors.key2row)
+    text = ' '.join(TEXTS) + ' The man who likes swimming is happy.'
+    assert [str(sentence._.parse_string) for sentence in mapped(text).sents] == \
+        [str(sentence._.parse_string) for sentence in translator.nlp(text).sents]
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_translator.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['gc', 'os', 'weakref', 'numpy', 'pytest', 'settings', 'translator'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,177 @@
+"""
+This file contains unit tests for reading and writing trees in tree_io.py.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import io
+import json
+import pathlib
+import pytest
+import tree_io
+from grammar_checking_tree import GrammarCheckingTree
+from subtree_interner import SubtreeInterner
+from lazy_tree import lazy_tree
+from tree_io import iter_ptb_strings, normalize_label, ptb_string, read_ptb, read_ptb_file, \
+    write_jsonl, write_ptb
+
+# sentences annotated as in the Wall Street Journal part of the Penn Treebank
+WSJ = """( (S
+    (NP-SBJ
+      (NP (NNP Pierre) (NNP Vinken) )
+      (, ,)
+      (ADJP
+        (NP (CD 61) (NNS years) )
+        (JJ old) )
+      (, ,) )
+    (VP (MD will)
+      (VP (VB join)
+        (NP (DT the) (NN board) )
+        (PP-CLR (IN as)
+          (NP (DT a) (JJ nonexecutive) (NN director) ))
+        (NP-TMP (NNP Nov.) (CD 29) )))
+    (. .) ))
+( (S (NP-SBJ-1 (NNS Prices) ) (VP (VBD were) (VP (VBN expected) (S (NP-SBJ (-NONE- *-1) )
+    (VP (TO to) (VP (VB rise) ))))) (. .) ))
+( (SINV (S-TPC-2 (NP-SBJ (PRP He) ) (VP (VBZ is) (ADJP-PRD (JJ cool) ))) (, ,)
+    (VP (VBD said) (SBAR (-NONE- 0) (S (-NONE- *T*-2) ))) (NP-SBJ (NNP John) ) (. .) ))
+( (S (-NONE- *U*) ))
+( (FRAG (NP=2 (-LRB- -LRB-) (NN word) (-RRB- -RRB-) ) (. .) ))
+"""
+
+# the trees of WSJ as the grammar rules should see them
+WSJ_PLAIN = [
+    '(S (NP (NP (NNP Pierre) (NNP Vinken)) (, ,) (ADJP (NP (CD 61) (NNS years)) (JJ old)) '
+    '(, ,)) (VP (MD will) (VP (VB join) (NP (DT the) (NN board)) (PP (IN as) (NP (DT a) '
+    '(JJ nonexecutive) (NN director))) (NP (NNP Nov.) (CD 29)))) (. .))',
+    '(S (NP (NNS Prices)) (VP (VBD were) (VP (VBN expected) (S (VP (TO to) (VP (VB rise))))))'
+    ' (. .))',
+    '(SINV (S (NP (PRP He)) (VP (VBZ is) (ADJP (JJ cool)))) (, ,) (VP (VBD said)) '
+    '(NP (NNP John)) (. .))',
+    '(FRAG (NP (-LRB- -LRB-) (NN word) (-RRB- -RRB-)) (. .))']
+
+
+def _example_tree() -> GrammarCheckingTree:
+    """Return the tree of "He is cool (really)."."""
+    return GrammarCheckingTree('S', [
+        GrammarCheckingTree('NP', [GrammarCheckingTree('PRP', [], 'He')]),
+        GrammarCheckingTree('VP', [
+            GrammarCheckingTree('VBZ', [], 'is'),
+            GrammarCheckingTree('ADJP', [GrammarCheckingTree('JJ', [], 'cool')]),
+            GrammarCheckingTree('PRN', [GrammarCheckingTree('-LRB-', [], '('),
+                                        GrammarCheckingTree('RB', [], 'really'),
+                                        GrammarCheckingTree('-RRB-', [], ')')])]),
+        GrammarCheckingTree('.', [], '.')])
+
+
+def test_write_ptb() -> None:
+    """Unit tests for writing trees in PTB bracket notation."""
+    tree = _example_tree()
+    assert ptb_string(tree) == '(S (NP (PRP He)) (VP (VBZ is) (ADJP (JJ cool)) ' \
+                               '(PRN (-LRB- -LRB-) (RB really) (-RRB- -RRB-))) (. .))'
+    file = io.StringIO()
+    assert write_ptb([tree, tree.subtrees[0]], file) == 2
+    assert file.getvalue().splitlines()[1] == '(NP (PRP He))'
+
+
+def test_write_jsonl() -> None:
+    """Unit tests for writing trees as JSON Lines."""
+    tree = _example_tree()
+    tree.set_source([(0, 2), (3, 5), (6, 10), (11, 12), (12, 18), (18, 19), (19, 20)])
+    file = io.StringIO()
+    assert write_jsonl([tree, tree.subtrees[1]], file) == 2
+    first, second = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert first['tree'][:3] == ['S', ['NP', ['PRP', 'He']], first['tree'][2]]
+    assert first['tree'][2][:2] == ['VP', ['VBZ', 'is']]
+    assert first['sentence'] == 'He is cool ( really ).'
+    assert first['span'] == [0, 20]
+    assert second['span'] is None
+
+
+def test_read_ptb_round_trip() -> None:
+    """Unit tests for reading back trees written in PTB bracket notation."""
+    tree = _example_tree()
+    file = io.StringIO()
+    write_ptb([tree, tree.subtrees[1]], file)
+    file.seek(0)
+    trees = list(read_ptb(file))
+    assert trees == [tree, tree.subtrees[1]]
+    assert trees[0].get_sentence() == 'He is cool ( really ).'
+
+
+def test_read_ptb_formats(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Unit tests for reading multi-line trees, extra brackets and trees split across
+    read chunks.
+    """
+    monkeypatch.setattr(tree_io, 'READ_CHUNK_SIZE', 5)
+    text = '( (S (NP (PRP He))\n    (VP (VBZ swims)) (. .)) )\n(FRAG (NN word))'
+    trees = list(read_ptb(io.StringIO(text)))
+    assert [t.root['label'] for t in trees] == ['S', 'FRAG']
+    assert trees[0].get_sentence() == 'He swims.'
+    assert trees[0].check_end_punctuation().type == 1
+    assert list(iter_ptb_strings(io.StringIO(text))) == \
+        ['((S (NP (PRP He)) (VP (VBZ swims)) (. .)))', '(FRAG (NN word))']
+
+
+def test_read_ptb_file(tmp_path: pathlib.Path) -> None:
+    """Unit tests for reading a memory-mapped treebank file with an interner."""
+    path = tmp_path / 'treebank.mrg'
+    path.write_text('(S (NP (DT The) (NNS cars)) (VP (VBZ is)) (. .))\n' * 3, encoding='utf-8')
+    interner = SubtreeInterner()
+    trees = list(read_ptb_file(str(path), interner))
+    assert len(trees) == 3 and trees[0] is trees[2]
+    assert trees[1].plural_noun_singular_verb().type == 2
+    empty = tmp_path / 'empty.mrg'
+    empty.write_text('', encoding='utf-8')
+    assert list(read_ptb_file(str(empty))) == []
+
+
+def test_read_ptb_invalid() -> None:
+    """Unit tests for rejecting input that is not in PTB bracket notation."""
+    for text in ['(S (NP (PRP He))', '(S (NP He (PRP He)))', 'S (NP (PRP He))', '(S)',
+                 '(NN dog cat)', '(S (NN dog)))']:
+        with pytest.raises(ValueError):
+            list(read_ptb(io.StringIO(text)))
+
+
+def test_normalize_label() -> None:
+    """Unit tests for removing function tags and indices from labels."""
+    assert [normalize_label(label) for label in
+            ['NP-SBJ-1', 'S-TPC-2', 'PP-CLR', 'NP=2', 'ADJP-PRD', 'PRP$', 'VP', '-LRB-',
+             '-NONE-', '.']] == \
+        ['NP', 'S', 'PP', 'NP', 'ADJP', 'PRP$', 'VP', '-LRB-', '-NONE-', '.']
+
+
+def test_read_wsj_annotations(tmp_path: pathlib.Path) -> None:
+    """Unit tests for reading treebanks with function tags, indices and empty elements,
+    eagerly, memory-mapped and lazily.
+    """
+    expected = [next(read_ptb(io.StringIO(text))) for text in WSJ_PLAIN]
+    path = tmp_path / 'wsj_0001.mrg'
+    path.write_text(WSJ, encoding='utf-8')
+    for trees in [list(read_ptb(io.StringIO(WSJ))), list(read_ptb_file(str(path)))]:
+        assert trees == expected
+        assert [ptb_string(tree) for tree in trees] == WSJ_PLAIN[:3] + \
+            ['(FRAG (NP (-LRB- -LRB-) (NN word) (-RRB- -RRB-)) (. .))']
+        assert [tree.check_selected_rules(["*"]) for tree in trees] == \
+            [tree.check_selected_rules(["*"]) for tree in expected]
+    assert expected[1].get_sentence() == 'Prices were expected to rise.'
+    assert expected[0].existence_of_subject().type == 1
+    assert expected[0].check_complete_sentence().type == 1
+    strings = list(iter_ptb_strings(io.StringIO(WSJ)))
+    assert [lazy_tree(text, unescape=True) for text in strings[:3] + strings[4:]] == expected
+    with pytest.raises(ValueError):
+        lazy_tree(strings[3])
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_tree_io.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['io', 'json', 'pathlib', 'pytest', 'tree_io', 'grammar_checking_tree',
+                          'lazy_tree', 'subtree_interner'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
@@ -0,0 +1,80 @@
+"""
+This file contains unit tests for the tree-pattern language in tree_pattern.py.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import pytest
+from grammar_checking_tree import GrammarCheckingTree
+from tree_pattern import PatternSet, compile_pattern
+
+
+def _leaf(label: str, text: str) -> GrammarCheckingTree:
+    """Return a GrammarCheckingTree representing a single word."""
+    return GrammarCheckingTree(label, [], text)
+
+
+def _example_tree() -> GrammarCheckingTree:
+    """Return the tree of "The cool man has a red car."."""
+    subject = GrammarCheckingTree('NP', [_leaf('DT', 'The'), _leaf('JJ', 'cool'),
+                                         _leaf('NN', 'man')])
+    obj = GrammarCheckingTree('NP', [_leaf('DT', 'a'), _leaf('JJ', 'red'), _leaf('NN', 'car')])
+    verb_phrase = GrammarCheckingTree('VP', [_leaf('VBZ', 'has'), obj])
+    return GrammarCheckingTree('S', [subject, verb_phrase, _leaf('.', '.')])
+
+
+def test_children_and_sisters() -> None:
+    """Unit tests for the <, $+ and | operators."""
+    tree = _example_tree()
+    found = compile_pattern('NP < (JJ $+ NN|NNS)').findall(tree)
+    assert [node.get_sentence() for node in found] == ['The cool man', 'a red car']
+    assert compile_pattern('NP < (DT $+ NN)').findall(tree) == []
+    assert len(compile_pattern('JJ $- DT').findall(tree)) == 2
+
+
+def test_descendants_and_ancestors() -> None:
+    """Unit tests for the <<, > and >> operators."""
+    tree = _example_tree()
+    assert compile_pattern('S << JJ').findall(tree) == [tree]
+    assert compile_pattern('VP < JJ').findall(tree) == []
+    assert [n.root['text'] for n in compile_pattern('JJ >> VP').findall(tree)] == ['red']
+    assert [n.root['text'] for n in compile_pattern('JJ > (NP > S)').findall(tree)] == ['cool']
+
+
+def test_negation_and_wildcard() -> None:
+    """Unit tests for the ! operator and the __ node description."""
+    tree = _example_tree()
+    assert compile_pattern('NP !> VP').findall(tree) == [tree.subtrees[0]]
+    assert len(compile_pattern('__ < DT').findall(tree)) == 2
+    assert not compile_pattern('S << ADJP').matches(tree)
+
+
+def test_pattern_set() -> None:
+    """Unit tests for matching several patterns in one traversal."""
+    tree = _example_tree()
+    patterns = PatternSet({'adj_noun': 'NP < (JJ $+ NN|NNS)',
+                           'verb': 'VBZ|VBD',
+                           'subject': compile_pattern('NP $+ VP')})
+    found = patterns.findall(tree)
+    assert len(found['adj_noun']) == 2
+    assert [n.root['text'] for n in found['verb']] == ['has']
+    assert found['subject'] == [tree.subtrees[0]]
+
+
+def test_invalid_patterns() -> None:
+    """Unit tests for rejecting invalid patterns."""
+    for pattern in ['', 'NP <', 'NP JJ', '(NP < JJ', 'NP < (JJ))', 'NP < |']:
+        with pytest.raises(ValueError):
+            compile_pattern(pattern)
+
+
+if __name__ == '__main__':
+    pytest.main(['tests_tree_pattern.py'])
+
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': [],
+        'extra-imports': ['pytest', 'grammar_checking_tree', 'tree_pattern'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
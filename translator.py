@@ -1,49 +1,289 @@
 """
 This file contains the translate() function that converts a passage of English text into
-GrammarTree object(s).
+GrammarTree object(s), and the memory-conscious translate_stream() and check_stream()
+functions for processing large batches of texts.
 
-Note that I have accessed protected members of a class in _create_grammar_tree() and
-_debugger(). This is unfortunately THE way to do it (at least for now), as outlined
-in the documentation of benepar (https://pypi.org/project/benepar/):
+Every text is first cut into sentence-aligned chunks by segmenter.sentence_chunks(), and
+each chunk is parsed with its own call of nlp, so texts of any length can be translated
+and only the parse data of one chunk is held at a time. Sentences are only cut when
+benepar rejects them as too long (see translate_chunk()). translate_chunk() translates a
+single chunk, e.g. to translate the chunks of one long document in several processes.
+
+Note that I have accessed protected members of a class in _create_grammar_tree(),
+enable_fast_inference(), _benepar_parser() and _debugger(). This is unfortunately THE way
+to do it (at least for now), as outlined in the documentation of benepar
+(https://pypi.org/project/benepar/):
 
 "Since spaCy does not provide an official constituency parsing API, all methods are
 accessible through the extension namespaces Span._ and Token._"
 
+The word vectors of the spaCy model are not used by any rule. By default they are loaded
+into every process as usual; setting the environment variable GRAMMAR_CHECKER_VECTORS
+(see load_pipeline()) before importing this file loads the pipeline without them, or
+memory-maps them from a file exported by export_vectors(), so that worker processes
+share a single copy. Models that are already installed are not downloaded again.
+
+Thread safety: spaCy does not guarantee that a pipeline can run in several threads at
+once, so every call of nlp made by the functions in this file holds _nlp_lock, and code
+that calls nlp directly from several threads must hold it too. The functions in this
+file can therefore be called from any number of threads, but their parses run one at a
+time (each parse may still use several torch threads, see configure_threads()); use
+several processes, as batch_check.py does, to parse in parallel. The trees returned are
+not shared between calls (unless an interner is given, see SubtreeInterner), and
+checking them is thread-safe (see grammar_checking_tree.py). freeze_for_inference(),
+enable_fast_inference() and configure_threads() change the model and must not be called
+while other threads are parsing.
+
 This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
 """
-from typing import Any, Dict
+import gc
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional
 import benepar
+import nltk
+import numpy as np
 import spacy
+import torch
 from grammar_checking_tree import GrammarCheckingTree
+from lazy_tree import lazy_tree
+from segmenter import MAX_CHUNK_CHARS, MAX_SENTENCE_CHARS, sentence_chunks
+from settings import VECTORS_VARIABLE
+from subtree_interner import SubtreeInterner
+
+SPACY_MODEL = 'en_core_web_md'
+BENEPAR_MODEL = 'benepar_en3'
+# the part of the error benepar raises for a sentence longer than its model supports
+_TOO_LONG_ERROR = 'exceeds the maximum supported length'
+# the components of SPACY_MODEL that use its word vectors, directly or through tok2vec,
+# and attribute_ruler and lemmatizer, which do not use them but need the tags of tagger
+_VECTOR_COMPONENTS = ['tok2vec', 'tagger', 'parser', 'senter', 'attribute_ruler',
+                      'lemmatizer', 'ner']
+
+
+def download_models() -> None:
+    """Download the spaCy and benepar models, unless they are already installed."""
+    if not spacy.util.is_package(SPACY_MODEL):
+        spacy.cli.download(SPACY_MODEL)
+    try:
+        nltk.data.find('models/' + BENEPAR_MODEL)
+    except LookupError:
+        benepar.download(BENEPAR_MODEL)
+
+
+def load_pipeline(vectors: str = 'load') -> Any:
+    """Return the spaCy pipeline of SPACY_MODEL followed by the benepar parser, with its
+    word vectors loaded as follows:
+        - 'load': the vectors are read into the memory of this process (as by
+        spacy.load), so every process holds its own copy of them.
+        - 'none': no vectors are loaded. The grammar rules do not use them, but the
+        tagger, parser and named entity recogniser of SPACY_MODEL do, so these components
+        are left out too and sentences are split by spaCy's rule-based sentencizer
+        rather than by the dependency parser; the sentence boundaries can therefore
+        differ in a few cases. The trees only use the tokens, the sentence boundaries
+        and the benepar parse, so nothing else changes.
+        - the path of a .npy file written by export_vectors(): the vectors are a
+        read-only memory map of that file, so every process using it shares one copy in
+        the page cache and the pipeline is the same as with 'load'.
+
+    Preconditions:
+        - vectors in {'load', 'none'} or vectors is the path of a file written by
+        export_vectors().
+    """
+    if vectors == 'load':
+        pipeline = spacy.load(SPACY_MODEL)
+    elif vectors == 'none':
+        pipeline = spacy.load(SPACY_MODEL, exclude=_VECTOR_COMPONENTS + ['vectors'])
+        pipeline.add_pipe('sentencizer')
+    else:
+        pipeline = spacy.load(SPACY_MODEL, exclude=['vectors'])
+        table = pipeline.vocab.vectors
+        table.data = np.load(vectors, mmap_mode='r')
+        # only the mapping from words to rows is read from the model
+        table.from_disk(pipeline.path / 'vocab', exclude=['vectors'])
+        table.name = pipeline.meta['vectors']['name']
+    pipeline.add_pipe("benepar", config={"model": BENEPAR_MODEL})
+    return pipeline
+
+
+def export_vectors(path: str) -> None:
+    """Save the word vectors of nlp to the .npy file at path, to be memory-mapped by
+    load_pipeline(path). E.g. export the vectors once with
+        translator.export_vectors('vectors.npy')
+    in a process where VECTORS_VARIABLE is not set, and then run the checkers with
+        GRAMMAR_CHECKER_VECTORS=vectors.npy python batch_check.py corpus/
+
+    Preconditions:
+        - nlp was not loaded with vectors == 'none'.
+    """
+    np.save(path, np.asarray(nlp.vocab.vectors.data))
+
 
 # download and load parsing model
-spacy.cli.download("en_core_web_md")
-benepar.download('benepar_en3')
-nlp = spacy.load("en_core_web_md")
-nlp.add_pipe("benepar", config={"model": "benepar_en3"})
+download_models()
+nlp = load_pipeline(os.environ.get(VECTORS_VARIABLE, 'load'))
+_nlp_lock = threading.Lock()
 
 
-def translate(text: str) -> [GrammarCheckingTree]:
+def translate(text: str, interner: Optional[SubtreeInterner] = None,
+              lazy: bool = False) -> [GrammarCheckingTree]:
     """Return a list of GrammarCheckingTree objects (each GrammarCheckingTree
     object represents a sentence) based on the input text using the benepar library.
 
-    Precondition:
+    If an interner is given, the trees are built by it, so that structurally identical
+    subtrees are shared with every other tree built by the same interner. If lazy is
+    True, the trees are LazyGrammarCheckingTree objects built from the parse strings of
+    the sentences, whose subtrees are only built when a rule looks at them; they are
+    equal to the trees built with lazy=False (see lazy_tree.lazy_tree with merge_chains).
+
+    Preconditions:
         - text can only contain letters in the English alphabet and basic
         punctuation marks (e.g. ",", ".", "?", "!").
+        - not (lazy and interner is not None)
+    """
+    return [tree for _, tree in _translate_text(text, interner, lazy)]
+
+
+def translate_stream(texts: Iterable[str], interner: Optional[SubtreeInterner] = None,
+                     lazy: bool = False) -> Iterator[tuple[int, int, GrammarCheckingTree]]:
+    """Yield a (text_index, start_char, tree) tuple for every sentence of every text in
+    texts, where text_index is the index of the text the sentence comes from and
+    start_char is the character offset of the sentence in that text.
+
+    Unlike translate(), the trees are yielded as soon as the chunk (see
+    segmenter.sentence_chunks) they come from is parsed, and the spaCy Doc of a chunk
+    (together with the benepar data attached to it) is released as soon as its sentences
+    are converted, so memory use is bounded by the longest chunk rather than by the whole
+    batch. The trees are built as in translate() with the given interner and lazy.
+
+    Precondition:
+        - every text in texts, interner and lazy satisfy the preconditions of translate().
+    """
+    for text_index, text in enumerate(texts):
+        for start_char, tree in _translate_text(text, interner, lazy):
+            yield text_index, start_char, tree
+
+
+def check_stream(texts: Iterable[str], rules: list[str], keep_trees: bool = False,
+                 interner: Optional[SubtreeInterner] = None, lazy: bool = False) -> \
+        Iterator[tuple[int, int, str, list[str], Optional[GrammarCheckingTree]]]:
+    """Yield a (text_index, start_char, sentence, feedback, tree) tuple for every sentence
+    of every text in texts, where feedback is the output of check_selected_rules(rules)
+    on the sentence.
+
+    If keep_trees is False, tree is None and check_stream() keeps no reference to the
+    GrammarCheckingTree of a sentence once its feedback is yielded, so the tree is freed
+    by the time the next sentence is checked. The trees of a chunk (see
+    segmenter.sentence_chunks) are all built when the chunk is parsed, so the trees
+    alive at a time are at most those of one chunk.
+    If an interner is given, the trees are built by it (see translate()) and the
+    feedback of sentences with identical trees is computed only once. If lazy is True,
+    only the parts of the trees the rules look at are built (see translate()).
+
+    Preconditions:
+        - every text in texts, interner and lazy satisfy the preconditions of translate().
+        - rules satisfies the precondition of check_selected_rules.
+    """
+    for text_index, start_char, tree in translate_stream(texts, interner, lazy):
+        if interner is None:
+            feedback = tree.check_selected_rules(rules)
+        else:
+            feedback = interner.check_selected_rules(tree, rules)
+        sentence = tree.get_sentence()
+        if not keep_trees:
+            # do not hold the tree while the caller handles the feedback
+            tree = None
+        yield text_index, start_char, sentence, feedback, tree
+
+
+def translate_chunk(chunk: str, offset: int = 0, interner: Optional[SubtreeInterner] = None,
+                    lazy: bool = False) -> list[tuple[int, GrammarCheckingTree]]:
+    """Return a (start_char, tree) tuple for every sentence of chunk, which starts at
+    the character offset offset in its text (see segmenter.sentence_chunks), where
+    start_char and the source of the tree (see GrammarTree.set_source) are character
+    offsets in that text. The trees are built as in translate() with the given interner
+    and lazy.
+
+    If benepar rejects a sentence of chunk as longer than its model supports, every
+    sentence of chunk longer than segmenter.MAX_SENTENCE_CHARS characters is cut at the
+    last space before the limit, and the pieces of chunk are parsed separately. Other
+    sentences are never cut.
+
+    Precondition:
+        - chunk, interner and lazy satisfy the preconditions of translate().
+    """
+    # the Doc is no longer referenced when this function returns, so it is freed before
+    # the (possibly slow) caller sees the first tree
+    try:
+        return _translate_doc(_parse(chunk), interner, offset, lazy)
+    except ValueError as error:
+        if _TOO_LONG_ERROR not in str(error):
+            raise
+    return [sentence for piece_offset, piece
+            in sentence_chunks(chunk, MAX_CHUNK_CHARS, MAX_SENTENCE_CHARS)
+            for sentence in _translate_doc(_parse(piece), interner, offset + piece_offset,
+                                           lazy)]
+
+
+def _translate_text(text: str, interner: Optional[SubtreeInterner], lazy: bool) -> \
+        Iterator[tuple[int, GrammarCheckingTree]]:
+    """Yield a (start_char, tree) tuple for every sentence of text, parsing it one chunk
+    at a time.
+    """
+    # a sentence longer than a chunk is far beyond what benepar supports, so it may be cut
+    for offset, chunk in sentence_chunks(text, MAX_CHUNK_CHARS, MAX_CHUNK_CHARS):
+        sentences = translate_chunk(chunk, offset, interner, lazy)
+        # remove every sentence from the list as it is yielded, so that the list does not
+        # keep the trees the caller is done with alive until the end of the chunk
+        sentences.reverse()
+        while sentences:
+            yield sentences.pop()
+
+
+def _parse(text: str) -> Any:
+    """Return the spaCy Doc of text, parsed while holding _nlp_lock.
+
+    The parse runs in torch.inference_mode(), which, like every torch gradient setting,
+    only applies to the thread that enters it, so it is entered around every parse rather
+    than once per process.
     """
-    grammar_trees = []
+    with _nlp_lock, torch.inference_mode():
+        return nlp(text)
 
-    doc = nlp(text)
-    sentence_trees = list(doc.sents)
-    for sentence_tree in sentence_trees:
-        grammar_trees.append(_create_grammar_tree(sentence_tree))
 
-    return grammar_trees
+def _translate_doc(doc: Any, interner: Optional[SubtreeInterner] = None, offset: int = 0,
+                   lazy: bool = False) -> list[tuple[int, GrammarCheckingTree]]:
+    """Return a (start_char, tree) tuple for every sentence of the given spaCy Doc, whose
+    text starts at the character offset offset in the original text. The character
+    offsets of the words of each sentence in the original text are stored in its tree
+    with GrammarTree.set_source(). The trees are built as in translate() with the given
+    interner and lazy.
+
+    Each sentence Span is converted and dropped one at a time, so no Span outlives its
+    conversion; once the caller drops doc, all of its parse data can be freed.
+    """
+    sentences = []
+    for sentence_tree in doc.sents:
+        if lazy:
+            # the parse string of the sentence holds its whole parse
+            tree = lazy_tree(str(sentence_tree._.parse_string), merge_chains=True)
+        else:
+            tree = _create_grammar_tree(sentence_tree, interner)
+        if interner is not None:
+            # the root stores the source of this particular sentence, so it is not shared
+            tree = GrammarCheckingTree(tree.root['label'], tree.subtrees, tree.root['text'])
+        leaf_offsets = [(offset + token.idx, offset + token.idx + len(token))
+                        for token in sentence_tree]
+        if len(leaf_offsets) == len(tree.leaves()):
+            tree.set_source(leaf_offsets)
+        sentences.append((offset + sentence_tree.start_char, tree))
+    return sentences
 
 
-def _create_grammar_tree(tree: Any) -> GrammarCheckingTree:
+def _create_grammar_tree(tree: Any, interner: Optional[SubtreeInterner] = None) -> \
+        GrammarCheckingTree:
     """Return a GrammarCheckingTree object for the given constituent parse tree object
-    outputted by the benepar library.
+    outputted by the benepar library, built by interner if it is given.
 
     From the documentation, spaCy does not provide an official constituency parsing API,
     so all methods are only accessible through the extension namespaces Span._ and Token._.
@@ -65,24 +305,25 @@ def _create_grammar_tree(tree: Any) -> GrammarCheckingTree:
             for parse_str in parse_string_lst[:-2]:
                 dict_lst.append({"label": parse_str, "text": ""})
             dict_lst.append({"label": parse_string_lst[-2], "text": parse_string_lst[-1]})
-            return _create_grammar_tree_lst(dict_lst)
+            return _create_grammar_tree_lst(dict_lst, interner)
     else:
         # tree represents a clause or a phrase that is not a unary chain
         label, text = str(tree._.labels[0]), ""
 
-    grammar_tree = GrammarCheckingTree(label,
-                                       [_create_grammar_tree(subtree) for subtree in
-                                        tree._.children],
-                                       text)
+    grammar_tree = _new_grammar_tree(label,
+                                     [_create_grammar_tree(subtree, interner) for subtree in
+                                      tree._.children],
+                                     text, interner)
     return grammar_tree
 
 
-def _create_grammar_tree_lst(lst: [Dict]) -> GrammarCheckingTree:
+def _create_grammar_tree_lst(lst: [Dict], interner: Optional[SubtreeInterner] = None) -> \
+        GrammarCheckingTree:
     """Return a GrammarCheckingTree that is a chain (i.e. the root and every subtree in the
     GrammarCheckingTree has only 1 child) based on the input list of dictionaries. For each
     dictionary in the input list, the dictionary at index i + 1 is the root value of
     a GrammarCheckingTree that is the child of the GrammarCheckingTree whose root value
-    is the dictionary at index i.
+    is the dictionary at index i. The trees are built by interner if it is given.
 
     Precondition:
         - len(lst) >= 1
@@ -90,15 +331,107 @@ def _create_grammar_tree_lst(lst: [Dict]) -> GrammarCheckingTree:
         values are strings.
     """
     if len(lst) == 1:
-        return GrammarCheckingTree(lst[0]["label"], [], lst[0]["text"])
+        return _new_grammar_tree(lst[0]["label"], [], lst[0]["text"], interner)
+    else:
+        return _new_grammar_tree(lst[0]["label"], [_create_grammar_tree_lst(lst[1:], interner)],
+                                 lst[0]["text"], interner)
+
+
+def _new_grammar_tree(label: str, subtrees: list[GrammarCheckingTree], text: str,
+                      interner: Optional[SubtreeInterner]) -> GrammarCheckingTree:
+    """Return a new GrammarCheckingTree with the given label, subtrees and text, or the
+    shared one from interner if it is given.
+    """
+    if interner is None:
+        return GrammarCheckingTree(label, subtrees, text)
     else:
-        return GrammarCheckingTree(lst[0]["label"], [_create_grammar_tree_lst(lst[1:])],
-                                   lst[0]["text"])
+        return interner.intern(label, subtrees, text)
+
+
+def freeze_for_inference() -> None:
+    """Switch the parsing model to evaluation mode, stop its parameters from requiring
+    gradients and exclude every object allocated so far from garbage collection.
+
+    Call this in a parent process right before forking worker processes: the workers
+    then share the (read-only) model weights with the parent copy-on-write, since neither
+    gradient bookkeeping nor the garbage collector writes to the pages that hold them.
+    Unlike torch.set_grad_enabled(), which only applies to the calling thread, these
+    settings belong to the model and the process, so they hold in every thread (and the
+    parses themselves run in torch.inference_mode(), see _parse()).
+    """
+    parser = _benepar_parser()
+    parser.eval()
+    for parameter in parser.parameters():
+        parameter.requires_grad_(False)
+    gc.collect()
+    gc.freeze()
+
+
+def enable_fast_inference() -> None:
+    """Replace the benepar parsing model with a copy whose linear layers use dynamic int8
+    quantisation. Like every parse, the parses of the quantised model run in
+    torch.inference_mode() (see _parse()), in whichever thread they happen.
+
+    This makes parsing faster on CPUs at the cost of slightly different parses; see
+    benchmark_quantization.py for the throughput and the agreement with the
+    full-precision model. It cannot be undone without reloading translator.
+
+    Preconditions:
+        - the parsing model runs on the CPU.
+    """
+    component = nlp.get_pipe("benepar")
+    component._parser = torch.quantization.quantize_dynamic(
+        component._parser, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def configure_threads(intra_op: Optional[int] = None, inter_op: Optional[int] = None) -> None:
+    """Set the number of threads the parsing model uses within an operation (intra_op)
+    and to run independent operations in parallel (inter_op). A None argument leaves the
+    corresponding setting unchanged.
+
+    When several checker processes run on one machine, the product of the number of
+    processes and intra_op should not exceed the number of cores; see
+    benchmark_threads.py for finding the best split.
+
+    Preconditions:
+        - intra_op is None or intra_op >= 1
+        - inter_op is None or inter_op >= 1
+        - if inter_op is not None, nothing has been parsed in this process yet.
+    """
+    if intra_op is not None:
+        torch.set_num_threads(intra_op)
+    if inter_op is not None:
+        torch.set_num_interop_threads(inter_op)
+
+
+def pin_to_cores(worker_index: int, cores_per_worker: int) -> list[int]:
+    """Restrict this process to the cores_per_worker cores reserved for the worker with the
+    given index and return those cores.
+
+    The cores this process may run on are split into consecutive groups of
+    cores_per_worker cores and worker i gets group i (wrapping around when there are more
+    workers than groups), so that workers running in parallel do not compete for cores.
+
+    Preconditions:
+        - worker_index >= 0
+        - cores_per_worker >= 1
+        - the platform supports os.sched_setaffinity (e.g. Linux).
+    """
+    available = sorted(os.sched_getaffinity(0))
+    start = worker_index * cores_per_worker
+    cores = [available[(start + i) % len(available)] for i in range(cores_per_worker)]
+    os.sched_setaffinity(0, set(cores))
+    return sorted(set(cores))
+
+
+def _benepar_parser() -> Any:
+    """Return the benepar parsing model (a torch module) used by nlp."""
+    return nlp.get_pipe("benepar")._parser
 
 
 def _debugger(sentence: str) -> None:
     """Used as debugger tool for the developers."""
-    doc = nlp(sentence)
+    doc = _parse(sentence)
 
     for tree in list(doc.sents):
         for constituent in tree._.constituents:
@@ -144,7 +477,10 @@ if __name__ == '__main__':
     python_ta.check_all(config={
         'max-line-length': 100,
         'disable': ['E9997'],
-        'extra-imports': ['typing', 'benepar', 'spacy', 'grammar_checking_tree'],
+        'extra-imports': ['gc', 'os', 'threading', 'typing', 'benepar', 'nltk', 'numpy',
+                          'spacy', 'torch',
+                          'grammar_checking_tree', 'lazy_tree', 'segmenter', 'settings',
+                          'subtree_interner'],
         'allowed-io': ['examples', '_debugger'],
         'max-nested-blocks': 4
     })
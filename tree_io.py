@@ -0,0 +1,264 @@
+"""
+This file contains functions that write batches of GrammarTree objects to files in Penn
+Treebank (PTB) bracket notation or as JSON Lines, and functions that read
+GrammarCheckingTree objects from PTB bracketed files without parsing any text (and
+without importing spaCy or benepar).
+
+Both formats have one tree per line. In PTB notation, "He is cool." is written as
+    (S (NP (PRP He)) (VP (VBZ is) (ADJP (JJ cool))) (. .))
+and as a JSON line it is written as
+    {"tree": ["S", ["NP", ["PRP", "He"]], ...], "sentence": "He is cool.", "span": [0, 11]}
+where a tree is a list of its constituent tag followed by its subtrees, a word is a list
+of its constituent tag and the word, and "span" is null if the source of the tree is
+unknown.
+
+Each tree is serialised in a single iterative pass and written with one write() call, so
+the functions never hold more than one tree's output in memory. For large exports, open
+the output file with a large buffer, e.g. open(path, 'w', buffering=1 << 20).
+
+The readers accept any whitespace between trees (not only newlines) and the extra pair
+of brackets around each tree used by some treebanks, e.g. "( (S ...) )". They read the
+input in chunks (read_ptb) or through a memory map (read_ptb_file), so treebanks of any
+size can be read one tree at a time.
+
+Since the grammar rules compare plain constituent tags, the readers also undo the
+annotations of treebanks such as the Wall Street Journal part of the Penn Treebank:
+function tags and indices are removed from labels (e.g. "NP-SBJ-1" and "S-TPC-2" are
+read as "NP" and "S", while tags like "-LRB-" are kept), and empty elements such as
+"(-NONE- *T*-1)" are dropped, together with the constituents that only contain empty
+elements. A tree that only contains empty elements is skipped.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import json
+import mmap
+import re
+from typing import Iterable, Iterator, Optional, TextIO
+from grammar_tree import GrammarTree
+from grammar_checking_tree import GrammarCheckingTree
+from subtree_interner import SubtreeInterner
+
+# the escapes of brackets in words, as in the Penn Treebank
+PTB_ESCAPES = {'(': '-LRB-', ')': '-RRB-'}
+_PTB_UNESCAPES = {escape: bracket for bracket, escape in PTB_ESCAPES.items()}
+
+# the label of empty elements (traces, null complementisers, etc.)
+EMPTY_ELEMENT = '-NONE-'
+
+_TOKEN_RE = re.compile(r'\(|\)|[^\s()]+')
+_ANNOTATION_RE = re.compile(r'[-=].*')
+_BYTES_TOKEN_RE = re.compile(rb'\(|\)|[^\s()]+')
+READ_CHUNK_SIZE = 1 << 20
+
+
+def normalize_label(label: str) -> str:
+    """Return label without its function tags and indices, e.g. "NP" for "NP-SBJ-1" and
+    "NP=2". Labels that start with "-", such as "-LRB-" and "-NONE-", are returned
+    unchanged.
+    """
+    return label if label.startswith('-') else _ANNOTATION_RE.sub('', label)
+
+
+def ptb_string(tree: GrammarTree) -> str:
+    """Return the PTB bracket notation of tree."""
+    pieces = []
+    # each stack entry is a tree to write, or a closing bracket
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            pieces.append(item)
+        elif item.subtrees == []:
+            text = PTB_ESCAPES.get(item.root['text'], item.root['text'])
+            pieces.append(f'({item.root["label"]} {text})')
+        else:
+            pieces.append(f'({item.root["label"]}')
+            stack.append(')')
+            for subtree in reversed(item.subtrees):
+                stack.append(subtree)
+                stack.append(' ')
+    return ''.join(pieces)
+
+
+def json_string(tree: GrammarTree) -> str:
+    """Return the JSON line (without the trailing newline) of tree."""
+    pieces = ['{"tree": ']
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            pieces.append(item)
+        elif item.subtrees == []:
+            pieces.append(f'[{json.dumps(item.root["label"])}, {json.dumps(item.root["text"])}]')
+        else:
+            pieces.append(f'[{json.dumps(item.root["label"])}')
+            stack.append(']')
+            for subtree in reversed(item.subtrees):
+                stack.append(subtree)
+                stack.append(', ')
+    pieces.append(f', "sentence": {json.dumps(tree.get_sentence())}, '
+                  f'"span": {json.dumps(tree.span)}}}')
+    return ''.join(pieces)
+
+
+def write_ptb(trees: Iterable[GrammarTree], file: TextIO) -> int:
+    """Write every tree in trees to file in PTB bracket notation, one tree per line, and
+    return the number of trees written.
+    """
+    count = 0
+    for tree in trees:
+        file.write(ptb_string(tree) + '\n')
+        count += 1
+    return count
+
+
+def write_jsonl(trees: Iterable[GrammarTree], file: TextIO) -> int:
+    """Write every tree in trees to file as JSON Lines, and return the number of trees
+    written.
+    """
+    count = 0
+    for tree in trees:
+        file.write(json_string(tree) + '\n')
+        count += 1
+    return count
+
+
+def read_ptb(file: TextIO, interner: Optional[SubtreeInterner] = None) -> \
+        Iterator[GrammarCheckingTree]:
+    """Yield the trees in the PTB bracketed file, built by interner if it is given (see
+    translator.translate).
+
+    Raise ValueError if file is not in PTB bracket notation.
+    """
+    return _trees_from_tokens(_file_tokens(file), interner)
+
+
+def read_ptb_file(path: str, interner: Optional[SubtreeInterner] = None) -> \
+        Iterator[GrammarCheckingTree]:
+    """Yield the trees in the PTB bracketed (UTF-8) file at path, which is memory-mapped
+    rather than read, built by interner if it is given (see translator.translate).
+
+    Raise ValueError if the file is not in PTB bracket notation.
+    """
+    return _trees_from_tokens(_mapped_tokens(path), interner)
+
+
+def iter_ptb_strings(file: TextIO) -> Iterator[str]:
+    """Yield the PTB bracket notation of each tree in the PTB bracketed file, without
+    building the trees (e.g. to send them to other processes).
+
+    Raise ValueError if the brackets in file are unbalanced.
+    """
+    tokens = []
+    depth = 0
+    for token in _file_tokens(file):
+        tokens.append(token)
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+            if depth < 0:
+                raise ValueError('unbalanced ")" in PTB input')
+            if depth == 0:
+                yield ' '.join(tokens).replace('( ', '(').replace(' )', ')')
+                tokens = []
+        elif depth == 0:
+            raise ValueError(f'unexpected {token!r} outside of a tree in PTB input')
+    if tokens:
+        raise ValueError('unexpected end of PTB input')
+
+
+def _file_tokens(file: TextIO) -> Iterator[str]:
+    """Yield the tokens (brackets, tags and words) of the PTB bracketed file, reading it
+    in chunks of READ_CHUNK_SIZE characters.
+    """
+    rest = ''
+    while True:
+        chunk = file.read(READ_CHUNK_SIZE)
+        if chunk == '':
+            yield from _TOKEN_RE.findall(rest)
+            return
+        text = rest + chunk
+        # the last token of the chunk may continue in the next chunk
+        end = len(text)
+        while end > 0 and not (text[end - 1].isspace() or text[end - 1] in '()'):
+            end -= 1
+        yield from _TOKEN_RE.findall(text, 0, end)
+        rest = text[end:]
+
+
+def _mapped_tokens(path: str) -> Iterator[str]:
+    """Yield the tokens (brackets, tags and words) of the memory-mapped PTB bracketed
+    file at path.
+    """
+    with open(path, 'rb') as file:
+        if file.seek(0, 2) == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for match in _BYTES_TOKEN_RE.finditer(mapped):
+                yield match.group().decode('utf-8')
+
+
+def _trees_from_tokens(tokens: Iterator[str], interner: Optional[SubtreeInterner]) -> \
+        Iterator[GrammarCheckingTree]:
+    """Yield the trees described by the given PTB tokens, with normalised labels and
+    without empty elements (see the description of this file).
+
+    Raise ValueError if the tokens are not in PTB bracket notation.
+    """
+    # each stack entry is [label, text, subtrees, whether a subtree was dropped] for an
+    # unfinished tree
+    stack = []
+    expect_label = False
+    for token in tokens:
+        if token == '(':
+            if stack and stack[-1][1] != '':
+                raise ValueError(f'word {stack[-1][1]!r} followed by a subtree in PTB input')
+            stack.append(['', '', [], False])
+            expect_label = True
+        elif token == ')':
+            if not stack:
+                raise ValueError('unbalanced ")" in PTB input')
+            label, text, subtrees, dropped = stack.pop()
+            expect_label = False
+            if label == '' and len(subtrees) + dropped == 1:
+                # the extra brackets around a tree in some treebanks
+                tree = subtrees[0] if subtrees else None
+            elif label == '' or (text == '') == (subtrees == [] and not dropped):
+                raise ValueError(f'invalid tree ({label} {text}) in PTB input')
+            elif label == EMPTY_ELEMENT or (text == '' and subtrees == []):
+                # an empty element, or a constituent that only contained empty elements
+                tree = None
+            elif interner is None:
+                tree = GrammarCheckingTree(label, subtrees, text)
+            else:
+                tree = interner.intern(label, subtrees, text)
+            if stack and tree is None:
+                stack[-1][3] = True
+            elif stack:
+                stack[-1][2].append(tree)
+            elif tree is not None:
+                yield tree
+        elif not stack:
+            raise ValueError(f'unexpected {token!r} outside of a tree in PTB input')
+        elif expect_label:
+            stack[-1][0] = normalize_label(token)
+            expect_label = False
+        elif stack[-1][1] != '' or stack[-1][2] != [] or stack[-1][3]:
+            raise ValueError(f'unexpected {token!r} in PTB input')
+        else:
+            stack[-1][1] = _PTB_UNESCAPES.get(token, token)
+    if stack:
+        raise ValueError('unexpected end of PTB input')
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136'],
+        'extra-imports': ['json', 'mmap', 're', 'typing', 'grammar_tree',
+                          'grammar_checking_tree', 'subtree_interner'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })
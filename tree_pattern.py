@@ -0,0 +1,294 @@
+"""
+This file contains a small tree-pattern language, in the spirit of Tregex, for writing
+grammar rules over GrammarTree objects.
+
+A pattern is a node description followed by any number of relations to other node
+descriptions. A node description is a constituent tag (e.g. "NP"), several tags
+separated by "|" (e.g. "NN|NNS"), "__" for any tag, or a parenthesised pattern. The
+supported relations are:
+    - A < B: A is the parent of B
+    - A << B: A is an ancestor of B
+    - A > B: A is a child of B
+    - A >> B: A is a descendant of B
+    - A $ B: A and B are sisters
+    - A $+ B: B is the sister immediately after A
+    - A $- B: B is the sister immediately before A
+A relation preceded by "!" must not hold. Every relation applies to the first node
+description of the (sub)pattern it appears in, so "NP < DT < NN" is an NP with both a DT
+child and an NN child, while "NP < (JJ $+ NN|NNS)" is an NP with a JJ child immediately
+followed by an NN or NNS child.
+
+Note that a tag containing one of the characters "<>!()|" or the tag "$" alone cannot be
+written in a pattern.
+
+Patterns are compiled once with compile_pattern(), and a PatternSet matches any number
+of compiled patterns against a tree in a single traversal. A pattern is only tried on
+the nodes whose tag and label mask (see GrammarTree.label_mask) contain the tags the
+pattern requires.
+
+Example usages see tests_tree_pattern.py.
+
+This file is Copyright (c) 2021 Yuzhi Tang, Hongshou Ge, Zheng Luan.
+"""
+import re
+from typing import Iterator, Optional, Union
+from grammar_tree import GrammarTree, label_bit
+
+_TOKEN_RE = re.compile(r'\s*(<<|>>|<|>|!|\(|\)|\||[^\s<>!()|]+)')
+_RELATIONS = {'<', '<<', '>', '>>', '$', '$+', '$-'}
+
+
+class _NodePattern:
+    """
+    A compiled node description together with its relations.
+    Instance Attributes:
+        - labels:
+            The constituent tags this node can have, or None if it can have any tag.
+        - relations:
+            A list of (negated, relation, target) tuples that must hold for this node.
+        - required_mask:
+            A bitmask of the tags that the subtree of every match of this node contains.
+    """
+    labels: Optional[frozenset]
+    relations: list[tuple[bool, str, "_NodePattern"]]
+    required_mask: int
+
+    def __init__(self, labels: Optional[frozenset]) -> None:
+        self.labels = labels
+        self.relations = []
+        self.required_mask = 0
+
+    def compute_required_mask(self) -> int:
+        """Compute and return the required_mask of this node and of its targets."""
+        mask = 0
+        if self.labels is not None and len(self.labels) == 1:
+            mask = label_bit(next(iter(self.labels)))
+        for negated, relation, target in self.relations:
+            target_mask = target.compute_required_mask()
+            if not negated and relation in {'<', '<<'}:
+                mask |= target_mask
+        self.required_mask = mask
+        return mask
+
+
+class _IndexedTree:
+    """
+    A GrammarTree flattened in preorder by a single traversal, so that every relation
+    can be evaluated by looking up integer indices.
+    Instance Attributes:
+        - nodes: the nodes of the tree in preorder.
+        - labels: labels[i] is the constituent tag of nodes[i].
+        - parents: parents[i] is the index of the parent of nodes[i], or -1 for the root.
+        - children: children[i] is the list of indices of the children of nodes[i].
+        - positions: positions[i] is the position of nodes[i] among its sisters.
+        - ends: the descendants of nodes[i] are nodes[i + 1:ends[i]].
+    """
+    nodes: list[GrammarTree]
+    labels: list[str]
+    parents: list[int]
+    children: list[list[int]]
+    positions: list[int]
+    ends: list[int]
+
+    def __init__(self, tree: GrammarTree) -> None:
+        self.nodes, self.labels, self.parents, self.children = [], [], [], []
+        self.positions, self.ends = [], []
+        # each stack entry is (node, parent index, position among sisters, visited)
+        stack = [(tree, -1, 0, False)]
+        while stack:
+            node, parent, position, visited = stack.pop()
+            if visited:
+                # all descendants of the node at index parent are indexed
+                self.ends[parent] = len(self.nodes)
+                continue
+            index = len(self.nodes)
+            self.nodes.append(node)
+            self.labels.append(node.root['label'])
+            self.parents.append(parent)
+            self.children.append([])
+            self.positions.append(position)
+            self.ends.append(index + 1)
+            if parent != -1:
+                self.children[parent].append(index)
+            stack.append((node, index, 0, True))
+            for child_position in range(len(node.subtrees) - 1, -1, -1):
+                stack.append((node.subtrees[child_position], index, child_position, False))
+
+    def related(self, index: int, relation: str) -> Iterator[int]:
+        """Yield the indices of the nodes that are in the given relation to nodes[index]."""
+        parent = self.parents[index]
+        if relation == '<':
+            yield from self.children[index]
+        elif relation == '<<':
+            yield from range(index + 1, self.ends[index])
+        elif relation == '>':
+            if parent != -1:
+                yield parent
+        elif relation == '>>':
+            while parent != -1:
+                yield parent
+                parent = self.parents[parent]
+        elif parent != -1:
+            sisters = self.children[parent]
+            position = self.positions[index]
+            if relation == '$':
+                yield from (s for s in sisters if s != index)
+            elif relation == '$+' and position + 1 < len(sisters):
+                yield sisters[position + 1]
+            elif relation == '$-' and position > 0:
+                yield sisters[position - 1]
+
+    def matches(self, pattern: _NodePattern, index: int) -> bool:
+        """Return whether nodes[index] matches the given node pattern."""
+        if pattern.labels is not None and self.labels[index] not in pattern.labels:
+            return False
+        if self.nodes[index].label_mask & pattern.required_mask != pattern.required_mask:
+            return False
+        for negated, relation, target in pattern.relations:
+            found = any(self.matches(target, other) for other in self.related(index, relation))
+            if found == negated:
+                return False
+        return True
+
+
+class TreePattern:
+    """
+    A compiled tree pattern. Use compile_pattern() to create one.
+    Instance Attributes:
+        - pattern: the source text of the pattern.
+    """
+    pattern: str
+    _root: _NodePattern
+
+    def __init__(self, pattern: str, root: _NodePattern) -> None:
+        self.pattern = pattern
+        self._root = root
+
+    def findall(self, tree: GrammarTree) -> list[GrammarTree]:
+        """Return the nodes of tree that match this pattern, in preorder."""
+        return PatternSet({'': self}).findall(tree)['']
+
+    def matches(self, tree: GrammarTree) -> bool:
+        """Return whether any node of tree matches this pattern."""
+        return len(self.findall(tree)) > 0
+
+
+class PatternSet:
+    """
+    A collection of named tree patterns that are matched together in a single traversal.
+    Instance Attributes:
+        - patterns: maps each name to its compiled pattern.
+    """
+    patterns: dict[str, TreePattern]
+    _by_label: dict[str, list[str]]
+    _any_label: list[str]
+
+    def __init__(self, patterns: dict[str, Union[str, TreePattern]]) -> None:
+        self.patterns = {}
+        self._by_label = {}
+        self._any_label = []
+        for name, pattern in patterns.items():
+            if isinstance(pattern, str):
+                pattern = compile_pattern(pattern)
+            self.patterns[name] = pattern
+            if pattern._root.labels is None:
+                self._any_label.append(name)
+            else:
+                for label in pattern._root.labels:
+                    self._by_label.setdefault(label, []).append(name)
+
+    def findall(self, tree: GrammarTree) -> dict[str, list[GrammarTree]]:
+        """Return a mapping from the name of each pattern to the nodes of tree that
+        match it, in preorder.
+        """
+        indexed = _IndexedTree(tree)
+        found = {name: [] for name in self.patterns}
+        for index, label in enumerate(indexed.labels):
+            for name in self._by_label.get(label, []) + self._any_label:
+                if indexed.matches(self.patterns[name]._root, index):
+                    found[name].append(indexed.nodes[index])
+        return found
+
+
+def compile_pattern(pattern: str) -> TreePattern:
+    """Return the compiled TreePattern of the given pattern text.
+
+    Raise ValueError if pattern is not a valid pattern.
+    """
+    tokens = _tokenize(pattern)
+    root, position = _parse_pattern(tokens, 0, pattern)
+    if position != len(tokens):
+        raise ValueError(f'unexpected {tokens[position]!r} in pattern {pattern!r}')
+    root.compute_required_mask()
+    return TreePattern(pattern, root)
+
+
+def _tokenize(pattern: str) -> list[str]:
+    """Return the tokens of the given pattern text."""
+    tokens = []
+    position = 0
+    pattern = pattern.strip()
+    while position < len(pattern):
+        match = _TOKEN_RE.match(pattern, position)
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def _parse_pattern(tokens: list[str], position: int, pattern: str) -> \
+        tuple[_NodePattern, int]:
+    """Parse a node description and its relations starting at tokens[position], and
+    return the parsed node pattern and the position of the first token after it.
+    """
+    node, position = _parse_description(tokens, position, pattern)
+    while position < len(tokens) and tokens[position] != ')':
+        negated = tokens[position] == '!'
+        if negated:
+            position += 1
+        if position == len(tokens) or tokens[position] not in _RELATIONS:
+            raise ValueError(f'expected a relation at token {position} of pattern {pattern!r}')
+        relation = tokens[position]
+        target, position = _parse_description(tokens, position + 1, pattern)
+        node.relations.append((negated, relation, target))
+    return node, position
+
+
+def _parse_description(tokens: list[str], position: int, pattern: str) -> \
+        tuple[_NodePattern, int]:
+    """Parse a node description (or a parenthesised pattern) starting at
+    tokens[position], and return it and the position of the first token after it.
+    """
+    if position == len(tokens):
+        raise ValueError(f'unexpected end of pattern {pattern!r}')
+    if tokens[position] == '(':
+        node, position = _parse_pattern(tokens, position + 1, pattern)
+        if position == len(tokens):
+            raise ValueError(f'missing ")" in pattern {pattern!r}')
+        return node, position + 1
+    labels = set()
+    while True:
+        label = tokens[position]
+        if label in _RELATIONS or label in {'!', '(', ')', '|'}:
+            raise ValueError(f'expected a tag at token {position} of pattern {pattern!r}')
+        labels.add(label)
+        position += 1
+        if position < len(tokens) and tokens[position] == '|':
+            position += 1
+            if position == len(tokens):
+                raise ValueError(f'unexpected end of pattern {pattern!r}')
+        else:
+            break
+    if '__' in labels:
+        return _NodePattern(None), position
+    return _NodePattern(frozenset(labels)), position
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'max-line-length': 100,
+        'disable': ['E1136', 'W0212'],
+        'extra-imports': ['re', 'typing', 'grammar_tree'],
+        'allowed-io': [],
+        'max-nested-blocks': 4
+    })